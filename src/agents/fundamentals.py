@@ -10,8 +10,29 @@ def fundamentals_agent(state: AgentState):
     """Analyzes fundamental data and generates trading signals."""
     show_reasoning = state["metadata"]["show_reasoning"]
     data = state["data"]
-    metrics = eval(data["financial_metrics"])[0]
-    financial_line_item = eval(data["financial_line_items"])[0]
+    metrics = data["financial_metrics"].iloc[0].to_dict()
+    financial_line_item = data["financial_line_items"].iloc[0].to_dict()
+
+    message_content = analyze_fundamentals(metrics)
+    
+    # Create the fundamental analysis message
+    message = HumanMessage(
+        content=json.dumps(message_content),
+        name="fundamentals_agent",
+    )
+    
+    # Print the reasoning if the flag is set
+    if show_reasoning:
+        show_agent_reasoning(message_content, "Fundamental Analysis Agent")
+    
+    return {
+        "messages": [message],
+        "data": data,
+        "signals": {"fundamentals_agent": message_content},
+    }
+
+def analyze_fundamentals(metrics: dict) -> dict:
+    """Scores one year of financial metrics into a fundamental signal, confidence and reasoning."""
     # market_cap = eval(data["market_cap"])[0]
     market_cap = metrics['market_cap']
 
@@ -139,26 +160,11 @@ def fundamentals_agent(state: AgentState):
     total_signals = len(signals)
     confidence = max(bullish_signals, bearish_signals) / total_signals
     
-    message_content = {
+    return {
         "signal": overall_signal,
         "confidence": f"{round(confidence * 100)}%",
         "reasoning": reasoning
     }
-    
-    # Create the fundamental analysis message
-    message = HumanMessage(
-        content=json.dumps(message_content),
-        name="fundamentals_agent",
-    )
-    
-    # Print the reasoning if the flag is set
-    if show_reasoning:
-        show_agent_reasoning(message_content, "Fundamental Analysis Agent")
-    
-    return {
-        "messages": [message],
-        "data": data,
-    }
 
 def calculate_intrinsic_value(
     free_cash_flow: float,
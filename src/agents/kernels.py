@@ -0,0 +1,98 @@
+import numpy as np
+
+
+##### Indicator Kernels #####
+# Array implementations of the technical indicators. Inputs are 1-D (bars) or
+# 2-D (bars x tickers) arrays with time along axis 0, so a whole universe can be
+# computed in one call. Kernels never modify their inputs.
+
+def obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """
+    On-Balance Volume: cumulative volume signed by the direction of each close-to-close move.
+    
+    Args:
+        close: closing prices
+        volume: traded volume, same shape as close
+    
+    Returns:
+        np.ndarray: OBV, starting at 0 on the first bar (dtype follows volume)
+    """
+    close = np.asarray(close, dtype=float)
+    volume = np.asarray(volume)
+
+    change = np.zeros_like(close)
+    change[1:] = close[1:] - close[:-1]
+    signed_volume = np.where(change > 0, volume, np.where(change < 0, -volume, 0))
+    return np.cumsum(signed_volume, axis=0)
+
+def ewm_mean(values: np.ndarray, alpha: float, adjust: bool = True) -> np.ndarray:
+    """
+    Exponentially weighted mean along axis 0, equivalent to
+    ``DataFrame.ewm(alpha=alpha, adjust=adjust).mean()`` including its handling of NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.empty_like(values)
+    if len(values) == 0:
+        return out
+
+    new_wt = 1.0 if adjust else alpha
+    weighted = values[0].copy()
+    old_wt = np.ones_like(weighted)
+    out[0] = weighted
+    for t in range(1, len(values)):
+        current = values[t]
+        observed = ~np.isnan(current)
+        started = ~np.isnan(weighted)
+
+        old_wt = np.where(started, old_wt * (1 - alpha), old_wt)
+        update = started & observed
+        blended = (old_wt * weighted + new_wt * current) / (old_wt + new_wt)
+        weighted = np.where(update & (weighted != current), blended, weighted)
+        old_wt = np.where(update, old_wt + new_wt if adjust else 1.0, old_wt)
+        weighted = np.where(~started & observed, current, weighted)
+        out[t] = weighted
+    return out
+
+def _previous(values: np.ndarray) -> np.ndarray:
+    previous = np.full_like(values, np.nan)
+    previous[1:] = values[:-1]
+    return previous
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True range: the largest of high-low, |high-prev close| and |low-prev close|."""
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    prev_close = _previous(close)
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+def directional_movement(high: np.ndarray, low: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """+DM and -DM: the dominant, positive move of the high (up) or the low (down)."""
+    high, low = np.asarray(high, dtype=float), np.asarray(low, dtype=float)
+    up_move = high - _previous(high)
+    down_move = _previous(low) - low
+
+    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+    return plus_dm, minus_dm
+
+def adx(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    period: int = 14,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Average Directional Index with the directional indicators, smoothed with an
+    exponentially weighted mean of span ``period``.
+    
+    Returns:
+        tuple of (adx, +di, -di) arrays
+    """
+    alpha = 2.0 / (period + 1.0)
+    tr = ewm_mean(true_range(high, low, close), alpha)
+    plus_dm, minus_dm = directional_movement(high, low)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * ewm_mean(plus_dm, alpha) / tr
+        minus_di = 100 * ewm_mean(minus_dm, alpha) / tr
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return ewm_mean(dx, alpha), plus_di, minus_di
@@ -1,20 +1,66 @@
-
-from langchain_openai.chat_models import ChatOpenAI
-
 from agents.state import AgentState
-# from tools.api import search_line_items, get_financial_metrics, get_insider_trades, get_market_cap, get_prices
-
-from tools.api_vnindex import search_line_items, get_financial_metrics, get_insider_trades, get_market_cap, get_prices
+from tools.concurrency import FETCH_TIMEOUT, afetch_concurrently, fetch_concurrently
+from tools.providers import get_provider
 from datetime import datetime
+from functools import partial
 
-llm = ChatOpenAI(model="gpt-4o")
+# Provider method filling each data field; prices come back as the parsed frame every agent reads
+FETCH_METHODS = {
+    "prices": "get_prices",
+    "financial_metrics": "get_financial_metrics",
+    "insider_trades": "get_insider_trades",
+    "market_cap": "get_market_cap",
+    "financial_line_items": "search_line_items",
+}
 
 def market_data_agent(state: AgentState):
     """Responsible for gathering and preprocessing market data"""
-    messages = state["messages"]
     data = state["data"]
+    provider = get_provider(state["metadata"].get("data_provider"))
+    start_date, end_date = resolve_dates(data)
+
+    # Issue every fetch at once; the node takes about as long as the slowest one
+    fetches = fetch_requests(data["ticker"], start_date, end_date)
+    results, latencies = fetch_concurrently(
+        {name: partial(getattr(provider, FETCH_METHODS[name]), **kwargs) for name, kwargs in fetches.items()},
+        timeout=state["metadata"].get("fetch_timeout", FETCH_TIMEOUT),
+    )
+
+    return {
+        "data": {
+            **data, 
+            **results,
+            "start_date": start_date,
+            "end_date": end_date,
+        },
+        # Seconds spent in each fetch
+        "metadata": {"fetch_latency": latencies},
+    }
+
+async def amarket_data_agent(state: AgentState):
+    """Async version of market_data_agent, used when the graph runs on an event loop."""
+    data = state["data"]
+    provider = get_provider(state["metadata"].get("data_provider"))
+    start_date, end_date = resolve_dates(data)
+
+    fetches = fetch_requests(data["ticker"], start_date, end_date)
+    results, latencies = await afetch_concurrently(
+        {name: partial(getattr(provider, f"a{FETCH_METHODS[name]}"), **kwargs) for name, kwargs in fetches.items()},
+        timeout=state["metadata"].get("fetch_timeout", FETCH_TIMEOUT),
+    )
+
+    return {
+        "data": {
+            **data,
+            **results,
+            "start_date": start_date,
+            "end_date": end_date,
+        },
+        "metadata": {"fetch_latency": latencies},
+    }
 
-    # Set default dates
+def resolve_dates(data: dict):
+    """Start and end date of the run; defaults to the 3 months up to today."""
     end_date = data["end_date"] or datetime.now().strftime('%Y-%m-%d')
     if not data["start_date"]:
         # Calculate 3 months before end_date
@@ -24,52 +70,14 @@ def market_data_agent(state: AgentState):
         start_date = start_date.strftime('%Y-%m-%d')
     else:
         start_date = data["start_date"]
+    return start_date, end_date
 
-    # Get the historical price data
-    prices = get_prices(
-        ticker=data["ticker"], 
-        start_date=start_date, 
-        end_date=end_date,
-    )
-
-    # Get the financial metrics
-    financial_metrics = get_financial_metrics(
-        ticker=data["ticker"], 
-        report_period=end_date, 
-        period='year',
-        limit=1,
-    )
-
-    # Get the insider trades
-    insider_trades = get_insider_trades(
-        ticker=data["ticker"],
-        end_date=end_date,
-        limit=5,
-    )
-
-    # Get the market cap
-    market_cap = get_market_cap(
-        ticker=data["ticker"],
-    )
-
-    # Get the line_items
-    financial_line_items = search_line_items(
-        ticker=data["ticker"], 
-        line_items=["free_cash_flow"],
-        period='year',
-        limit=1,
-    )
-
+def fetch_requests(ticker: str, start_date: str, end_date: str) -> dict:
+    """Keyword arguments of each fetch, keyed by the data field it fills."""
     return {
-        "messages": messages,
-        "data": {
-            **data, 
-            "prices": prices, 
-            "start_date": start_date,
-            "end_date": end_date,
-            "financial_metrics": financial_metrics,
-            "insider_trades": insider_trades,
-            "market_cap": market_cap,
-            "financial_line_items": financial_line_items,
-        }
-    }
\ No newline at end of file
+        "prices": dict(ticker=ticker, start_date=start_date, end_date=end_date),
+        "financial_metrics": dict(ticker=ticker, report_period=end_date, period='year', limit=1),
+        "insider_trades": dict(ticker=ticker, end_date=end_date, limit=5),
+        "market_cap": dict(ticker=ticker),
+        "financial_line_items": dict(ticker=ticker, line_items=["free_cash_flow"], period='year', limit=1),
+    }
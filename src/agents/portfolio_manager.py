@@ -1,22 +1,32 @@
 
+import json
+
 from langchain_core.messages import HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai.chat_models import ChatOpenAI
 
-from agents.state import AgentState, show_agent_reasoning
+from agents.state import DECISION_MODES, AgentState, show_agent_reasoning
+from tools.concurrency import llm_slot
+from tools.frames import prices_to_df
+from tools.llm_cache import get_llm_cache, LLMCache
+from tools.replay import get_chat_model, record_chat_response, replay_mode
 
 
 ##### Portfolio Management Agent #####
 def portfolio_management_agent(state: AgentState):
     """Makes final trading decisions and generates orders"""
     show_reasoning = state["metadata"]["show_reasoning"]
+    use_llm_cache = state["metadata"].get("llm_cache", True)
+    decision_mode = state["metadata"].get("decision_mode", "auto")
+    if decision_mode not in DECISION_MODES:
+        raise ValueError(f"decision_mode must be one of {DECISION_MODES}, got {decision_mode!r}")
     portfolio = state["data"]["portfolio"]
 
-    # Get the technical analyst, fundamentals agent, and risk management agent messages
-    technical_message = next(msg for msg in state["messages"] if msg.name == "technical_analyst_agent")
-    fundamentals_message = next(msg for msg in state["messages"] if msg.name == "fundamentals_agent")
-    sentiment_message = next(msg for msg in state["messages"] if msg.name == "sentiment_agent")
-    risk_message = next(msg for msg in state["messages"] if msg.name == "risk_management_agent")
+    # Get the technical analyst, fundamentals agent, sentiment agent and risk management agent outputs
+    signals = state["signals"]
+    technical_signals = signals["technical_analyst_agent"]
+    fundamental_signals = signals["fundamentals_agent"]
+    sentiment_signals = signals["sentiment_agent"]
+    risk_signals = signals["risk_management_agent"]
 
     # Create the prompt template
     template = ChatPromptTemplate.from_messages(
@@ -90,24 +100,49 @@ def portfolio_management_agent(state: AgentState):
         ]
     )
 
-    # Generate the prompt
-    prompt = template.invoke(
-        {
-            "technical_message": technical_message.content, 
-            "fundamentals_message": fundamentals_message.content,
-            "sentiment_message": sentiment_message.content,
-            "risk_message": risk_message.content,
-            "portfolio_cash": f"{portfolio['cash']:.2f}",
-            "portfolio_stock": portfolio["stock"]
-        }
-    )
-    # Invoke the LLM
-    llm = ChatOpenAI(model="gpt-4o")
-    result = llm.invoke(prompt)
+    outcome_decided = risk_signals["trading_action"] == "hold" or (portfolio["cash"] <= 0 and portfolio["stock"] <= 0)
+
+    if decision_mode == "rules" or (decision_mode == "auto" and outcome_decided):
+        decision = make_rule_based_decision(
+            agent_signals={
+                "fundamental": parse_agent_signal(fundamental_signals),
+                "technical": parse_agent_signal(technical_signals),
+                "sentiment": parse_agent_signal(sentiment_signals),
+            },
+            trading_action=risk_signals["trading_action"],
+            max_position_size=risk_signals["max_position_size"],
+            portfolio=portfolio,
+            current_price=float(prices_to_df(state["data"]["prices"])["close"].iloc[-1]),
+        )
+        content = json.dumps(decision)
+    else:
+        # Generate the prompt
+        prompt = template.invoke(
+            {
+                "technical_message": json.dumps(technical_signals), 
+                "fundamentals_message": json.dumps(fundamental_signals),
+                "sentiment_message": json.dumps(sentiment_signals),
+                "risk_message": json.dumps(risk_signals),
+                "portfolio_cash": f"{portfolio['cash']:.2f}",
+                "portfolio_stock": portfolio["stock"]
+            }
+        )
+        # Invoke the LLM, reusing the stored response if this exact prompt was answered before
+        llm = get_chat_model(model="gpt-4o")
+        # Replies of the replay stub model are not the model's, so replaying bypasses the LLM cache
+        use_llm_cache = use_llm_cache and replay_mode() != "replay"
+        cache_key = LLMCache.make_key(prompt.to_messages(), model=llm.model_name, temperature=llm.temperature)
+        content = get_llm_cache().get(cache_key) if use_llm_cache else None
+        if content is None:
+            with llm_slot():
+                content = llm.invoke(prompt).content
+            if use_llm_cache:
+                get_llm_cache().put(cache_key, content)
+        record_chat_response(prompt.to_messages(), content)
 
     # Create the portfolio management message
     message = HumanMessage(
-        content=result.content,
+        content=content,
         name="portfolio_management",
     )
 
@@ -115,4 +150,76 @@ def portfolio_management_agent(state: AgentState):
     if show_reasoning:
         show_agent_reasoning(message.content, "Portfolio Management Agent")
 
-    return {"messages": state["messages"] + [message]}
\ No newline at end of file
+    return {"messages": [message]}
+
+def parse_agent_signal(signal: dict) -> dict:
+    """Signal and numeric confidence from an analyst output ("confidence": "NN%")."""
+    return {
+        "signal": signal["signal"],
+        "confidence": float(str(signal["confidence"]).replace("%", "")) / 100.0,
+    }
+
+# Weights given to each analyst in the portfolio manager prompt
+DECISION_WEIGHTS = {
+    "fundamental": 0.50,
+    "technical": 0.35,
+    "sentiment": 0.15,
+}
+
+def make_rule_based_decision(
+    agent_signals: dict,
+    trading_action: str,
+    max_position_size: float,
+    portfolio: dict,
+    current_price: float,
+    threshold: float = 0.2,
+) -> dict:
+    """
+    Deterministic counterpart of the portfolio manager prompt.
+
+    Args:
+        agent_signals: {"fundamental" | "technical" | "sentiment": {"signal": str, "confidence": float}}
+        trading_action: trading_action from the risk management agent; buys need "bullish",
+            sells need "bearish" ("reduce" halves the position, "hold" and "neutral" hold)
+        max_position_size: position limit from the risk management agent
+        portfolio: {"cash": float, "stock": int}
+        current_price: price used to size the order
+        threshold: weighted score needed to buy or sell
+
+    Returns:
+        dict with the same action, quantity, confidence, agent_signals and reasoning
+        fields the LLM is asked to produce
+    """
+    signal_values = {"bullish": 1, "neutral": 0, "bearish": -1}
+    score = sum(
+        DECISION_WEIGHTS[agent] * signal_values[signal["signal"]] * signal["confidence"]
+        for agent, signal in agent_signals.items()
+    )
+
+    # The risk manager's trading_action comes first, as the prompt requires: the weighted
+    # score only buys on "bullish" and only sells on "bearish"; "neutral" holds
+    action, quantity = "hold", 0
+    if trading_action == "reduce":
+        # Risk is elevated: cut the position in half
+        if portfolio["stock"] > 0:
+            action, quantity = "sell", max(1, int(portfolio["stock"] // 2))
+    elif trading_action == "bullish" and score > threshold and current_price > 0:
+        # Never let the position exceed the risk manager's limit
+        budget = min(max_position_size - portfolio["stock"] * current_price, portfolio["cash"])
+        quantity = int(max(0.0, budget) // current_price)
+        if quantity > 0:
+            action = "buy"
+    elif trading_action == "bearish" and score < -threshold and portfolio["stock"] > 0:
+        action, quantity = "sell", int(portfolio["stock"])
+
+    return {
+        "action": action,
+        "quantity": quantity,
+        "confidence": round(min(abs(score), 1.0), 2),
+        "agent_signals": [
+            {"agent": agent, "signal": signal["signal"], "confidence": signal["confidence"]}
+            for agent, signal in agent_signals.items()
+        ],
+        "reasoning": f"Weighted signal score {score:.2f} (fundamental 50%, technical 35%, sentiment 15%), "
+                     f"risk action {trading_action}, max position size {max_position_size:.2f}",
+    }
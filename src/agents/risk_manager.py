@@ -4,10 +4,20 @@ import json
 from langchain_core.messages import HumanMessage
 
 from agents.state import AgentState, show_agent_reasoning
-from tools.api_vnindex import prices_to_df
-
-import json
-import ast
+from tools.frames import prices_to_df
+
+# Thresholds of the risk scoring (tuned by walk_forward.py)
+RISK_THRESHOLDS = {
+    'volatility_high': 0.30,      # annualized volatility above this adds 2 to the market risk score...
+    'volatility_moderate': 0.20,  # ...above this, 1
+    'var_high': -0.03,            # daily 95% VaR below this adds 2...
+    'var_moderate': -0.02,        # ...below this, 1
+    'drawdown_severe': -0.20,     # maximum drawdown below this adds 2...
+    'drawdown_moderate': -0.10,   # ...below this, 1
+    'low_confidence': 0.30,       # an agent confidence below this adds 4 to the risk score
+    'hold_score': 8,              # risk score from which the trading action is "hold"...
+    'reduce_score': 6,            # ...and "reduce"
+}
 
 ##### Risk Management Agent #####
 def risk_management_agent(state: AgentState):
@@ -18,24 +28,12 @@ def risk_management_agent(state: AgentState):
 
     prices_df = prices_to_df(data["prices"])
 
-    # Fetch messages from other agents
-    technical_message = next(msg for msg in state["messages"] if msg.name == "technical_analyst_agent")
-    fundamentals_message = next(msg for msg in state["messages"] if msg.name == "fundamentals_agent")
-    sentiment_message = next(msg for msg in state["messages"] if msg.name == "sentiment_agent")
-
-    try:
-        fundamental_signals = json.loads(fundamentals_message.content)
-        technical_signals = json.loads(technical_message.content)
-        sentiment_signals = json.loads(sentiment_message.content)
-    except Exception as e:
-        fundamental_signals = ast.literal_eval(fundamentals_message.content)
-        technical_signals = ast.literal_eval(technical_message.content)
-        sentiment_signals = ast.literal_eval(sentiment_message.content)
-        
+    # Outputs of the other agents
+    signals = state["signals"]
     agent_signals = {
-        "fundamental": fundamental_signals,
-        "technical": technical_signals,
-        "sentiment": sentiment_signals
+        "fundamental": signals["fundamentals_agent"],
+        "technical": signals["technical_analyst_agent"],
+        "sentiment": signals["sentiment_agent"]
     }
 
     # 1. Calculate Risk Metrics
@@ -48,23 +46,25 @@ def risk_management_agent(state: AgentState):
     # 2. Market Risk Assessment
     market_risk_score = 0
 
+    t = RISK_THRESHOLDS
+
     # Volatility scoring
-    if volatility > 0.30:     # High volatility
+    if volatility > t['volatility_high']:        # High volatility
         market_risk_score += 2
-    elif volatility > 0.20:   # Moderate volatility
+    elif volatility > t['volatility_moderate']:  # Moderate volatility
         market_risk_score += 1
 
     # VaR scoring
     # Note: var_95 is typically negative. The more negative, the worse.
-    if var_95 < -0.03:
+    if var_95 < t['var_high']:
         market_risk_score += 2
-    elif var_95 < -0.02:
+    elif var_95 < t['var_moderate']:
         market_risk_score += 1
 
     # Max Drawdown scoring
-    if max_drawdown < -0.20:  # Severe drawdown
+    if max_drawdown < t['drawdown_severe']:  # Severe drawdown
         market_risk_score += 2
-    elif max_drawdown < -0.10:
+    elif max_drawdown < t['drawdown_moderate']:
         market_risk_score += 1
 
     # 3. Position Size Limits
@@ -72,17 +72,7 @@ def risk_management_agent(state: AgentState):
     current_stock_value = portfolio['stock'] * prices_df['close'].iloc[-1]
     total_portfolio_value = portfolio['cash'] + current_stock_value
 
-    base_position_size = total_portfolio_value * 0.25  # Start with 25% max position of total portfolio
-    
-    if market_risk_score >= 4:
-        # Reduce position for high risk
-        max_position_size = base_position_size * 0.5
-    elif market_risk_score >= 2:
-        # Slightly reduce for moderate risk
-        max_position_size = base_position_size * 0.75
-    else:
-        # Keep base size for low risk
-        max_position_size = base_position_size
+    max_position_size = calculate_max_position_size(total_portfolio_value, market_risk_score)
 
     # 4. Stress Testing
     stress_test_scenarios = {
@@ -106,7 +96,7 @@ def risk_management_agent(state: AgentState):
     # Convert all confidences to numeric for proper comparison
     def parse_confidence(conf_str):
         return float(conf_str.replace('%', '')) / 100.0
-    low_confidence = any(parse_confidence(signal['confidence']) < 0.30 for signal in agent_signals.values())
+    low_confidence = any(parse_confidence(signal['confidence']) < t['low_confidence'] for signal in agent_signals.values())
 
     # Check the diversity of signals. If all three differ, add to risk score
     # (signal divergence can be seen as increased uncertainty)
@@ -124,9 +114,9 @@ def risk_management_agent(state: AgentState):
     # 6. Generate Trading Action
     # If risk is very high, hold. If moderately high, consider reducing.
     # Else, follow fundamental signal as a baseline.
-    if risk_score >= 8:
+    if risk_score >= t['hold_score']:
         trading_action = "hold"
-    elif risk_score >= 6:
+    elif risk_score >= t['reduce_score']:
         trading_action = "reduce"
     else:
         trading_action = agent_signals['fundamental']['signal']
@@ -156,5 +146,22 @@ def risk_management_agent(state: AgentState):
     if show_reasoning:
         show_agent_reasoning(message_content, "Risk Management Agent")
 
-    return {"messages": state["messages"] + [message]}
+    return {
+        "messages": [message],
+        "signals": {"risk_management_agent": message_content},
+    }
+
 
+def calculate_max_position_size(total_portfolio_value: float, market_risk_score: int) -> float:
+    """Position limit: 25% of the portfolio, scaled down as market risk rises."""
+    base_position_size = total_portfolio_value * 0.25  # Start with 25% max position of total portfolio
+    
+    if market_risk_score >= 4:
+        # Reduce position for high risk
+        return base_position_size * 0.5
+    elif market_risk_score >= 2:
+        # Slightly reduce for moderate risk
+        return base_position_size * 0.75
+    else:
+        # Keep base size for low risk
+        return base_position_size
@@ -5,19 +5,20 @@ from agents.state import AgentState, show_agent_reasoning
 
 import json
 
+import pandas as pd
+
 ##### Sentiment Agent #####
 def sentiment_agent(state: AgentState):
     """Analyzes market sentiment and generates trading signals."""
     data = state["data"]
-    insider_trades = json.loads(data["insider_trades"])
+    insider_trades = data["insider_trades"]
     show_reasoning = state["metadata"]["show_reasoning"]
 
     # Loop through the insider trades, if transaction_shares is negative, then it is a sell, which is bearish, if positive, then it is a buy, which is bullish
     signals = []
 
-    for trade in insider_trades:
-        transaction_shares = trade["transaction_shares"]
-        if not transaction_shares:
+    for transaction_shares in insider_trades["transaction_shares"]:
+        if pd.isna(transaction_shares) or not transaction_shares:
             continue
         if transaction_shares < 0:
             signals.append("bearish")
@@ -57,4 +58,5 @@ def sentiment_agent(state: AgentState):
     return {
         "messages": [message],
         "data": data,
+        "signals": {"sentiment_agent": message_content},
     }
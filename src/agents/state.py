@@ -7,6 +7,14 @@ from langchain_core.messages import BaseMessage
 import json
 
 
+# How the portfolio manager makes the final decision (metadata["decision_mode"]):
+# - "llm": always ask the LLM
+# - "auto": skip the LLM when its answer cannot change the outcome (risk says hold,
+#   or there is neither cash to buy nor stock to sell) and apply the rules instead
+# - "rules": never call the LLM, use make_rule_based_decision (fully offline)
+DECISION_MODES = ("llm", "auto", "rules")
+
+
 def merge_dicts(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
     return {**a, **b}
 
@@ -15,6 +23,8 @@ class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], operator.add]
     data: Annotated[Dict[str, Any], merge_dicts]
     metadata: Annotated[Dict[str, Any], merge_dicts]
+    # Parsed output of each agent keyed by agent name; nodes return only their own entry
+    signals: Annotated[Dict[str, Any], merge_dicts]
 
 
 
@@ -1,5 +1,6 @@
 import math
-from typing import Dict
+import weakref
+from typing import Callable, Dict, Hashable
 
 from langchain_core.messages import HumanMessage
 
@@ -9,8 +10,31 @@ import json
 import pandas as pd
 import numpy as np
 
-from tools.api_vnindex import prices_to_df
+from agents import kernels
+from tools.frames import prices_to_df
 
+# Weights of the strategies combined by weighted_signal_combination
+STRATEGY_WEIGHTS = {
+    'trend': 0.25,
+    'mean_reversion': 0.20,
+    'momentum': 0.25,
+    'volatility': 0.15,
+    'stat_arb': 0.15
+}
+
+# Thresholds of the strategy signals (swept by sweep.py)
+TECHNICAL_THRESHOLDS = {
+    'z_score': 2.0,           # mean reversion: |z-score| of price vs. its 50-day mean beyond this...
+    'price_vs_bb': 0.2,       # ...with price in the bottom (top) fifth of the Bollinger bands
+    'momentum_score': 0.05,   # momentum: |weighted 1/3/6-month return| beyond this...
+    'volume_momentum': 1.0,   # ...with volume above this multiple of its 21-day mean
+    'volatility_low': 0.8,    # volatility: regime (21-day vol / its 63-day mean) below this is low...
+    'volatility_high': 1.2,   # ...and above this is high
+    'volatility_z': 1.0,      # ...confirmed by a volatility z-score beyond this
+    'hurst': 0.4,             # stat arb: mean reverting below this Hurst exponent...
+    'skewness': 1.0,          # ...with return skewness beyond this
+    'signal': 0.2,            # ensemble: weighted score beyond this is bullish (bearish)
+}
 
 ##### Technical Analyst #####
 def technical_analyst_agent(state: AgentState):
@@ -141,21 +165,13 @@ def technical_analyst_agent(state: AgentState):
     stat_arb_signals = calculate_stat_arb_signals(prices_df)
     
     # Combine all signals using a weighted ensemble approach
-    strategy_weights = {
-        'trend': 0.25,
-        'mean_reversion': 0.20,
-        'momentum': 0.25,
-        'volatility': 0.15,
-        'stat_arb': 0.15
-    }
-    
     combined_signal = weighted_signal_combination({
         'trend': trend_signals,
         'mean_reversion': mean_reversion_signals,
         'momentum': momentum_signals,
         'volatility': volatility_signals,
         'stat_arb': stat_arb_signals
-    }, strategy_weights)
+    }, STRATEGY_WEIGHTS)
     
     # Generate detailed analysis report
     analysis_report = {
@@ -202,6 +218,7 @@ def technical_analyst_agent(state: AgentState):
     return {
         "messages": [message],
         "data": data,
+        "signals": {"technical_analyst_agent": analysis_report},
     }
 
 def calculate_trend_signals(prices_df):
@@ -251,8 +268,8 @@ def calculate_mean_reversion_signals(prices_df):
     Mean reversion strategy using statistical measures and Bollinger Bands
     """
     # Calculate z-score of price relative to moving average
-    ma_50 = prices_df['close'].rolling(window=50).mean()
-    std_50 = prices_df['close'].rolling(window=50).std()
+    ma_50 = calculate_rolling(prices_df, 'close', 50, 'mean')
+    std_50 = calculate_rolling(prices_df, 'close', 50, 'std')
     z_score = (prices_df['close'] - ma_50) / std_50
     
     # Calculate Bollinger Bands
@@ -263,14 +280,14 @@ def calculate_mean_reversion_signals(prices_df):
     rsi_28 = calculate_rsi(prices_df, 28)
     
     # Mean reversion signals
-    extreme_z_score = abs(z_score.iloc[-1]) > 2
+    extreme_z_score = abs(z_score.iloc[-1]) > TECHNICAL_THRESHOLDS['z_score']
     price_vs_bb = (prices_df['close'].iloc[-1] - bb_lower.iloc[-1]) / (bb_upper.iloc[-1] - bb_lower.iloc[-1])
     
     # Combine signals
-    if z_score.iloc[-1] < -2 and price_vs_bb < 0.2:
+    if z_score.iloc[-1] < -TECHNICAL_THRESHOLDS['z_score'] and price_vs_bb < TECHNICAL_THRESHOLDS['price_vs_bb']:
         signal = 'bullish'
         confidence = min(abs(z_score.iloc[-1]) / 4, 1.0)
-    elif z_score.iloc[-1] > 2 and price_vs_bb > 0.8:
+    elif z_score.iloc[-1] > TECHNICAL_THRESHOLDS['z_score'] and price_vs_bb > 1 - TECHNICAL_THRESHOLDS['price_vs_bb']:
         signal = 'bearish'
         confidence = min(abs(z_score.iloc[-1]) / 4, 1.0)
     else:
@@ -293,13 +310,12 @@ def calculate_momentum_signals(prices_df):
     Multi-factor momentum strategy
     """
     # Price momentum
-    returns = prices_df['close'].pct_change()
-    mom_1m = returns.rolling(21).sum()
-    mom_3m = returns.rolling(63).sum()
-    mom_6m = returns.rolling(126).sum()
+    mom_1m = calculate_rolling(prices_df, 'returns', 21, 'sum')
+    mom_3m = calculate_rolling(prices_df, 'returns', 63, 'sum')
+    mom_6m = calculate_rolling(prices_df, 'returns', 126, 'sum')
     
     # Volume momentum
-    volume_ma = prices_df['volume'].rolling(21).mean()
+    volume_ma = calculate_rolling(prices_df, 'volume', 21, 'mean')
     volume_momentum = prices_df['volume'] / volume_ma
     
     # Relative strength
@@ -313,12 +329,12 @@ def calculate_momentum_signals(prices_df):
     ).iloc[-1]
     
     # Volume confirmation
-    volume_confirmation = volume_momentum.iloc[-1] > 1.0
+    volume_confirmation = volume_momentum.iloc[-1] > TECHNICAL_THRESHOLDS['volume_momentum']
     
-    if momentum_score > 0.05 and volume_confirmation:
+    if momentum_score > TECHNICAL_THRESHOLDS['momentum_score'] and volume_confirmation:
         signal = 'bullish'
         confidence = min(abs(momentum_score) * 5, 1.0)
-    elif momentum_score < -0.05 and volume_confirmation:
+    elif momentum_score < -TECHNICAL_THRESHOLDS['momentum_score'] and volume_confirmation:
         signal = 'bearish'
         confidence = min(abs(momentum_score) * 5, 1.0)
     else:
@@ -340,11 +356,8 @@ def calculate_volatility_signals(prices_df):
     """
     Volatility-based trading strategy
     """
-    # Calculate various volatility metrics
-    returns = prices_df['close'].pct_change()
-    
     # Historical volatility
-    hist_vol = returns.rolling(21).std() * math.sqrt(252)
+    hist_vol = calculate_rolling(prices_df, 'returns', 21, 'std') * math.sqrt(252)
     
     # Volatility regime detection
     vol_ma = hist_vol.rolling(63).mean()
@@ -361,10 +374,10 @@ def calculate_volatility_signals(prices_df):
     current_vol_regime = vol_regime.iloc[-1]
     vol_z = vol_z_score.iloc[-1]
     
-    if current_vol_regime < 0.8 and vol_z < -1:
+    if current_vol_regime < TECHNICAL_THRESHOLDS['volatility_low'] and vol_z < -TECHNICAL_THRESHOLDS['volatility_z']:
         signal = 'bullish'  # Low vol regime, potential for expansion
         confidence = min(abs(vol_z) / 3, 1.0)
-    elif current_vol_regime > 1.2 and vol_z > 1:
+    elif current_vol_regime > TECHNICAL_THRESHOLDS['volatility_high'] and vol_z > TECHNICAL_THRESHOLDS['volatility_z']:
         signal = 'bearish'  # High vol regime, potential for contraction
         confidence = min(abs(vol_z) / 3, 1.0)
     else:
@@ -386,12 +399,9 @@ def calculate_stat_arb_signals(prices_df):
     """
     Statistical arbitrage signals based on price action analysis
     """
-    # Calculate price distribution statistics
-    returns = prices_df['close'].pct_change()
-    
-    # Skewness and kurtosis
-    skew = returns.rolling(63).skew()
-    kurt = returns.rolling(63).kurt()
+    # Skewness and kurtosis of returns
+    skew = calculate_rolling(prices_df, 'returns', 63, 'skew')
+    kurt = calculate_rolling(prices_df, 'returns', 63, 'kurt')
     
     # Test for mean reversion using Hurst exponent
     hurst = calculate_hurst_exponent(prices_df['close'])
@@ -400,10 +410,10 @@ def calculate_stat_arb_signals(prices_df):
     # (would include correlation with related securities in real implementation)
     
     # Generate signal based on statistical properties
-    if hurst < 0.4 and skew.iloc[-1] > 1:
+    if hurst < TECHNICAL_THRESHOLDS['hurst'] and skew.iloc[-1] > TECHNICAL_THRESHOLDS['skewness']:
         signal = 'bullish'
         confidence = (0.5 - hurst) * 2
-    elif hurst < 0.4 and skew.iloc[-1] < -1:
+    elif hurst < TECHNICAL_THRESHOLDS['hurst'] and skew.iloc[-1] < -TECHNICAL_THRESHOLDS['skewness']:
         signal = 'bearish'
         confidence = (0.5 - hurst) * 2
     else:
@@ -449,9 +459,9 @@ def weighted_signal_combination(signals, weights):
         final_score = 0
     
     # Convert back to signal
-    if final_score > 0.2:
+    if final_score > TECHNICAL_THRESHOLDS['signal']:
         signal = 'bullish'
-    elif final_score < -0.2:
+    elif final_score < -TECHNICAL_THRESHOLDS['signal']:
         signal = 'bearish'
     else:
         signal = 'neutral'
@@ -473,32 +483,99 @@ def normalize_pandas(obj):
         return [normalize_pandas(item) for item in obj]
     return obj
 
+##### Indicator Cache #####
+class IndicatorCache:
+    """
+    Memoized feature frame bound to one price frame.
+
+    Indicator series are stored under an (indicator, *params) key, so each primitive
+    (returns, a rolling window, true range, RSI, ...) is computed once per price frame
+    however many strategies read it. Cached series are shared and must not be modified,
+    and the price frame must not be modified after its first indicator is computed.
+    """
+
+    def __init__(self):
+        self.features = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, compute: Callable[[], object]):
+        if key in self.features:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.features[key] = compute()
+        return self.features[key]
+
+
+_indicator_caches: Dict[int, IndicatorCache] = {}
+
+def indicator_cache(prices_df: pd.DataFrame) -> IndicatorCache:
+    """Return the IndicatorCache bound to prices_df, dropped when the frame is garbage collected."""
+    key = id(prices_df)
+    cache = _indicator_caches.get(key)
+    if cache is None:
+        cache = _indicator_caches[key] = IndicatorCache()
+        weakref.finalize(prices_df, _indicator_caches.pop, key, None)
+    return cache
+
+def calculate_returns(prices_df: pd.DataFrame) -> pd.Series:
+    """Close-to-close percentage returns"""
+    return indicator_cache(prices_df).get(
+        ('returns',), lambda: prices_df['close'].pct_change()
+    )
+
+def calculate_rolling(prices_df: pd.DataFrame, column: str, window: int, stat: str) -> pd.Series:
+    """
+    Rolling statistic of a price column
+    
+    Args:
+        prices_df: DataFrame with price data
+        column: price column, or 'returns' for close-to-close returns
+        window: rolling window length
+        stat: 'mean', 'std', 'sum', 'skew' or 'kurt'
+    
+    Returns:
+        pd.Series: rolling statistic
+    """
+    def compute():
+        series = calculate_returns(prices_df) if column == 'returns' else prices_df[column]
+        return getattr(series.rolling(window), stat)()
+
+    return indicator_cache(prices_df).get(('rolling', column, window, stat), compute)
+
 def calculate_macd(prices_df: pd.DataFrame) -> tuple[pd.Series, pd.Series]:
-    ema_12 = prices_df['close'].ewm(span=12, adjust=False).mean()
-    ema_26 = prices_df['close'].ewm(span=26, adjust=False).mean()
-    macd_line = ema_12 - ema_26
-    signal_line = macd_line.ewm(span=9, adjust=False).mean()
-    return macd_line, signal_line
+    def compute():
+        macd_line = calculate_ema(prices_df, 12) - calculate_ema(prices_df, 26)
+        signal_line = macd_line.ewm(span=9, adjust=False).mean()
+        return macd_line, signal_line
+
+    return indicator_cache(prices_df).get(('macd', 12, 26, 9), compute)
 
 def calculate_rsi(prices_df: pd.DataFrame, period: int = 14) -> pd.Series:
-    delta = prices_df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).fillna(0)
-    loss = (-delta.where(delta < 0, 0)).fillna(0)
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+    def compute():
+        delta = prices_df['close'].diff()
+        gain = (delta.where(delta > 0, 0)).fillna(0)
+        loss = (-delta.where(delta < 0, 0)).fillna(0)
+        avg_gain = gain.rolling(window=period).mean()
+        avg_loss = loss.rolling(window=period).mean()
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+    return indicator_cache(prices_df).get(('rsi', period), compute)
 
 def calculate_bollinger_bands(
     prices_df: pd.DataFrame,
     window: int = 20
 ) -> tuple[pd.Series, pd.Series]:
-    sma = prices_df['close'].rolling(window).mean()
-    std_dev = prices_df['close'].rolling(window).std()
-    upper_band = sma + (std_dev * 2)
-    lower_band = sma - (std_dev * 2)
-    return upper_band, lower_band
+    def compute():
+        sma = calculate_rolling(prices_df, 'close', window, 'mean')
+        std_dev = calculate_rolling(prices_df, 'close', window, 'std')
+        upper_band = sma + (std_dev * 2)
+        lower_band = sma - (std_dev * 2)
+        return upper_band, lower_band
+
+    return indicator_cache(prices_df).get(('bollinger', window), compute)
 
 def calculate_ema(df: pd.DataFrame, window: int) -> pd.Series:
     """
@@ -511,7 +588,25 @@ def calculate_ema(df: pd.DataFrame, window: int) -> pd.Series:
     Returns:
         pd.Series: EMA values
     """
-    return df['close'].ewm(span=window, adjust=False).mean()
+    return indicator_cache(df).get(
+        ('ema', window), lambda: df['close'].ewm(span=window, adjust=False).mean()
+    )
+
+def calculate_true_range(df: pd.DataFrame) -> pd.Series:
+    """
+    Calculate True Range
+    
+    Args:
+        df: DataFrame with OHLC data
+    
+    Returns:
+        pd.Series: True Range values
+    """
+    def compute():
+        true_range = kernels.true_range(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy())
+        return pd.Series(true_range, index=df.index)
+
+    return indicator_cache(df).get(('true_range',), compute)
 
 def calculate_adx(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
     """
@@ -524,36 +619,13 @@ def calculate_adx(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
     Returns:
         DataFrame with ADX values
     """
-    # Calculate True Range
-    df['high_low'] = df['high'] - df['low']
-    df['high_close'] = abs(df['high'] - df['close'].shift())
-    df['low_close'] = abs(df['low'] - df['close'].shift())
-    df['tr'] = df[['high_low', 'high_close', 'low_close']].max(axis=1)
-    
-    # Calculate Directional Movement
-    df['up_move'] = df['high'] - df['high'].shift()
-    df['down_move'] = df['low'].shift() - df['low']
-    
-    df['plus_dm'] = np.where(
-        (df['up_move'] > df['down_move']) & (df['up_move'] > 0),
-        df['up_move'],
-        0
-    )
-    df['minus_dm'] = np.where(
-        (df['down_move'] > df['up_move']) & (df['down_move'] > 0),
-        df['down_move'],
-        0
-    )
-    
-    # Calculate ADX
-    df['+di'] = 100 * (df['plus_dm'].ewm(span=period).mean() / 
-                       df['tr'].ewm(span=period).mean())
-    df['-di'] = 100 * (df['minus_dm'].ewm(span=period).mean() / 
-                       df['tr'].ewm(span=period).mean())
-    df['dx'] = 100 * abs(df['+di'] - df['-di']) / (df['+di'] + df['-di'])
-    df['adx'] = df['dx'].ewm(span=period).mean()
-    
-    return df[['adx', '+di', '-di']]
+    def compute():
+        adx, plus_di, minus_di = kernels.adx(
+            df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy(), period
+        )
+        return pd.DataFrame({'adx': adx, '+di': plus_di, '-di': minus_di}, index=df.index)
+
+    return indicator_cache(df).get(('adx', period), compute)
 
 def calculate_ichimoku(df: pd.DataFrame) -> Dict[str, pd.Series]:
     """
@@ -605,14 +677,9 @@ def calculate_atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
     Returns:
         pd.Series: ATR values
     """
-    high_low = df['high'] - df['low']
-    high_close = abs(df['high'] - df['close'].shift())
-    low_close = abs(df['low'] - df['close'].shift())
-    
-    ranges = pd.concat([high_low, high_close, low_close], axis=1)
-    true_range = ranges.max(axis=1)
-    
-    return true_range.rolling(period).mean()
+    return indicator_cache(df).get(
+        ('atr', period), lambda: calculate_true_range(df).rolling(period).mean()
+    )
 
 def calculate_hurst_exponent(price_series: pd.Series, max_lag: int = 20) -> float:
     """
@@ -629,8 +696,10 @@ def calculate_hurst_exponent(price_series: pd.Series, max_lag: int = 20) -> floa
         float: Hurst exponent
     """
     lags = range(2, max_lag)
+    # Work on the raw values: subtracting two shifted Series would align them on the index
+    prices = np.asarray(price_series, dtype=float)
     # Add small epsilon to avoid log(0)
-    tau = [max(1e-8, np.sqrt(np.std(np.subtract(price_series[lag:], price_series[:-lag])))) for lag in lags]
+    tau = [max(1e-8, np.sqrt(np.std(np.subtract(prices[lag:], prices[:-lag])))) for lag in lags]
     
     # Return the Hurst exponent from linear fit
     try:
@@ -641,13 +710,8 @@ def calculate_hurst_exponent(price_series: pd.Series, max_lag: int = 20) -> floa
         return 0.5
 
 def calculate_obv(prices_df: pd.DataFrame) -> pd.Series:
-    obv = [0]
-    for i in range(1, len(prices_df)):
-        if prices_df['close'].iloc[i] > prices_df['close'].iloc[i - 1]:
-            obv.append(obv[-1] + prices_df['volume'].iloc[i])
-        elif prices_df['close'].iloc[i] < prices_df['close'].iloc[i - 1]:
-            obv.append(obv[-1] - prices_df['volume'].iloc[i])
-        else:
-            obv.append(obv[-1])
-    prices_df['OBV'] = obv
-    return prices_df['OBV']
+    def compute():
+        obv = kernels.obv(prices_df['close'].to_numpy(), prices_df['volume'].to_numpy())
+        return pd.Series(obv, index=prices_df.index, name='OBV')
+
+    return indicator_cache(prices_df).get(('obv',), compute)
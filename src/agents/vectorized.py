@@ -0,0 +1,364 @@
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from agents.fundamentals import analyze_fundamentals
+from agents.risk_manager import RISK_THRESHOLDS
+from agents.technicals import (
+    STRATEGY_WEIGHTS,
+    TECHNICAL_THRESHOLDS,
+    calculate_adx,
+    calculate_bollinger_bands,
+    calculate_ema,
+    calculate_rolling,
+)
+from tools.providers import DataProvider, get_provider
+
+# Signals are encoded as -1 (bearish), 0 (neutral), 1 (bullish)
+SIGNAL_VALUES = {'bearish': -1, 'neutral': 0, 'bullish': 1}
+SIGNAL_NAMES = np.array(['bearish', 'neutral', 'bullish'])
+
+
+##### Vectorized Agent Signals #####
+# Per-bar versions of the agents' signal logic. Every indicator is computed once
+# over the full history and only looks backwards, so row t holds what the agents
+# would conclude from the data available at the close of bar t.
+
+def _signal(bullish, bearish) -> np.ndarray:
+    return np.where(bullish, 1, np.where(bearish, -1, 0))
+
+
+def rolling_hurst_exponent(close: pd.Series, window: int = 63, max_lag: int = 20) -> np.ndarray:
+    """
+    Hurst exponent of every trailing ``window`` of prices, computed the same way
+    as calculate_hurst_exponent but for all bars at once.
+    """
+    prices = pd.Series(np.asarray(close, dtype=float))
+    lags = np.arange(2, max_lag)
+
+    log_tau = np.column_stack([
+        np.log(np.maximum(1e-8, np.sqrt(prices.diff(lag).rolling(window - lag).std(ddof=0).to_numpy())))
+        for lag in lags
+    ])
+
+    # Slope of the least-squares fit of log(tau) on log(lag), row by row
+    x = np.log(lags) - np.log(lags).mean()
+    hurst = (log_tau - log_tau.mean(axis=1, keepdims=True)) @ x / (x @ x)
+    hurst[:window - 1] = np.nan
+    return hurst
+
+
+def technical_features(prices_df: pd.DataFrame, hurst_window: int = 63) -> pd.DataFrame:
+    """Indicator values behind each technical strategy, one row per bar."""
+    close = prices_df['close']
+
+    # Trend following
+    adx = calculate_adx(prices_df, 14)['adx']
+
+    # Mean reversion
+    ma_50 = calculate_rolling(prices_df, 'close', 50, 'mean')
+    std_50 = calculate_rolling(prices_df, 'close', 50, 'std')
+    bb_upper, bb_lower = calculate_bollinger_bands(prices_df)
+
+    # Momentum
+    momentum_score = (
+        0.4 * calculate_rolling(prices_df, 'returns', 21, 'sum') +
+        0.3 * calculate_rolling(prices_df, 'returns', 63, 'sum') +
+        0.3 * calculate_rolling(prices_df, 'returns', 126, 'sum')
+    )
+    volume_momentum = prices_df['volume'] / calculate_rolling(prices_df, 'volume', 21, 'mean')
+
+    # Volatility
+    hist_vol = calculate_rolling(prices_df, 'returns', 21, 'std') * math.sqrt(252)
+    vol_ma = hist_vol.rolling(63).mean()
+
+    return pd.DataFrame({
+        'close': close,
+        'ema_8': calculate_ema(prices_df, 8),
+        'ema_21': calculate_ema(prices_df, 21),
+        'ema_55': calculate_ema(prices_df, 55),
+        'adx': adx,
+        'z_score': (close - ma_50) / std_50,
+        'price_vs_bb': (close - bb_lower) / (bb_upper - bb_lower),
+        'momentum_score': momentum_score,
+        'volume_momentum': volume_momentum,
+        'volatility_regime': hist_vol / vol_ma,
+        'volatility_z_score': (hist_vol - vol_ma) / hist_vol.rolling(63).std(),
+        'skewness': calculate_rolling(prices_df, 'returns', 63, 'skew'),
+        'hurst': rolling_hurst_exponent(close, hurst_window),
+    }, index=prices_df.index)
+
+
+def technical_strategy_arrays(features: pd.DataFrame, thresholds: Optional[Dict[str, Any]] = None) -> Dict[str, tuple]:
+    """
+    Signal and confidence of each technical strategy for every bar. A threshold given as a
+    (P, 1) array evaluates P settings at once, giving (P, bars) arrays for the strategies it affects.
+    """
+    t = {**TECHNICAL_THRESHOLDS, **(thresholds or {})}
+    f = {col: features[col].to_numpy() for col in features.columns}
+    signals = {}
+
+    with np.errstate(invalid='ignore'):
+        # Trend following
+        short_trend = f['ema_8'] > f['ema_21']
+        medium_trend = f['ema_21'] > f['ema_55']
+        bullish, bearish = short_trend & medium_trend, ~short_trend & ~medium_trend
+        signals['trend'] = (_signal(bullish, bearish), np.where(bullish | bearish, f['adx'] / 100.0, 0.5))
+
+        # Mean reversion
+        z, bb = f['z_score'], f['price_vs_bb']
+        bullish = (z < -t['z_score']) & (bb < t['price_vs_bb'])
+        bearish = (z > t['z_score']) & (bb > 1 - t['price_vs_bb'])
+        signals['mean_reversion'] = (_signal(bullish, bearish), np.where(bullish | bearish, np.minimum(np.abs(z) / 4, 1.0), 0.5))
+
+        # Momentum
+        score, volume_confirmation = f['momentum_score'], f['volume_momentum'] > t['volume_momentum']
+        bullish, bearish = (score > t['momentum_score']) & volume_confirmation, (score < -t['momentum_score']) & volume_confirmation
+        signals['momentum'] = (_signal(bullish, bearish), np.where(bullish | bearish, np.minimum(np.abs(score) * 5, 1.0), 0.5))
+
+        # Volatility
+        regime, vol_z = f['volatility_regime'], f['volatility_z_score']
+        bullish = (regime < t['volatility_low']) & (vol_z < -t['volatility_z'])
+        bearish = (regime > t['volatility_high']) & (vol_z > t['volatility_z'])
+        signals['volatility'] = (_signal(bullish, bearish), np.where(bullish | bearish, np.minimum(np.abs(vol_z) / 3, 1.0), 0.5))
+
+        # Statistical arbitrage
+        hurst, skew = f['hurst'], f['skewness']
+        bullish = (hurst < t['hurst']) & (skew > t['skewness'])
+        bearish = (hurst < t['hurst']) & (skew < -t['skewness'])
+        signals['stat_arb'] = (_signal(bullish, bearish), np.where(bullish | bearish, (0.5 - hurst) * 2, 0.5))
+
+    return signals
+
+
+def technical_score_arrays(signals: Dict[str, tuple], strategy_weights: Optional[Dict[str, Any]] = None) -> np.ndarray:
+    """
+    Weighted ensemble score of the strategy signals for every bar (see weighted_signal_combination).
+    Weights may be (P, 1) arrays, like the thresholds of technical_strategy_arrays.
+    """
+    strategy_weights = strategy_weights or STRATEGY_WEIGHTS
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weighted_sum = sum(strategy_weights[name] * signal * confidence for name, (signal, confidence) in signals.items())
+        total_confidence = sum(strategy_weights[name] * confidence for name, (_, confidence) in signals.items())
+        final_score = np.where(total_confidence > 0, weighted_sum / total_confidence, 0.0)
+    return np.nan_to_num(final_score)
+
+
+def technical_signal_arrays(
+        features: pd.DataFrame,
+        strategy_weights: Optional[Dict[str, float]] = None,
+        thresholds: Optional[Dict[str, float]] = None,
+) -> pd.DataFrame:
+    """Strategy signals and their weighted combination for every bar (see technical_analyst_agent)."""
+    t = {**TECHNICAL_THRESHOLDS, **(thresholds or {})}
+    signals = technical_strategy_arrays(features, t)
+    final_score = technical_score_arrays(signals, strategy_weights)
+
+    result = {}
+    for name, (signal, confidence) in signals.items():
+        result[f'{name}_signal'] = signal
+        result[f'{name}_confidence'] = confidence
+    result['signal'] = _signal(final_score > t['signal'], final_score < -t['signal'])
+    result['confidence'] = np.abs(final_score)
+    return pd.DataFrame(result, index=features.index)
+
+
+def market_risk_scores(volatility, var_95, max_drawdown, thresholds: Optional[Dict[str, Any]] = None) -> np.ndarray:
+    """Market risk score (0-6) of every bar from its risk metrics (see risk_management_agent)."""
+    t = {**RISK_THRESHOLDS, **(thresholds or {})}
+    with np.errstate(invalid='ignore'):
+        return (
+            np.where(volatility > t['volatility_high'], 2, np.where(volatility > t['volatility_moderate'], 1, 0)) +
+            np.where(var_95 < t['var_high'], 2, np.where(var_95 < t['var_moderate'], 1, 0)) +
+            np.where(max_drawdown < t['drawdown_severe'], 2, np.where(max_drawdown < t['drawdown_moderate'], 1, 0))
+        )
+
+
+def risk_metric_arrays(prices_df: pd.DataFrame, window: int = 63, thresholds: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """Volatility, VaR, drawdown and market risk score over a trailing window of prices (see risk_management_agent)."""
+    close = prices_df['close']
+    returns = close.pct_change()
+
+    volatility = returns.rolling(window - 1).std().to_numpy() * (252 ** 0.5)
+    var_95 = returns.rolling(window - 1).quantile(0.05).to_numpy()
+
+    max_drawdown = np.full(len(close), np.nan)
+    if len(close) >= window:
+        windows = sliding_window_view(close.to_numpy(dtype=float), window)
+        max_drawdown[window - 1:] = (windows / np.maximum.accumulate(windows, axis=1) - 1).min(axis=1)
+
+    return pd.DataFrame({
+        'volatility': volatility,
+        'value_at_risk_95': var_95,
+        'max_drawdown': max_drawdown,
+        'market_risk_score': market_risk_scores(volatility, var_95, max_drawdown, thresholds),
+    }, index=prices_df.index)
+
+
+def sentiment_signal_arrays(insider_trades: pd.DataFrame, dates: pd.DatetimeIndex) -> pd.DataFrame:
+    """Insider-trade sentiment using every trade announced on or before each date (see sentiment_agent)."""
+    if len(insider_trades) == 0:
+        return pd.DataFrame({'signal': 0, 'confidence': 0.0}, index=dates)
+
+    trades = insider_trades[insider_trades['transaction_shares'].fillna(0) != 0]
+    announced = pd.to_datetime(trades['deal_announce_date']).to_numpy()
+    order = np.argsort(announced)
+    shares = trades['transaction_shares'].to_numpy()[order]
+
+    bullish_cum = np.concatenate([[0], np.cumsum(shares > 0)])
+    bearish_cum = np.concatenate([[0], np.cumsum(shares < 0)])
+    idx = np.searchsorted(announced[order], dates.to_numpy(), side='right')
+    bullish, bearish = bullish_cum[idx], bearish_cum[idx]
+
+    total = bullish + bearish
+    confidence = np.divide(np.maximum(bullish, bearish), total, out=np.zeros(len(dates)), where=total > 0)
+    return pd.DataFrame({'signal': _signal(bullish > bearish, bearish > bullish), 'confidence': confidence}, index=dates)
+
+
+def fundamental_signal_arrays(metrics_by_year: Dict[int, Optional[dict]], dates: pd.DatetimeIndex) -> pd.DataFrame:
+    """
+    Fundamental signal for each date, scored from the previous year's report
+    (see fundamentals_agent). Years without a report are neutral with zero confidence.
+    """
+    by_year = {}
+    for year in np.unique(dates.year):
+        metrics = metrics_by_year.get(year - 1)
+        if metrics is None:
+            by_year[year] = (0, 0.0)
+            continue
+        content = analyze_fundamentals(dict(metrics))
+        by_year[year] = (
+            SIGNAL_VALUES[content['signal']],
+            float(content['confidence'].replace('%', '')) / 100.0,
+        )
+
+    signal = np.array([by_year[year][0] for year in dates.year], dtype=int)
+    confidence = np.array([by_year[year][1] for year in dates.year], dtype=float)
+    return pd.DataFrame({'signal': signal, 'confidence': confidence}, index=dates)
+
+
+def risk_action_arrays(
+        market_risk_score: np.ndarray,
+        agent_signals: Dict[str, pd.DataFrame],
+        thresholds: Optional[Dict[str, Any]] = None,
+) -> pd.DataFrame:
+    """Risk score and trading action for every bar (see risk_management_agent)."""
+    t = {**RISK_THRESHOLDS, **(thresholds or {})}
+    # The agent sees confidences rounded to whole percents
+    confidences = [np.round(signals['confidence'].to_numpy() * 100) / 100 for signals in agent_signals.values()]
+    low_confidence = np.any(np.stack(confidences) < t['low_confidence'], axis=0)
+
+    fundamental, technical, sentiment = (agent_signals[name]['signal'].to_numpy() for name in ('fundamental', 'technical', 'sentiment'))
+    signal_divergence = (fundamental != technical) & (technical != sentiment) & (fundamental != sentiment)
+
+    risk_score = np.minimum(np.round(market_risk_score * 2 + low_confidence * 4 + signal_divergence * 2), 10).astype(int)
+    trading_action = np.where(risk_score >= t['hold_score'], 'hold', np.where(risk_score >= t['reduce_score'], 'reduce', SIGNAL_NAMES[fundamental + 1]))
+    return pd.DataFrame({'risk_score': risk_score, 'trading_action': trading_action}, index=agent_signals['fundamental'].index)
+
+
+def compute_signal_frame(
+        prices_df: pd.DataFrame,
+        insider_trades: pd.DataFrame,
+        metrics_by_year: Dict[int, Optional[dict]],
+        strategy_weights: Optional[Dict[str, float]] = None,
+        risk_window: int = 63,
+        features: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """All agent signals for every bar of ``prices_df`` in one frame; ``features`` reuses computed technical_features."""
+    dates = prices_df.index
+    if features is None:
+        features = technical_features(prices_df)
+    agent_signals = {
+        'technical': technical_signal_arrays(features, strategy_weights)[['signal', 'confidence']],
+        'fundamental': fundamental_signal_arrays(metrics_by_year, dates),
+        'sentiment': sentiment_signal_arrays(insider_trades, dates),
+    }
+    risk = risk_metric_arrays(prices_df, risk_window)
+    actions = risk_action_arrays(risk['market_risk_score'].to_numpy(), agent_signals)
+
+    frame = pd.DataFrame({'close': prices_df['close']}, index=dates)
+    for name, signals in agent_signals.items():
+        frame[f'{name}_signal'] = SIGNAL_NAMES[signals['signal'].to_numpy() + 1]
+        frame[f'{name}_confidence'] = signals['confidence'].to_numpy()
+    return pd.concat([frame, risk, actions], axis=1)
+
+
+def tune_signal_frame(
+        frame: pd.DataFrame,
+        features: pd.DataFrame,
+        strategy_weights: Optional[Dict[str, float]] = None,
+        thresholds: Optional[Dict[str, float]] = None,
+        risk_thresholds: Optional[Dict[str, float]] = None,
+) -> pd.DataFrame:
+    """
+    ``frame`` (from compute_signal_frame) with the technical signal recomputed from the
+    already computed ``features`` with other weights and thresholds, and the market risk
+    scores and trading actions rescored with ``risk_thresholds``. The other agents'
+    signals and the risk metrics themselves are kept.
+    """
+    technical = technical_signal_arrays(features.loc[frame.index], strategy_weights, thresholds)
+    agent_signals = {
+        name: pd.DataFrame({
+            'signal': frame[f'{name}_signal'].map(SIGNAL_VALUES).to_numpy(),
+            'confidence': frame[f'{name}_confidence'].to_numpy(),
+        }, index=frame.index)
+        for name in ('fundamental', 'sentiment')
+    }
+    agent_signals['technical'] = technical[['signal', 'confidence']]
+    market_risk_score = market_risk_scores(
+        frame['volatility'].to_numpy(), frame['value_at_risk_95'].to_numpy(), frame['max_drawdown'].to_numpy(), risk_thresholds,
+    )
+    actions = risk_action_arrays(market_risk_score, agent_signals, risk_thresholds)
+
+    frame = frame.copy()
+    frame['market_risk_score'] = market_risk_score
+    frame['technical_signal'] = SIGNAL_NAMES[technical['signal'].to_numpy() + 1]
+    frame['technical_confidence'] = technical['confidence'].to_numpy()
+    frame[actions.columns] = actions
+    return frame
+
+
+def load_signal_inputs(
+    ticker: str,
+    start_date: str,
+    end_date: str,
+    lookback_days: int = 365,
+    provider: Union[str, DataProvider, None] = None,
+) -> tuple:
+    """
+    Fetch the whole history needed for a backtest once: prices (with ``lookback_days``
+    of extra history to warm up the longest indicator windows), insider trades and the
+    financial metrics of every year, as compute_signal_frame takes them.
+    """
+    provider = get_provider(provider)
+    history_start = (datetime.strptime(start_date, '%Y-%m-%d') - timedelta(days=lookback_days)).strftime('%Y-%m-%d')
+    prices_df = provider.get_prices(ticker, history_start, end_date)
+
+    insider_trades = provider.get_insider_trades(ticker=ticker, end_date=end_date)
+
+    # get_financial_metrics returns the report of the year before report_period
+    metrics_by_year = {}
+    for year in range(int(start_date[:4]), int(end_date[:4]) + 1):
+        try:
+            metrics = provider.get_financial_metrics(ticker=ticker, report_period=f'{year}-12-31')
+        except Exception as e:
+            print(f'Error fetching financial metrics for {year - 1}: {e}')
+            metrics = None
+        metrics_by_year[year - 1] = metrics.iloc[0].to_dict() if metrics is not None else None
+
+    return prices_df, insider_trades, metrics_by_year
+
+
+def load_signal_frame(
+    ticker: str,
+    start_date: str,
+    end_date: str,
+    lookback_days: int = 365,
+    provider: Union[str, DataProvider, None] = None,
+) -> pd.DataFrame:
+    """Fetch the whole history needed for a backtest once and compute the signal frame."""
+    return compute_signal_frame(*load_signal_inputs(ticker, start_date, end_date, lookback_days, provider))
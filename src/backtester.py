@@ -1,20 +1,43 @@
 from datetime import datetime, timedelta
+from functools import partial
 
-import matplotlib.pyplot as plt
 import pandas as pd
 
+from agents.portfolio_manager import make_rule_based_decision
+from agents.risk_manager import calculate_max_position_size
+from agents.state import DECISION_MODES
+from agents.vectorized import load_signal_frame
 from main import run_hedge_fund
-from tools.api import get_price_data
+from tools.checkpoint import CHECKPOINT_EVERY, checkpoint_path, load_checkpoint, remove_checkpoint, save_checkpoint
+from tools.providers import PROVIDERS, FrameProvider, get_provider, provider_name
+from tools.replay import REPLAY_MODES, set_replay_mode
 
 class Backtester:
-    def __init__(self, agent, ticker, start_date, end_date, initial_capital):
+    def __init__(self, agent, ticker, start_date, end_date, initial_capital, data_provider=None, lookback_days=30, verbose=True,
+                 checkpoint_path=None, checkpoint_every=CHECKPOINT_EVERY, decision_mode=None):
         self.agent = agent
+        # How the agent decides (see DECISION_MODES) and where its data comes from; a
+        # checkpoint only resumes a backtest with the same ones
+        self.decision_mode = decision_mode
+        self.data_provider = provider_name(data_provider)
         self.ticker = ticker
         self.start_date = start_date
         self.end_date = end_date
         self.initial_capital = initial_capital
+        self.lookback_days = lookback_days
+        # Prices of the whole backtest are loaded once and each day reads a slice of them
+        self.provider = FrameProvider(get_provider(data_provider))
         self.portfolio = {"cash": initial_capital, "stock": 0}
         self.portfolio_values = []
+        self.trades = 0
+        # Print every simulated day; off for batch runs
+        self.verbose = verbose
+        # Agent output of each simulated day, and the last day recorded
+        self.agent_outputs = {}
+        self.cursor = None
+        # State is saved to checkpoint_path every checkpoint_every days and when the run fails
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
 
     def parse_action(self, agent_output):
         try:
@@ -51,57 +74,143 @@ class Backtester:
             return 0
         return 0
 
-    def run_backtest(self):
+    def run_backtest(self, resume=False):
+        """Simulate every business day; with ``resume``, continue from the checkpoint if there is one."""
         dates = pd.date_range(self.start_date, self.end_date, freq="B")
+        history_start = (pd.Timestamp(self.start_date) - timedelta(days=self.lookback_days)).strftime("%Y-%m-%d")
+        self.provider.prefetch(self.ticker, history_start, self.end_date)
 
-        print("\nStarting backtest...")
-        print(f"{'Date':<12} {'Ticker':<6} {'Action':<6} {'Quantity':>8} {'Price':>8} {'Cash':>12} {'Stock':>8} {'Total Value':>12}")
-        print("-" * 100)
+        if resume:
+            self.restore_checkpoint()
+        if self.verbose:
+            print("\nStarting backtest...")
+            self.print_header()
+
+        try:
+            for current_date in dates:
+                if self.cursor is not None and current_date <= self.cursor:
+                    continue
+                self.simulate_day(current_date)
+                if self.checkpoint_path and self.checkpoint_every and len(self.portfolio_values) % self.checkpoint_every == 0:
+                    self.save_checkpoint()
+        except BaseException:
+            # Keep what was done so far (including a failed day's agent output) for --resume
+            if self.checkpoint_path:
+                self.save_checkpoint()
+                print(f"Backtest interrupted; checkpoint saved to {self.checkpoint_path}")
+            raise
+
+        if self.checkpoint_path:
+            remove_checkpoint(self.checkpoint_path)
 
-        for current_date in dates:
-            lookback_start = (current_date - timedelta(days=30)).strftime("%Y-%m-%d")
-            current_date_str = current_date.strftime("%Y-%m-%d")
+    def simulate_day(self, current_date):
+        lookback_start = (current_date - timedelta(days=self.lookback_days)).strftime("%Y-%m-%d")
+        current_date_str = current_date.strftime("%Y-%m-%d")
 
+        # A day that failed after the agent answered reuses its output when resumed
+        agent_output = self.agent_outputs.get(current_date_str)
+        if agent_output is None:
             agent_output = self.agent(
                 ticker=self.ticker,
                 start_date=lookback_start,
                 end_date=current_date_str,
-                portfolio=self.portfolio
+                portfolio=self.portfolio,
+                data_provider=self.provider,
             )
+            self.agent_outputs[current_date_str] = agent_output
 
-            action, quantity = self.parse_action(agent_output)
-            df = get_price_data(self.ticker, lookback_start, current_date_str)
-            current_price = df.iloc[-1]['close']
+        action, quantity = self.parse_action(agent_output)
+        df = self.provider.get_prices(self.ticker, lookback_start, current_date_str)
+        current_price = df.iloc[-1]['close']
 
-            # Execute the trade with validation
-            executed_quantity = self.execute_trade(action, quantity, current_price)
+        # Execute the trade with validation
+        executed_quantity = self.execute_trade(action, quantity, current_price)
 
-            # Update total portfolio value
-            total_value = self.portfolio["cash"] + self.portfolio["stock"] * current_price
-            self.portfolio["portfolio_value"] = total_value
+        # Update total portfolio value
+        total_value = self.portfolio["cash"] + self.portfolio["stock"] * current_price
+        self.portfolio["portfolio_value"] = total_value
 
-            # Log the current state with executed quantity
+        # Log the current state with executed quantity
+        self.record_day(current_date, action, executed_quantity, current_price, total_value)
+
+    def print_header(self):
+        print(f"{'Date':<12} {'Ticker':<6} {'Action':<6} {'Quantity':>8} {'Price':>8} {'Cash':>12} {'Stock':>8} {'Total Value':>12}")
+        print("-" * 100)
+
+    def record_day(self, current_date, action, executed_quantity, current_price, total_value):
+        """Record the portfolio value of a simulated day and print it when verbose."""
+        if executed_quantity:
+            self.trades += 1
+        if self.verbose:
             print(
                 f"{current_date.strftime('%Y-%m-%d'):<12} {self.ticker:<6} {action:<6} {executed_quantity:>8} {current_price:>8.2f} "
                 f"{self.portfolio['cash']:>12.2f} {self.portfolio['stock']:>8} {total_value:>12.2f}"
             )
+        self.portfolio_values.append(
+            {"Date": current_date, "Portfolio Value": total_value}
+        )
+        self.cursor = current_date
 
-            # Record the portfolio value
-            self.portfolio_values.append(
-                {"Date": current_date, "Portfolio Value": total_value}
-            )
+    def run_settings(self):
+        return {
+            "ticker": self.ticker,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "initial_capital": self.initial_capital,
+            "lookback_days": self.lookback_days,
+            "decision_mode": self.decision_mode,
+            "data_provider": self.data_provider,
+        }
+
+    def save_checkpoint(self):
+        save_checkpoint(self.checkpoint_path, {
+            "settings": self.run_settings(),
+            "cursor": self.cursor,
+            "portfolio": dict(self.portfolio),
+            "portfolio_values": list(self.portfolio_values),
+            "trades": self.trades,
+            "agent_outputs": dict(self.agent_outputs),
+        })
+
+    def restore_checkpoint(self):
+        """Continue from the state saved at checkpoint_path, if any. The checkpoint must be of the same backtest."""
+        state = load_checkpoint(self.checkpoint_path) if self.checkpoint_path else None
+        if state is None:
+            print("No checkpoint to resume from; starting from the first day")
+            return
+        if state["settings"] != self.run_settings():
+            raise ValueError(f"Checkpoint {self.checkpoint_path} is of another backtest: {state['settings']}")
+        self.cursor = state["cursor"]
+        self.portfolio = state["portfolio"]
+        self.portfolio_values = state["portfolio_values"]
+        self.trades = state["trades"]
+        self.agent_outputs = state["agent_outputs"]
+        if self.cursor is not None:
+            print(f"Resuming after {self.cursor.strftime('%Y-%m-%d')} ({len(self.portfolio_values)} days done)")
+
+    def performance_metrics(self):
+        """Total return, Sharpe ratio (252 trading days a year), maximum drawdown, final value and trade count."""
+        values = pd.DataFrame(self.portfolio_values).set_index("Date")["Portfolio Value"]
+        daily_returns = values.pct_change()
+        std_daily_return = daily_returns.std()
+        return {
+            "total_return": (self.portfolio["portfolio_value"] - self.initial_capital) / self.initial_capital,
+            "sharpe_ratio": daily_returns.mean() / std_daily_return * (252 ** 0.5) if std_daily_return > 0 else float("nan"),
+            "max_drawdown": (values / values.cummax() - 1).min(),
+            "final_value": self.portfolio["portfolio_value"],
+            "trades": self.trades,
+        }
 
     def analyze_performance(self):
         # Convert portfolio values to DataFrame
         performance_df = pd.DataFrame(self.portfolio_values).set_index("Date")
+        metrics = self.performance_metrics()
 
         # Calculate total return
-        total_return = (
-                           self.portfolio["portfolio_value"] - self.initial_capital
-                       ) / self.initial_capital
-        print(f"Total Return: {total_return * 100:.2f}%")
+        print(f"Total Return: {metrics['total_return'] * 100:.2f}%")
 
-        # Plot the portfolio value over time
+        # Plot the portfolio value over time (matplotlib is only loaded when plotting)
+        import matplotlib.pyplot as plt
         performance_df["Portfolio Value"].plot(
             title="Portfolio Value Over Time", figsize=(12, 6)
         )
@@ -112,20 +221,71 @@ class Backtester:
         # Compute daily returns
         performance_df["Daily Return"] = performance_df["Portfolio Value"].pct_change()
 
-        # Calculate Sharpe Ratio (assuming 252 trading days in a year)
-        mean_daily_return = performance_df["Daily Return"].mean()
-        std_daily_return = performance_df["Daily Return"].std()
-        sharpe_ratio = (mean_daily_return / std_daily_return) * (252 ** 0.5)
-        print(f"Sharpe Ratio: {sharpe_ratio:.2f}")
-
-        # Calculate Maximum Drawdown
-        rolling_max = performance_df["Portfolio Value"].cummax()
-        drawdown = performance_df["Portfolio Value"] / rolling_max - 1
-        max_drawdown = drawdown.min()
-        print(f"Maximum Drawdown: {max_drawdown * 100:.2f}%")
+        # Sharpe Ratio (assuming 252 trading days in a year) and Maximum Drawdown
+        print(f"Sharpe Ratio: {metrics['sharpe_ratio']:.2f}")
+        print(f"Maximum Drawdown: {metrics['max_drawdown'] * 100:.2f}%")
 
         return performance_df
-    
+
+
+class VectorizedBacktester(Backtester):
+    """
+    Backtester that computes every agent signal once over the full history and
+    replays the trades in a single pass, without invoking the agent graph or the LLM.
+    Decisions come from make_rule_based_decision instead of the portfolio manager prompt.
+    """
+
+    def __init__(self, ticker, start_date, end_date, initial_capital, lookback_days=365, data_provider=None, verbose=True):
+        super().__init__(
+            agent=None,
+            ticker=ticker,
+            start_date=start_date,
+            end_date=end_date,
+            initial_capital=initial_capital,
+            data_provider=data_provider,
+            lookback_days=lookback_days,
+            verbose=verbose,
+            decision_mode="rules",
+        )
+        self.signals = None
+
+    def run_backtest(self, resume=False):
+        # A vectorized run takes seconds, so it is not checkpointed and ``resume`` has no effect
+        if self.signals is None:
+            self.signals = load_signal_frame(self.ticker, self.start_date, self.end_date, self.lookback_days, self.provider)
+        signals = self.signals.loc[self.start_date:self.end_date]
+
+        if self.verbose:
+            print("\nStarting vectorized backtest...")
+            self.print_header()
+
+        for current_date, row in zip(signals.index, signals.itertuples(index=False)):
+            current_price = row.close
+            total_value = self.portfolio["cash"] + self.portfolio["stock"] * current_price
+
+            decision = make_rule_based_decision(
+                agent_signals={
+                    "fundamental": {"signal": row.fundamental_signal, "confidence": row.fundamental_confidence},
+                    "technical": {"signal": row.technical_signal, "confidence": row.technical_confidence},
+                    "sentiment": {"signal": row.sentiment_signal, "confidence": row.sentiment_confidence},
+                },
+                trading_action=row.trading_action,
+                max_position_size=calculate_max_position_size(total_value, row.market_risk_score),
+                portfolio=self.portfolio,
+                current_price=current_price,
+            )
+            action = decision["action"]
+
+            # Execute the trade with validation
+            executed_quantity = self.execute_trade(action, decision["quantity"], current_price)
+
+            # Update total portfolio value
+            total_value = self.portfolio["cash"] + self.portfolio["stock"] * current_price
+            self.portfolio["portfolio_value"] = total_value
+
+            self.record_day(current_date, action, executed_quantity, current_price, total_value)
+
+
 ### 4. Run the Backtest #####
 if __name__ == "__main__":
     import argparse
@@ -136,18 +296,45 @@ if __name__ == "__main__":
     parser.add_argument('--end_date', type=str, default=datetime.now().strftime('%Y-%m-%d'), help='End date in YYYY-MM-DD format')
     parser.add_argument('--start_date', type=str, default=(datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d'), help='Start date in YYYY-MM-DD format')
     parser.add_argument('--initial_capital', type=float, default=100000, help='Initial capital amount (default: 100000)')
+    parser.add_argument('--decision_mode', choices=DECISION_MODES, default='auto',
+                        help="Portfolio manager mode: 'llm', 'auto' (skip the LLM when the outcome is decided) or 'rules' (offline)")
+    parser.add_argument('--vectorized', action='store_true', help='Precompute all signals once and simulate without the agent graph or LLM')
+    parser.add_argument('--replay_mode', choices=REPLAY_MODES, default=None,
+                        help="'record': store every provider and LLM response, 'replay': run offline from the recordings (default: $REPLAY_MODE or off)")
+    parser.add_argument('--data_provider', choices=sorted(PROVIDERS), default=None,
+                        help='Market data source for the agent and the trade prices (default: $DATA_PROVIDER or vnstock)')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted backtest from its checkpoint')
+    parser.add_argument('--checkpoint_every', type=int, default=CHECKPOINT_EVERY,
+                        help='Simulated days between checkpoints; 0 only saves when the run fails (default: $CHECKPOINT_EVERY or 10)')
 
     args = parser.parse_args()
+    if args.replay_mode:
+        set_replay_mode(args.replay_mode)
 
     # Create an instance of Backtester
-    backtester = Backtester(
-        agent=run_hedge_fund,
-        ticker=args.ticker,
-        start_date=args.start_date,
-        end_date=args.end_date,
-        initial_capital=args.initial_capital,
-    )
+    if args.vectorized:
+        backtester = VectorizedBacktester(
+            ticker=args.ticker,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            initial_capital=args.initial_capital,
+            data_provider=args.data_provider,
+        )
+    else:
+        backtester = Backtester(
+            agent=partial(run_hedge_fund, decision_mode=args.decision_mode),
+            ticker=args.ticker,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            initial_capital=args.initial_capital,
+            data_provider=args.data_provider,
+            checkpoint_path=checkpoint_path(
+                args.ticker, args.start_date, args.end_date, f"{args.initial_capital:g}", args.decision_mode, args.data_provider or "default",
+            ),
+            checkpoint_every=args.checkpoint_every,
+            decision_mode=args.decision_mode,
+        )
 
     # Run the backtesting process
-    backtester.run_backtest()
+    backtester.run_backtest(resume=args.resume)
     performance_df = backtester.analyze_performance()
@@ -0,0 +1,103 @@
+import argparse
+import cProfile
+import pstats
+import statistics
+import time
+from collections import defaultdict
+
+from agents.state import DECISION_MODES
+from main import get_app, initial_state
+from tools.client_pool import CLIENT_POOL_SIZE, get_client_pool
+from tools.replay import REPLAY_DIR, set_replay_mode
+from tools.single_flight import get_single_flight
+
+
+##### Benchmark the Hedge Fund #####
+def benchmark(
+    tickers: list,
+    start_date: str,
+    end_date: str,
+    runs: int = 10,
+    decision_mode: str = "auto",
+    profile: bool = False,
+) -> dict:
+    """
+    Time ``runs`` passes of the graph over ``tickers``, one ticker at a time, after a warm-up
+    pass. Returns wall times per pass and the mean time spent in each data fetch.
+    """
+    app = get_app()
+    portfolio = {"cash": 100000.0, "stock": 0}
+
+    def run_once(fetch_latency):
+        for ticker in tickers:
+            final_state = app.invoke(initial_state(
+                ticker, start_date, end_date, dict(portfolio), llm_cache=False, decision_mode=decision_mode,
+            ))
+            for name, seconds in final_state["metadata"].get("fetch_latency", {}).items():
+                fetch_latency[name].append(seconds)
+
+    # Warm-up: loads fixtures, imports and caches once
+    run_once(defaultdict(list))
+
+    fetch_latency = defaultdict(list)
+    profiler = cProfile.Profile() if profile else None
+    timings = []
+    for _ in range(runs):
+        if profiler:
+            profiler.enable()
+        start = time.perf_counter()
+        run_once(fetch_latency)
+        timings.append(time.perf_counter() - start)
+        if profiler:
+            profiler.disable()
+
+    if profiler:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+    return {
+        "timings": timings,
+        "fetch_latency": {name: statistics.mean(values) for name, values in fetch_latency.items()},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the hedge fund graph on recorded data')
+    parser.add_argument('--tickers', type=str, required=True, help='Comma-separated ticker symbols')
+    parser.add_argument('--start-date', type=str, required=True, help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--end-date', type=str, required=True, help='End date (YYYY-MM-DD)')
+    parser.add_argument('--runs', type=int, default=10, help='Timed passes over all tickers (default: 10)')
+    parser.add_argument('--decision-mode', choices=DECISION_MODES, default='auto',
+                        help="Portfolio manager decision mode (see main.py)")
+    parser.add_argument('--record', action='store_true',
+                        help='Call the live providers and OpenAI once and record the responses, then exit')
+    parser.add_argument('--live', action='store_true', help='Benchmark against the live providers instead of the recordings')
+    parser.add_argument('--replay-dir', type=str, default=REPLAY_DIR, help='Directory of the recorded responses')
+    parser.add_argument('--profile', action='store_true', help='Print the top functions by cumulative time of the timed passes')
+    parser.add_argument('--client-pool-size', type=int, default=CLIENT_POOL_SIZE,
+                        help='vnstock clients kept alive across calls; 0 builds one per request (compare with --live)')
+    args = parser.parse_args()
+
+    tickers = [t.strip().upper() for t in args.tickers.split(',') if t.strip()]
+    get_client_pool(args.client_pool_size)
+
+    if args.record:
+        set_replay_mode("record", args.replay_dir)
+        for ticker in tickers:
+            get_app().invoke(initial_state(ticker, args.start_date, args.end_date, {"cash": 100000.0, "stock": 0},
+                                     llm_cache=False, decision_mode=args.decision_mode))
+        print(f"Recorded {len(tickers)} runs to {args.replay_dir}")
+    else:
+        set_replay_mode("off" if args.live else "replay", args.replay_dir)
+        result = benchmark(tickers, args.start_date, args.end_date, args.runs, args.decision_mode, args.profile)
+
+        timings = result["timings"]
+        print(f"\n{len(tickers)} ticker(s) x {len(timings)} runs ({'live' if args.live else 'replay'})")
+        print(f"{'Per pass':<24} mean {statistics.mean(timings) * 1000:9.1f} ms   "
+              f"median {statistics.median(timings) * 1000:9.1f} ms   min {min(timings) * 1000:9.1f} ms")
+        print(f"{'Per ticker':<24} mean {statistics.mean(timings) / len(tickers) * 1000:9.1f} ms")
+        for name, seconds in sorted(result["fetch_latency"].items()):
+            print(f"  fetch {name:<18} mean {seconds * 1000:9.2f} ms")
+        for name, counts in get_single_flight().stats().items():
+            print(f"  {name:<48} {counts['executions']} executed, {counts['coalesced']} coalesced")
+        clients = get_client_pool().stats()
+        print(f"  vnstock clients: {clients['created']} built, {clients['reused']} reused, {clients['evicted']} evicted")
@@ -1,74 +1,282 @@
+import time
+
+# Reference point of the --profile-startup report
+_started = time.perf_counter()
 
 from langchain_core.messages import HumanMessage
-from langgraph.graph import END, StateGraph
 
-from agents.fundamentals import fundamentals_agent
-from agents.market_data import market_data_agent
-from agents.portfolio_manager import portfolio_management_agent
-from agents.technicals import technical_analyst_agent
-from agents.risk_manager import risk_management_agent
-from agents.sentiment import sentiment_agent
-from agents.state import AgentState
+from agents.state import DECISION_MODES
+from tools.concurrency import configure_limits
+from tools.providers import PROVIDERS, DataProvider
+from tools.replay import REPLAY_MODES, set_replay_mode
+from tools.single_flight import get_single_flight
 
 import argparse
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from typing import AsyncIterator, Iterator, List, Optional, Tuple, Union
 
 
 ##### Run the Hedge Fund #####
-def run_hedge_fund(ticker: str, start_date: str, end_date: str, portfolio: dict, show_reasoning: bool = False):
-    final_state = app.invoke(
-        {
-            "messages": [
-                HumanMessage(
-                    content="Make a trading decision based on the provided data.",
-                )
-            ],
-            "data": {
-                "ticker": ticker,
-                "portfolio": portfolio,
-                "start_date": start_date,
-                "end_date": end_date,
-            },
-            "metadata": {
-                "show_reasoning": show_reasoning,
-            }
-        },
+def run_hedge_fund(
+    ticker: str,
+    start_date: str,
+    end_date: str,
+    portfolio: dict,
+    show_reasoning: bool = False,
+    llm_cache: bool = True,
+    decision_mode: str = "auto",
+    data_provider: Union[str, DataProvider, None] = None,
+):
+    final_state = get_app().invoke(
+        initial_state(ticker, start_date, end_date, portfolio, show_reasoning, llm_cache, decision_mode, data_provider),
+    )
+    return final_state["messages"][-1].content
+
+async def arun_hedge_fund(
+    ticker: str,
+    start_date: str,
+    end_date: str,
+    portfolio: dict,
+    show_reasoning: bool = False,
+    llm_cache: bool = True,
+    decision_mode: str = "auto",
+    data_provider: Union[str, DataProvider, None] = None,
+):
+    """Async version of run_hedge_fund: data is fetched on the event loop through the async providers."""
+    final_state = await get_app().ainvoke(
+        initial_state(ticker, start_date, end_date, portfolio, show_reasoning, llm_cache, decision_mode, data_provider),
     )
     return final_state["messages"][-1].content
 
-# Define the new workflow
-workflow = StateGraph(AgentState)
-
-# Add nodes
-workflow.add_node("market_data_agent", market_data_agent)
-workflow.add_node("technical_analyst_agent", technical_analyst_agent)
-workflow.add_node("fundamentals_agent", fundamentals_agent)
-workflow.add_node("sentiment_agent", sentiment_agent)
-workflow.add_node("risk_management_agent", risk_management_agent)
-workflow.add_node("portfolio_management_agent", portfolio_management_agent)
-
-# Define the workflow
-workflow.set_entry_point("market_data_agent")
-workflow.add_edge("market_data_agent", "technical_analyst_agent")
-workflow.add_edge("market_data_agent", "fundamentals_agent")
-workflow.add_edge("market_data_agent", "sentiment_agent")
-workflow.add_edge("technical_analyst_agent", "risk_management_agent")
-workflow.add_edge("fundamentals_agent", "risk_management_agent")
-workflow.add_edge("sentiment_agent", "risk_management_agent")
-workflow.add_edge("risk_management_agent", "portfolio_management_agent")
-workflow.add_edge("portfolio_management_agent", END)
-
-app = workflow.compile()
+def initial_state(
+    ticker: str,
+    start_date: str,
+    end_date: str,
+    portfolio: dict,
+    show_reasoning: bool = False,
+    llm_cache: bool = True,
+    decision_mode: str = "auto",
+    data_provider: Union[str, DataProvider, None] = None,
+) -> dict:
+    return {
+        "messages": [
+            HumanMessage(
+                content="Make a trading decision based on the provided data.",
+            )
+        ],
+        "data": {
+            "ticker": ticker,
+            "portfolio": portfolio,
+            "start_date": start_date,
+            "end_date": end_date,
+        },
+        "metadata": {
+            "show_reasoning": show_reasoning,
+            "llm_cache": llm_cache,
+            "decision_mode": decision_mode,
+            # Name or instance of the DataProvider the market data agent reads from
+            "data_provider": data_provider,
+        },
+        "signals": {},
+    }
+
+def run_hedge_fund_many(
+    tickers: List[str],
+    start_date: str,
+    end_date: str,
+    portfolio: dict,
+    show_reasoning: bool = False,
+    llm_cache: bool = True,
+    decision_mode: str = "auto",
+    data_provider: Union[str, DataProvider, None] = None,
+    max_workers: int = 8,
+    max_fetches: Optional[int] = None,
+    max_llm_calls: Optional[int] = None,
+) -> Iterator[Tuple[str, Union[str, Exception]]]:
+    """
+    Run the hedge fund for many tickers concurrently through the compiled graph.
+
+    Each ticker starts from its own copy of ``portfolio``. Up to ``max_workers`` graphs
+    run at once, while data fetches and LLM calls are further capped process-wide
+    (see tools.concurrency). Yields ``(ticker, decision)`` pairs as soon as each run
+    finishes; a run that fails yields its exception instead of stopping the scan.
+    """
+    configure_limits(max_fetches=max_fetches, max_llm_calls=max_llm_calls)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                run_hedge_fund,
+                ticker=ticker,
+                start_date=start_date,
+                end_date=end_date,
+                portfolio=dict(portfolio),
+                show_reasoning=show_reasoning,
+                llm_cache=llm_cache,
+                decision_mode=decision_mode,
+                data_provider=data_provider,
+            ): ticker
+            for ticker in tickers
+        }
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                yield ticker, future.result()
+            except Exception as e:
+                yield ticker, e
+
+async def arun_hedge_fund_many(
+    tickers: List[str],
+    start_date: str,
+    end_date: str,
+    portfolio: dict,
+    show_reasoning: bool = False,
+    llm_cache: bool = True,
+    decision_mode: str = "auto",
+    data_provider: Union[str, DataProvider, None] = None,
+    max_concurrency: int = 100,
+    max_fetches: Optional[int] = None,
+    max_llm_calls: Optional[int] = None,
+) -> AsyncIterator[Tuple[str, Union[str, Exception]]]:
+    """
+    Event-loop counterpart of run_hedge_fund_many: up to ``max_concurrency`` runs are in
+    flight on the running loop instead of one thread per run.
+    """
+    configure_limits(max_fetches=max_fetches, max_llm_calls=max_llm_calls)
+    runs = asyncio.Semaphore(max_concurrency)
+
+    async def run(ticker: str) -> Tuple[str, Union[str, Exception]]:
+        async with runs:
+            try:
+                return ticker, await arun_hedge_fund(
+                    ticker=ticker,
+                    start_date=start_date,
+                    end_date=end_date,
+                    portfolio=dict(portfolio),
+                    show_reasoning=show_reasoning,
+                    llm_cache=llm_cache,
+                    decision_mode=decision_mode,
+                    data_provider=data_provider,
+                )
+            except Exception as e:
+                return ticker, e
+
+    try:
+        for result in asyncio.as_completed([run(ticker) for ticker in tickers]):
+            yield await result
+    finally:
+        # The pooled HTTP client belongs to this loop; close it before the loop goes away
+        from tools.api import aclose_async_client
+        await aclose_async_client()
+
+def load_tickers(tickers: Optional[str] = None, tickers_file: Optional[str] = None) -> List[str]:
+    """Tickers from a comma-separated list and/or a file with one ticker per line ('#' starts a comment)."""
+    result = []
+    if tickers:
+        result += [t.strip().upper() for t in tickers.split(',') if t.strip()]
+    if tickers_file:
+        with open(tickers_file) as f:
+            for line in f:
+                ticker = line.split('#')[0].strip()
+                if ticker:
+                    result.append(ticker.upper())
+    # Keep the first occurrence of each ticker
+    return list(dict.fromkeys(result))
+
+##### Workflow #####
+def build_app():
+    """Build and compile the agent graph. The agents and langgraph are imported here, not at startup."""
+    from langchain_core.runnables import RunnableLambda
+    from langgraph.graph import END, StateGraph
+
+    from agents.fundamentals import fundamentals_agent
+    from agents.market_data import amarket_data_agent, market_data_agent
+    from agents.portfolio_manager import portfolio_management_agent
+    from agents.technicals import technical_analyst_agent
+    from agents.risk_manager import risk_management_agent
+    from agents.sentiment import sentiment_agent
+    from agents.state import AgentState
+
+    # Define the new workflow
+    workflow = StateGraph(AgentState)
+
+    # Add nodes
+    workflow.add_node("market_data_agent", RunnableLambda(market_data_agent, afunc=amarket_data_agent))
+    workflow.add_node("technical_analyst_agent", technical_analyst_agent)
+    workflow.add_node("fundamentals_agent", fundamentals_agent)
+    workflow.add_node("sentiment_agent", sentiment_agent)
+    workflow.add_node("risk_management_agent", risk_management_agent)
+    workflow.add_node("portfolio_management_agent", portfolio_management_agent)
+
+    # Define the workflow
+    workflow.set_entry_point("market_data_agent")
+    workflow.add_edge("market_data_agent", "technical_analyst_agent")
+    workflow.add_edge("market_data_agent", "fundamentals_agent")
+    workflow.add_edge("market_data_agent", "sentiment_agent")
+    workflow.add_edge("technical_analyst_agent", "risk_management_agent")
+    workflow.add_edge("fundamentals_agent", "risk_management_agent")
+    workflow.add_edge("sentiment_agent", "risk_management_agent")
+    workflow.add_edge("risk_management_agent", "portfolio_management_agent")
+    workflow.add_edge("portfolio_management_agent", END)
+
+    return workflow.compile()
+
+_app = None
+_app_lock = threading.Lock()
+
+def get_app():
+    """The compiled graph, built on first use and shared by every run in the process."""
+    global _app
+    with _app_lock:
+        if _app is None:
+            _app = build_app()
+        return _app
+
+def __getattr__(name):
+    # `from main import app` keeps working, compiling the graph on first access
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Add this at the bottom of the file
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Run the hedge fund trading system')
-    parser.add_argument('--ticker', type=str, required=True, help='Stock ticker symbol')
+    ticker_group = parser.add_mutually_exclusive_group(required=True)
+    ticker_group.add_argument('--ticker', type=str, help='Stock ticker symbol')
+    ticker_group.add_argument('--tickers', type=str, help='Comma-separated ticker symbols to scan concurrently')
+    ticker_group.add_argument('--tickers-file', type=str, help='File with one ticker symbol per line to scan concurrently')
     parser.add_argument('--start-date', type=str, help='Start date (YYYY-MM-DD). Defaults to 3 months before end date')
     parser.add_argument('--end-date', type=str, help='End date (YYYY-MM-DD). Defaults to today')
     parser.add_argument('--show-reasoning', action='store_true', help='Show reasoning from each agent')
+    parser.add_argument('--no-llm-cache', action='store_true', help='Always call the LLM instead of reusing cached responses')
+    parser.add_argument('--decision-mode', choices=DECISION_MODES, default='auto',
+                        help="'llm': always ask the LLM, 'auto': skip it when the outcome is already decided, 'rules': never call it")
+    parser.add_argument('--max-workers', type=int, default=8, help='Tickers run concurrently in batch mode (default: 8)')
+    parser.add_argument('--max-fetch-concurrency', type=int, default=None, help='Concurrent data fetches across all tickers')
+    parser.add_argument('--max-llm-concurrency', type=int, default=None, help='Concurrent LLM calls across all tickers')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Run batch mode on one event loop with the async data fetchers instead of a thread per ticker')
+    parser.add_argument('--replay-mode', choices=REPLAY_MODES, default=None,
+                        help="'record': store every provider and LLM response, 'replay': run offline from the recordings (default: $REPLAY_MODE or off)")
+    parser.add_argument('--data-provider', choices=sorted(PROVIDERS), default=None,
+                        help='Market data source (default: $DATA_PROVIDER or vnstock)')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Print the time spent importing modules and compiling the graph before the run')
     
     args = parser.parse_args()
+    if args.replay_mode:
+        set_replay_mode(args.replay_mode)
+
+    if args.profile_startup:
+        parsed = time.perf_counter()
+        get_app()
+        compiled = time.perf_counter()
+        print(f"Startup: {(parsed - _started) * 1000:.0f} ms to parse arguments, "
+              f"{(compiled - parsed) * 1000:.0f} ms to import the agents and compile the graph, "
+              f"{(compiled - _started) * 1000:.0f} ms in total (python -X importtime for a per-module breakdown)")
     
     # Validate dates if provided
     if args.start_date:
@@ -89,12 +297,54 @@ if __name__ == "__main__":
         "stock": 0         # No initial stock position
     }
     
-    result = run_hedge_fund(
-        ticker=args.ticker,
-        start_date=args.start_date,
-        end_date=args.end_date,
-        portfolio=portfolio,
-        show_reasoning=args.show_reasoning
-    )
-    print("\nFinal Result:")
-    print(result)
\ No newline at end of file
+    if args.ticker:
+        result = run_hedge_fund(
+            ticker=args.ticker,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            portfolio=portfolio,
+            show_reasoning=args.show_reasoning,
+            llm_cache=not args.no_llm_cache,
+            decision_mode=args.decision_mode,
+            data_provider=args.data_provider,
+        )
+        print("\nFinal Result:")
+        print(result)
+    else:
+        tickers = load_tickers(args.tickers, args.tickers_file)
+        batch_args = dict(
+            tickers=tickers,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            portfolio=portfolio,
+            show_reasoning=args.show_reasoning,
+            llm_cache=not args.no_llm_cache,
+            decision_mode=args.decision_mode,
+            data_provider=args.data_provider,
+            max_fetches=args.max_fetch_concurrency,
+            max_llm_calls=args.max_llm_concurrency,
+        )
+
+        def print_result(ticker, result):
+            if isinstance(result, Exception):
+                print(f"\n{ticker}: failed - {result}")
+            else:
+                print(f"\n{ticker}:")
+                print(result)
+
+        if args.use_async:
+            async def scan():
+                try:
+                    async for ticker, result in arun_hedge_fund_many(max_concurrency=args.max_workers, **batch_args):
+                        print_result(ticker, result)
+                finally:
+                    from tools.api import aclose_async_client
+                    await aclose_async_client()
+            asyncio.run(scan())
+        else:
+            for ticker, result in run_hedge_fund_many(max_workers=args.max_workers, **batch_args):
+                print_result(ticker, result)
+
+        fetch_stats = get_single_flight().stats()
+        print(f"\nData fetches: {sum(c['executions'] for c in fetch_stats.values())} made, "
+              f"{sum(c['coalesced'] for c in fetch_stats.values())} coalesced with identical in-flight fetches")
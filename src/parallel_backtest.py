@@ -0,0 +1,233 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from functools import partial
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtester import Backtester, VectorizedBacktester
+from main import load_tickers, run_hedge_fund
+from tools.frames import read_only
+from tools.providers import PROVIDERS, FrameProvider, get_provider
+
+# Configuration of a job when none is given: the backtester's defaults
+DEFAULT_CONFIGS = [{"name": "default"}]
+
+
+##### Shared price histories #####
+def share_prices(histories: Dict[Hashable, Tuple[str, str, pd.DataFrame]]) -> Tuple[List[SharedMemory], dict]:
+    """
+    Copy each price history, keyed by data provider and ticker, into a shared memory
+    block: the date index, then one row of 8-byte values per column. Returns the blocks,
+    which the caller must unlink, and the spec the workers attach with (see attach_prices).
+    Columns that are not 8-byte numbers or dates (e.g. string dates) are left out.
+    """
+    blocks, spec = [], {}
+    for key, (start_date, end_date, history) in histories.items():
+        columns = [
+            (name, history[name].to_numpy()) for name in history.columns
+            if history[name].dtype.kind in "fiMm" and history[name].dtype.itemsize == 8
+        ]
+        rows = [history.index.to_numpy(dtype="datetime64[ns]")] + [values for _, values in columns]
+        block = SharedMemory(create=True, size=max(8, 8 * len(rows) * len(history)))
+        blocks.append(block)
+        table = np.ndarray((len(rows), len(history)), dtype=np.int64, buffer=block.buf)
+        for row, values in zip(table, rows):
+            row[:] = values.view(np.int64)
+        spec[key] = {
+            "block": block.name,
+            "start_date": start_date,
+            "end_date": end_date,
+            "length": len(history),
+            "index": history.index.name,
+            "columns": [(name, values.dtype.str) for name, values in columns],
+        }
+    return blocks, spec
+
+
+# Histories attached by this worker process, and their blocks (kept open while in use)
+_shared_histories: Dict[Hashable, Tuple[str, str, pd.DataFrame]] = {}
+_shared_blocks: List[SharedMemory] = []
+
+
+def attach_prices(spec: dict):
+    """Process pool initializer: map the shared histories as read-only frames, without copying them."""
+    for key, entry in spec.items():
+        block = SharedMemory(name=entry["block"])
+        _shared_blocks.append(block)
+        table = np.ndarray((len(entry["columns"]) + 1, entry["length"]), dtype=np.int64, buffer=block.buf)
+        table.flags.writeable = False
+        history = pd.DataFrame(
+            {name: table[i + 1].view(dtype) for i, (name, dtype) in enumerate(entry["columns"])},
+            index=pd.DatetimeIndex(table[0].view("datetime64[ns]"), name=entry["index"]),
+            copy=False,
+        )
+        _shared_histories[key] = (entry["start_date"], entry["end_date"], read_only(history))
+
+
+##### Backtest jobs #####
+def config_name(config: dict) -> str:
+    if "name" in config:
+        return config["name"]
+    return ",".join(f"{key}={value}" for key, value in sorted(config.items())) or "default"
+
+
+def history_start(start_date: str, config: dict) -> str:
+    """First day of price history a config needs: the start date minus its lookback."""
+    lookback_days = config.get("lookback_days", 365 if config.get("vectorized") else 30)
+    return (datetime.strptime(start_date, "%Y-%m-%d") - timedelta(days=lookback_days)).strftime("%Y-%m-%d")
+
+
+def run_job(ticker: str, config: dict, start_date: str, end_date: str, verbose: bool = False) -> dict:
+    """
+    Backtest one ticker with one config and return its metrics. Config keys: vectorized,
+    decision_mode, initial_capital, lookback_days and data_provider (same meaning as the
+    backtester's options) plus an optional name.
+    """
+    started = time.perf_counter()
+    provider = FrameProvider(get_provider(config.get("data_provider")))
+    shared = _shared_histories.get((config.get("data_provider"), ticker))
+    if shared is not None:
+        provider.load(ticker, *shared)
+
+    options = dict(
+        ticker=ticker,
+        start_date=start_date,
+        end_date=end_date,
+        initial_capital=config.get("initial_capital", 100000),
+        data_provider=provider,
+        verbose=verbose,
+    )
+    if "lookback_days" in config:
+        options["lookback_days"] = config["lookback_days"]
+    if config.get("vectorized"):
+        backtester = VectorizedBacktester(**options)
+    else:
+        decision_mode = config.get("decision_mode", "auto")
+        backtester = Backtester(agent=partial(run_hedge_fund, decision_mode=decision_mode), decision_mode=decision_mode, **options)
+
+    backtester.run_backtest()
+    return {
+        **backtester.performance_metrics(),
+        "days": len(backtester.portfolio_values),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def print_progress(done: int, total: int, ticker: str, config: str, result: dict, elapsed: float):
+    status = f"failed - {result['error']}" if result.get("error") else f"return {result['total_return'] * 100:.2f}%"
+    print(f"[{done}/{total}] {elapsed:7.1f}s  {ticker:<6} {config:<24} {status}")
+
+
+def run_parallel_backtests(
+    tickers: List[str],
+    configs: List[dict],
+    start_date: str,
+    end_date: str,
+    max_workers: Optional[int] = None,
+    verbose: bool = False,
+    progress: Optional[Callable] = print_progress,
+) -> pd.DataFrame:
+    """
+    Backtest every (ticker, config) pair on a process pool and collect the metrics into
+    one table, a row per job. Each ticker's price history is fetched once, for the longest
+    lookback of any config, and shared read-only with the workers through shared memory.
+    A job that fails gets its error in the ``error`` column instead of stopping the run.
+    """
+    started = time.perf_counter()
+
+    # Load every ticker's history once per data provider, in the parent
+    first_day = min(history_start(start_date, config) for config in configs)
+    providers = {config.get("data_provider") for config in configs}
+    histories = {}
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = {
+            executor.submit(get_provider(provider).get_prices, ticker, first_day, end_date): (provider, ticker)
+            for provider in providers for ticker in tickers
+        }
+        for future in as_completed(futures):
+            try:
+                histories[futures[future]] = (first_day, end_date, future.result())
+            except Exception as e:
+                # The jobs of this ticker fetch (and report) on their own
+                print(f"Could not load prices for {futures[future][1]}: {e}")
+
+    blocks, spec = share_prices(histories)
+    rows = []
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=attach_prices, initargs=(spec,)) as executor:
+            futures = {
+                executor.submit(run_job, ticker, config, start_date, end_date, verbose): (ticker, config_name(config))
+                for config in configs for ticker in tickers
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                ticker, name = futures[future]
+                try:
+                    result = {**future.result(), "error": None}
+                except Exception as e:
+                    result = {"error": repr(e)}
+                rows.append({"ticker": ticker, "config": name, **result})
+                if progress:
+                    progress(done, len(futures), ticker, name, result, time.perf_counter() - started)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    columns = ["ticker", "config", "total_return", "sharpe_ratio", "max_drawdown", "final_value", "trades", "days", "seconds", "error"]
+    return pd.DataFrame(rows, columns=columns).sort_values(["config", "ticker"], ignore_index=True)
+
+
+def load_configs(configs: Optional[str]) -> List[dict]:
+    """Configs from a JSON list, given inline or as the path of a JSON file."""
+    if not configs:
+        return DEFAULT_CONFIGS
+    if os.path.exists(configs):
+        with open(configs) as f:
+            configs = f.read()
+    loaded = json.loads(configs)
+    return loaded if isinstance(loaded, list) else [loaded]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Backtest many tickers and configurations in parallel')
+    ticker_group = parser.add_mutually_exclusive_group(required=True)
+    ticker_group.add_argument('--tickers', type=str, help='Comma-separated ticker symbols')
+    ticker_group.add_argument('--tickers-file', type=str, help='File with one ticker symbol per line')
+    parser.add_argument('--start-date', type=str, default=(datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d'),
+                        help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--end-date', type=str, default=datetime.now().strftime('%Y-%m-%d'), help='End date (YYYY-MM-DD)')
+    parser.add_argument('--configs', type=str, default=None,
+                        help='JSON list of configs (inline or a file), e.g. \'[{"name": "vec", "vectorized": true}, '
+                             '{"name": "rules", "decision_mode": "rules"}]\'')
+    parser.add_argument('--data-provider', choices=sorted(PROVIDERS), default=None,
+                        help='Market data source of configs that do not set data_provider (default: $DATA_PROVIDER or vnstock)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--output', type=str, default=None, help='Write the results table to this CSV file')
+    parser.add_argument('--verbose', action='store_true', help='Print every simulated day of every job')
+    args = parser.parse_args()
+
+    configs = load_configs(args.configs)
+    if args.data_provider:
+        configs = [{"data_provider": args.data_provider, **config} for config in configs]
+
+    results = run_parallel_backtests(
+        tickers=load_tickers(args.tickers, args.tickers_file),
+        configs=configs,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        max_workers=args.workers,
+        verbose=args.verbose,
+    )
+
+    print()
+    print(results.to_string(index=False))
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"\nResults written to {args.output}")
@@ -0,0 +1,193 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from agents.technicals import STRATEGY_WEIGHTS, TECHNICAL_THRESHOLDS
+from agents.vectorized import technical_features, technical_score_arrays, technical_strategy_arrays
+from tools.providers import PROVIDERS, DataProvider, get_provider
+
+# Grid keys: "weight_<strategy>" for the STRATEGY_WEIGHTS, the TECHNICAL_THRESHOLDS names otherwise
+WEIGHT_PREFIX = "weight_"
+
+# Values tried when no grid is given: 3**5 weightings x 3**3 * 4 threshold settings = 26244 combinations
+DEFAULT_GRID = {
+    "weight_trend": [0.1, 0.25, 0.4],
+    "weight_mean_reversion": [0.1, 0.2, 0.3],
+    "weight_momentum": [0.1, 0.25, 0.4],
+    "weight_volatility": [0.05, 0.15, 0.25],
+    "weight_stat_arb": [0.05, 0.15, 0.25],
+    "z_score": [1.5, 2.0, 2.5],
+    "momentum_score": [0.03, 0.05, 0.08],
+    "hurst": [0.35, 0.4, 0.45],
+    "signal": [0.1, 0.2, 0.3, 0.4],
+}
+
+
+##### Parameter Sweep #####
+def default_parameters() -> Dict[str, float]:
+    """The weights and thresholds the technical analyst uses today."""
+    return {
+        **{f"{WEIGHT_PREFIX}{name}": weight for name, weight in STRATEGY_WEIGHTS.items()},
+        **TECHNICAL_THRESHOLDS,
+    }
+
+
+def parameter_grid(grid: Dict[str, Sequence[float]]) -> pd.DataFrame:
+    """Every combination of the grid's values, one row each; parameters not in the grid keep their default."""
+    defaults = default_parameters()
+    unknown = set(grid) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters {sorted(unknown)}, expected some of {sorted(defaults)}")
+    combinations = pd.DataFrame(list(itertools.product(*grid.values())), columns=list(grid), dtype=float)
+    for name, value in defaults.items():
+        if name not in combinations:
+            combinations[name] = value
+    return combinations[list(defaults)]
+
+
+def bar_returns(close: np.ndarray) -> np.ndarray:
+    """Return of each bar over the previous close; 0 for the first bar."""
+    close = np.asarray(close, dtype=float)
+    if len(close) == 0:
+        return close
+    return np.nan_to_num(np.concatenate([[0.0], close[1:] / close[:-1] - 1]))
+
+
+def simulate_positions(signal: np.ndarray, returns: np.ndarray, cost: float = 0.0) -> Dict[str, np.ndarray]:
+    """
+    Long/flat simulation of P signal rows at once: a bullish bar buys, a bearish bar sells,
+    a neutral bar keeps the position. The position taken at a close earns the next bar's
+    return, less ``cost`` per unit of turnover. Returns per-row metrics.
+    """
+    bars = signal.shape[1]
+    # Index of the last non-neutral bar so far, per row; neutral bars inherit its position
+    last = np.maximum.accumulate(np.where(signal != 0, np.arange(bars), 0), axis=1)
+    position = (np.take_along_axis(signal, last, axis=1) > 0).astype(float)
+
+    turnover = np.abs(np.diff(position, axis=1, prepend=0.0))
+    strategy_returns = position[:, :-1] * returns[1:] - cost * turnover[:, 1:]
+
+    equity = np.cumprod(1 + strategy_returns, axis=1)
+    equity = np.concatenate([np.ones((len(equity), 1)), equity], axis=1)
+    mean, std = strategy_returns.mean(axis=1), strategy_returns.std(axis=1, ddof=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe_ratio = np.where(std > 0, mean / std * np.sqrt(252), np.nan)
+    return {
+        "sharpe_ratio": sharpe_ratio,
+        "max_drawdown": (equity / np.maximum.accumulate(equity, axis=1) - 1).min(axis=1),
+        "total_return": equity[:, -1] - 1,
+        "trades": turnover.sum(axis=1).astype(int),
+    }
+
+
+def evaluate_parameters(
+    features: pd.DataFrame,
+    close: np.ndarray,
+    parameters: pd.DataFrame,
+    cost: float = 0.0,
+    chunk_size: int = 1024,
+) -> pd.DataFrame:
+    """
+    Metrics of every parameter row over the bars of ``features``. The indicators are
+    computed once; each chunk of parameter rows is evaluated as (rows, bars) arrays.
+    """
+    returns = bar_returns(close)
+    metrics = []
+    for start in range(0, len(parameters), chunk_size):
+        chunk = parameters.iloc[start:start + chunk_size]
+        column = {name: chunk[name].to_numpy()[:, None] for name in chunk.columns}
+
+        signals = technical_strategy_arrays(features, {name: column[name] for name in TECHNICAL_THRESHOLDS})
+        score = technical_score_arrays(signals, {name: column[f"{WEIGHT_PREFIX}{name}"] for name in STRATEGY_WEIGHTS})
+        score = np.broadcast_to(score, (len(chunk), len(close)))
+        signal = np.where(score > column["signal"], 1, np.where(score < -column["signal"], -1, 0))
+
+        metrics.append(pd.DataFrame(simulate_positions(signal, returns, cost), index=chunk.index))
+    return pd.concat(metrics)
+
+
+def rank_results(results: pd.DataFrame) -> pd.DataFrame:
+    """Best Sharpe ratio first; ties go to the shallower drawdown."""
+    return results.sort_values(["sharpe_ratio", "max_drawdown"], ascending=[False, False], na_position="last", ignore_index=True)
+
+
+def load_features(
+    ticker: str,
+    start_date: str,
+    end_date: str,
+    lookback_days: int = 365,
+    data_provider: Union[str, DataProvider, None] = None,
+) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Technical indicators and closing prices of ``ticker`` up to ``end_date``, computed once
+    with ``lookback_days`` of history before ``start_date`` to warm up the indicators.
+    """
+    history_start = (datetime.strptime(start_date, '%Y-%m-%d') - timedelta(days=lookback_days)).strftime('%Y-%m-%d')
+    prices_df = get_provider(data_provider).get_prices(ticker, history_start, end_date)
+    return technical_features(prices_df), prices_df['close']
+
+
+def sweep_technical_parameters(
+    features: pd.DataFrame,
+    close: pd.Series,
+    start_date: str,
+    end_date: str,
+    grid: Optional[Dict[str, Sequence[float]]] = None,
+    cost: float = 0.0,
+    chunk_size: int = 1024,
+) -> pd.DataFrame:
+    """
+    Evaluate every combination of technical strategy weights and thresholds in ``grid``
+    (DEFAULT_GRID when None) from ``start_date`` to ``end_date``, one row each, best first.
+    """
+    features = features.loc[start_date:end_date]
+    close = close.loc[start_date:end_date].to_numpy(dtype=float)
+    parameters = parameter_grid(grid or DEFAULT_GRID)
+    results = pd.concat([parameters, evaluate_parameters(features, close, parameters, cost, chunk_size)], axis=1)
+    return rank_results(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Grid search over the technical strategy weights and thresholds')
+    parser.add_argument('--ticker', type=str, required=True, help='Stock ticker symbol')
+    parser.add_argument('--start-date', type=str, required=True, help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--end-date', type=str, default=datetime.now().strftime('%Y-%m-%d'), help='End date (YYYY-MM-DD)')
+    parser.add_argument('--grid', type=str, default=None,
+                        help='JSON object of parameter -> values (inline or a file), e.g. \'{"z_score": [1.5, 2, 2.5], '
+                             '"weight_trend": [0.1, 0.3]}\' (default: DEFAULT_GRID)')
+    parser.add_argument('--cost', type=float, default=0.0, help='Cost per unit of turnover, e.g. 0.0015 for 0.15%%')
+    parser.add_argument('--top', type=int, default=20, help='Combinations to print (default: 20)')
+    parser.add_argument('--data-provider', choices=sorted(PROVIDERS), default=None,
+                        help='Market data source (default: $DATA_PROVIDER or vnstock)')
+    parser.add_argument('--output', type=str, default=None, help='Write every ranked combination to this CSV file')
+    args = parser.parse_args()
+
+    grid = None
+    if args.grid:
+        if os.path.exists(args.grid):
+            with open(args.grid) as f:
+                args.grid = f.read()
+        grid = json.loads(args.grid)
+
+    features, close = load_features(args.ticker, args.start_date, args.end_date, data_provider=args.data_provider)
+    started = time.perf_counter()
+    results = sweep_technical_parameters(features, close, args.start_date, args.end_date, grid, cost=args.cost)
+    elapsed = time.perf_counter() - started
+
+    current = {name: [value] for name, value in default_parameters().items()}
+    baseline = sweep_technical_parameters(features, close, args.start_date, args.end_date, current, cost=args.cost).iloc[0]
+    print(f"{len(results)} combinations evaluated in {elapsed:.1f}s")
+    print(f"Current parameters: Sharpe {baseline['sharpe_ratio']:.2f}, max drawdown {baseline['max_drawdown'] * 100:.2f}%, "
+          f"return {baseline['total_return'] * 100:.2f}%\n")
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(results.head(args.top).to_string())
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"\nResults written to {args.output}")
@@ -1,10 +1,66 @@
+import asyncio
 import os
+import threading
+import weakref
 from typing import Dict, Any, List
 import pandas as pd
 import requests
 
 import requests
 
+from tools.lazy import lazy_import
+from tools.replay import replayable
+from tools.single_flight import single_flight
+
+# Only the async functions need httpx, so sync callers never import it
+httpx = lazy_import("httpx")
+
+# Placeholder response of the financial-metrics endpoint, which is not called (see get_financial_metrics)
+FINANCIAL_METRICS_PLACEHOLDER = {
+    "ticker": "<string>",
+    "market_cap": 123,
+    "enterprise_value": 123,
+    "price_to_earnings_ratio": 123,
+    "price_to_book_ratio": 123,
+    "price_to_sales_ratio": 123,
+    "enterprise_value_to_ebitda_ratio": 123,
+    "enterprise_value_to_revenue_ratio": 123,
+    "free_cash_flow_yield": 123,
+    "peg_ratio": 123,
+    "gross_margin": 123,
+    "operating_margin": 123,
+    "net_margin": 123,
+    "return_on_equity": 123,
+    "return_on_assets": 123,
+    "return_on_invested_capital": 123,
+    "asset_turnover": 123,
+    "inventory_turnover": 123,
+    "receivables_turnover": 123,
+    "days_sales_outstanding": 123,
+    "operating_cycle": 123,
+    "working_capital_turnover": 123,
+    "current_ratio": 123,
+    "quick_ratio": 123,
+    "cash_ratio": 123,
+    "operating_cash_flow_ratio": 123,
+    "debt_to_equity": 123,
+    "debt_to_assets": 123,
+    "interest_coverage": 123,
+    "revenue_growth": 123,
+    "earnings_growth": 123,
+    "book_value_growth": 123,
+    "earnings_per_share_growth": 123,
+    "free_cash_flow_growth": 123,
+    "operating_income_growth": 123,
+    "ebitda_growth": 123,
+    "payout_ratio": 123,
+    "earnings_per_share": 123,
+    "book_value_per_share": 123,
+    "free_cash_flow_per_share": 123
+}
+
+@single_flight
+@replayable
 def get_financial_metrics(
     ticker: str,
     report_period: str,
@@ -26,53 +82,14 @@ def get_financial_metrics(
     #         f"Error fetching data: {response.status_code} - {response.text}"
     #     )
     # data = response.json()
-    data = {
-          "ticker": "<string>",
-          "market_cap": 123,
-          "enterprise_value": 123,
-          "price_to_earnings_ratio": 123,
-          "price_to_book_ratio": 123,
-          "price_to_sales_ratio": 123,
-          "enterprise_value_to_ebitda_ratio": 123,
-          "enterprise_value_to_revenue_ratio": 123,
-          "free_cash_flow_yield": 123,
-          "peg_ratio": 123,
-          "gross_margin": 123,
-          "operating_margin": 123,
-          "net_margin": 123,
-          "return_on_equity": 123,
-          "return_on_assets": 123,
-          "return_on_invested_capital": 123,
-          "asset_turnover": 123,
-          "inventory_turnover": 123,
-          "receivables_turnover": 123,
-          "days_sales_outstanding": 123,
-          "operating_cycle": 123,
-          "working_capital_turnover": 123,
-          "current_ratio": 123,
-          "quick_ratio": 123,
-          "cash_ratio": 123,
-          "operating_cash_flow_ratio": 123,
-          "debt_to_equity": 123,
-          "debt_to_assets": 123,
-          "interest_coverage": 123,
-          "revenue_growth": 123,
-          "earnings_growth": 123,
-          "book_value_growth": 123,
-          "earnings_per_share_growth": 123,
-          "free_cash_flow_growth": 123,
-          "operating_income_growth": 123,
-          "ebitda_growth": 123,
-          "payout_ratio": 123,
-          "earnings_per_share": 123,
-          "book_value_per_share": 123,
-          "free_cash_flow_per_share": 123
-        }
+    data = FINANCIAL_METRICS_PLACEHOLDER
     financial_metrics = data.get("financial_metrics")
     if not financial_metrics:
         raise ValueError("No financial metrics returned")
     return financial_metrics
 
+@single_flight
+@replayable
 def search_line_items(
     ticker: str,
     line_items: List[str],
@@ -100,6 +117,8 @@ def search_line_items(
         raise ValueError("No search results returned")
     return search_results
 
+@single_flight
+@replayable
 def get_insider_trades(
     ticker: str,
     end_date: str,
@@ -126,6 +145,8 @@ def get_insider_trades(
         raise ValueError("No insider trades returned")
     return insider_trades
 
+@single_flight
+@replayable
 def get_market_cap(
     ticker: str,
 ) -> List[Dict[str, Any]]:
@@ -147,6 +168,8 @@ def get_market_cap(
         raise ValueError("No company facts returned")
     return company_facts.get('market_cap')
 
+@single_flight
+@replayable
 def get_prices(
     ticker: str,
     start_date: str,
@@ -185,6 +208,7 @@ def prices_to_df(prices: List[Dict[str, Any]]) -> pd.DataFrame:
     return df
 
 # Update the get_price_data function to use the new functions
+@single_flight
 def get_price_data(
     ticker: str,
     start_date: str,
@@ -192,3 +216,137 @@ def get_price_data(
 ) -> pd.DataFrame:
     prices = get_prices(ticker, start_date, end_date)
     return prices_to_df(prices)
+
+
+##### Async API #####
+FINANCIAL_DATASETS_URL = "https://api.financialdatasets.ai"
+
+# One pooled keep-alive client per event loop (an httpx.AsyncClient cannot be shared across loops)
+_async_clients = weakref.WeakKeyDictionary()
+_async_clients_lock = threading.Lock()
+
+def get_async_client() -> "httpx.AsyncClient":
+    """Shared HTTP client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = _async_clients[loop] = httpx.AsyncClient(
+                base_url=FINANCIAL_DATASETS_URL,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                timeout=httpx.Timeout(30.0),
+            )
+        return client
+
+async def aclose_async_client():
+    """Close the shared client of the running event loop; call before the loop shuts down."""
+    with _async_clients_lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+async def _arequest(method: str, path: str, **kwargs) -> Dict[str, Any]:
+    headers = {"X-API-KEY": os.environ.get("FINANCIAL_DATASETS_API_KEY")}
+    response = await get_async_client().request(method, path, headers=headers, **kwargs)
+    if response.status_code != 200:
+        raise Exception(
+            f"Error fetching data: {response.status_code} - {response.text}"
+        )
+    return response.json()
+
+@single_flight
+@replayable
+async def aget_financial_metrics(
+    ticker: str,
+    report_period: str,
+    period: str = 'ttm',
+    limit: int = 1
+) -> List[Dict[str, Any]]:
+    """Fetch financial metrics from the API."""
+    # Same placeholder as get_financial_metrics, so --async serves the same data;
+    # the request is: await _arequest("GET", "/financial-metrics/", params={"ticker": ticker,
+    # "report_period_lte": report_period, "limit": limit, "period": period})
+    data = FINANCIAL_METRICS_PLACEHOLDER
+    financial_metrics = data.get("financial_metrics")
+    if not financial_metrics:
+        raise ValueError("No financial metrics returned")
+    return financial_metrics
+
+@single_flight
+@replayable
+async def asearch_line_items(
+    ticker: str,
+    line_items: List[str],
+    period: str = 'ttm',
+    limit: int = 1
+) -> List[Dict[str, Any]]:
+    """Fetch cash flow statements from the API."""
+    data = await _arequest("POST", "/financials/search/line-items", json={
+        "tickers": [ticker],
+        "line_items": line_items,
+        "period": period,
+        "limit": limit
+    })
+    search_results = data.get("search_results")
+    if not search_results:
+        raise ValueError("No search results returned")
+    return search_results
+
+@single_flight
+@replayable
+async def aget_insider_trades(
+    ticker: str,
+    end_date: str,
+    limit: int = 5,
+) -> List[Dict[str, Any]]:
+    """Fetch insider trades for a given ticker and date range."""
+    data = await _arequest("GET", "/insider-trades/", params={
+        "ticker": ticker,
+        "filing_date_lte": end_date,
+        "limit": limit,
+    })
+    insider_trades = data.get("insider_trades")
+    if not insider_trades:
+        raise ValueError("No insider trades returned")
+    return insider_trades
+
+@single_flight
+@replayable
+async def aget_market_cap(
+    ticker: str,
+) -> List[Dict[str, Any]]:
+    """Fetch market cap from the API."""
+    data = await _arequest("GET", "/company/facts", params={"ticker": ticker})
+    company_facts = data.get('company_facts')
+    if not company_facts:
+        raise ValueError("No company facts returned")
+    return company_facts.get('market_cap')
+
+@single_flight
+@replayable
+async def aget_prices(
+    ticker: str,
+    start_date: str,
+    end_date: str
+) -> List[Dict[str, Any]]:
+    """Fetch price data from the API."""
+    data = await _arequest("GET", "/prices/", params={
+        "ticker": ticker,
+        "interval": "day",
+        "interval_multiplier": 1,
+        "start_date": start_date,
+        "end_date": end_date,
+    })
+    prices = data.get("prices")
+    if not prices:
+        raise ValueError("No price data returned")
+    return prices
+
+@single_flight
+async def aget_price_data(
+    ticker: str,
+    start_date: str,
+    end_date: str
+) -> pd.DataFrame:
+    prices = await aget_prices(ticker, start_date, end_date)
+    return prices_to_df(prices)
@@ -1,20 +1,38 @@
+import asyncio
 import os
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List
 import pandas as pd
 import requests
 from datetime import datetime
 
 import requests
 
-from vnstock3 import Vnstock
+from tools.client_pool import get_client_pool, shared_http_session
+from tools.frames import prices_to_df, read_only
+from tools.fundamentals_cache import FundamentalsCache
+from tools.price_store import PriceStore
+from tools.rate_limit import call_with_retry
+from tools.replay import replayable
+from tools.single_flight import single_flight
 
+_price_store = PriceStore()
+_fundamentals_cache = FundamentalsCache()
 
+
+def _vnstock_call(source: str, fn: Callable[[], Any]) -> Any:
+    """Rate-limited, retried vnstock request over the calling thread's keep-alive session."""
+    with shared_http_session():
+        return call_with_retry(source, fn)
+
+
+@single_flight
+@replayable
 def get_financial_metrics(
         ticker: str,
         report_period: str,
         period: str = 'year',
         limit: int = 1
-) -> List[Dict[str, Any]]:
+) -> pd.DataFrame:
     """Fetch financial metrics from the API.
     ['ticker', 'yearReport', 'lengthReport', '(ST+LT borrowings)/Equity',
        'Debt/Equity', 'Fixed Asset-To-Equity',
@@ -63,17 +81,31 @@ def get_financial_metrics(
        'Increase/Decrease in receivables', 'Increase/Decrease in payables']
     """
 
-    stock = Vnstock().stock(symbol=ticker, source='VCI')
+    table = _fundamentals_cache.get(ticker, period, fetch=_fetch_financial_table)
+
+    # Point-in-time lookup: the last annual report published before report_period
+    year = datetime.strptime(report_period, '%Y-%m-%d').year - 1
+    financial_metrics = table.loc[[year]] if year in table.index else table.iloc[0:0]
+
+    if financial_metrics.empty:
+        raise ValueError("No financial metrics returned")
+    return read_only(financial_metrics)
+
+
+def _fetch_financial_table(
+        ticker: str,
+        period: str = 'year',
+) -> pd.DataFrame:
+    """Fetch ratios, income statement and cash flow for every reported year and merge them into one table indexed by yearReport."""
+    stock = get_client_pool().stock(ticker, 'VCI')
     # df = stock.quote.history(symbol='FPT', start='2024-01-01', end='2024-12-25', interval='1D')
-    df = stock.finance.ratio(period=period, lang='en', dropna=True)
+    df = _vnstock_call('VCI', lambda: stock.finance.ratio(period=period, lang='en', dropna=True))
     df.columns = ['_'.join(filter(None, col)).strip().split('_')[1] for col in df.columns.values]
-    data = stock.finance.income_statement(period=period, lang='en', dropna=True)
+    data = _vnstock_call('VCI', lambda: stock.finance.income_statement(period=period, lang='en', dropna=True))
     df = df.merge(data, on=['ticker', 'yearReport'], how='left')
-    data = stock.finance.cash_flow(period=period, dropna=True)
+    data = _vnstock_call('VCI', lambda: stock.finance.cash_flow(period=period, dropna=True))
     df = df.merge(data, on=['ticker', 'yearReport'], how='left')
 
-    df = df[df["yearReport"] == datetime.strptime(report_period, '%Y-%m-%d').year - 1]
-
     # Calculate Free Cash Flow
     operating_cash_flow = df['Net cash inflows/outflows from operating activities']
     capital_expenditures = df['Purchase of fixed assets']
@@ -107,19 +139,17 @@ def get_financial_metrics(
         "P/S": "price_to_sales_ratio"
     })
 
-    financial_metrics = df.to_json(orient='records', date_format='iso')
-
-    if not financial_metrics:
-        raise ValueError("No financial metrics returned")
-    return financial_metrics
+    return df.set_index('yearReport', drop=False)
 
 
+@single_flight
+@replayable
 def search_line_items(
         ticker: str,
         line_items: List[str],
         period: str = 'year',
         limit: int = 1
-) -> List[Dict[str, Any]]:
+) -> pd.DataFrame:
     """Fetch cash flow statements from the API.
     {
       "search_results": [
@@ -133,20 +163,21 @@ def search_line_items(
     }
     """
 
-    stock = Vnstock().stock(symbol=ticker, source='VCI')
-    search_results = stock.finance.cash_flow(period=period, lang='en', dropna=True).head()
+    stock = get_client_pool().stock(ticker, 'VCI')
+    search_results = _vnstock_call('VCI', lambda: stock.finance.cash_flow(period=period, lang='en', dropna=True)).head()
     # search_results = data[data['yearReport']]
-    search_results = search_results.to_json(orient='records', date_format='iso')
-    if not search_results:
+    if search_results.empty:
         raise ValueError("No search results returned")
-    return search_results
+    return read_only(search_results)
 
 
+@single_flight
+@replayable
 def get_insider_trades(
         ticker: str,
         end_date: str,
         limit: int = 5,
-) -> List[Dict[str, Any]]:
+) -> pd.DataFrame:
     """
     Fetch insider trades for a given ticker and date range.
     {
@@ -169,21 +200,22 @@ def get_insider_trades(
         ]
     }
     """
-    company = Vnstock().stock(symbol=ticker, source='TCBS').company
-    insider_trades = company.insider_deals()
+    company = get_client_pool().stock(ticker, 'TCBS').company
+    insider_trades = _vnstock_call('TCBS', company.insider_deals)
     insider_trades = insider_trades[insider_trades['deal_announce_date'] <= end_date]
 
     insider_trades = insider_trades.rename(columns={
         "deal_quantity": "transaction_shares"
     })
-    insider_trades = insider_trades.to_json(orient='records',date_format='iso')
 
-    return insider_trades
+    return read_only(insider_trades)
 
 
+@single_flight
+@replayable
 def get_market_cap(
         ticker: str,
-) -> List[Dict[str, Any]]:
+) -> pd.DataFrame:
     """Fetch market cap from the API.
     {
       "company_facts": {
@@ -201,49 +233,47 @@ def get_market_cap(
       }
     }
     """
-    company = Vnstock().stock(symbol=ticker, source='TCBS').company
+    company = get_client_pool().stock(ticker, 'TCBS').company
 
-    company_facts = company.overview().to_json(orient='records')
-    if not company_facts:
+    company_facts = _vnstock_call('TCBS', company.overview)
+    if company_facts.empty:
         raise ValueError("No company facts returned")
-    return company_facts
+    return read_only(company_facts)
 
 
-def get_prices(
+def _fetch_prices(
         ticker: str,
         start_date: str,
         end_date: str
-) -> List[Dict[str, Any]]:
-    stock = Vnstock().stock(symbol=ticker, source='VCI')
+) -> pd.DataFrame:
+    """Fetch daily bars straight from the source, bypassing the local price store."""
+    stock = get_client_pool().stock(ticker, 'VCI')
 
-    df = stock.quote.history(
+    return _vnstock_call('VCI', lambda: stock.quote.history(
         symbol=ticker,
         start=start_date,
         end=end_date,
         interval='1D'
-    )
+    ))
 
-    prices = df.to_json(orient='records', date_format='iso')
 
-    if not prices:
+@single_flight
+@replayable
+def get_prices(
+        ticker: str,
+        start_date: str,
+        end_date: str
+) -> pd.DataFrame:
+    """Fetch daily bars, served from the local price store and topped up from the source."""
+    prices = _price_store.get(ticker, start_date, end_date, fetch=_fetch_prices)
+
+    if prices.empty:
         raise ValueError("No price data returned")
     return prices
 
 
-def prices_to_df(prices: List[Dict[str, Any]]) -> pd.DataFrame:
-    """Convert prices to a DataFrame."""
-
-    df = pd.DataFrame(eval(prices))
-    df["Date"] = pd.to_datetime(df["time"])
-    df.set_index("Date", inplace=True)
-    numeric_cols = ["open", "close", "high", "low", "volume"]
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    df.sort_index(inplace=True)
-    return df
-
-
 # Update the get_price_data function to use the new functions
+@single_flight
 def get_price_data(
         ticker: str,
         start_date: str,
@@ -251,3 +281,55 @@ def get_price_data(
 ) -> pd.DataFrame:
     prices = get_prices(ticker, start_date, end_date)
     return prices_to_df(prices)
+
+
+##### Async variants #####
+# vnstock only offers blocking calls, so these run the functions above on worker threads
+
+async def aget_financial_metrics(
+        ticker: str,
+        report_period: str,
+        period: str = 'year',
+        limit: int = 1
+) -> pd.DataFrame:
+    return await asyncio.to_thread(get_financial_metrics, ticker, report_period, period, limit)
+
+
+async def asearch_line_items(
+        ticker: str,
+        line_items: List[str],
+        period: str = 'year',
+        limit: int = 1
+) -> pd.DataFrame:
+    return await asyncio.to_thread(search_line_items, ticker, line_items, period, limit)
+
+
+async def aget_insider_trades(
+        ticker: str,
+        end_date: str,
+        limit: int = 5,
+) -> pd.DataFrame:
+    return await asyncio.to_thread(get_insider_trades, ticker, end_date, limit)
+
+
+async def aget_market_cap(
+        ticker: str,
+) -> pd.DataFrame:
+    return await asyncio.to_thread(get_market_cap, ticker)
+
+
+async def aget_prices(
+        ticker: str,
+        start_date: str,
+        end_date: str
+) -> pd.DataFrame:
+    return await asyncio.to_thread(get_prices, ticker, start_date, end_date)
+
+
+async def aget_price_data(
+        ticker: str,
+        start_date: str,
+        end_date: str
+) -> pd.DataFrame:
+    prices = await aget_prices(ticker, start_date, end_date)
+    return prices_to_df(prices)
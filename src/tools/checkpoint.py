@@ -0,0 +1,40 @@
+import os
+import pickle
+import re
+from typing import Any, Optional
+
+from tools.env import env_setting
+
+CHECKPOINT_DIR = env_setting("CHECKPOINT_DIR", os.path.join(
+    os.path.expanduser("~"), ".cache", "vnindex-hedge-fund", "checkpoints",
+))
+# Simulated days between two checkpoints of a backtest; 0 only saves when the run fails
+CHECKPOINT_EVERY = env_setting("CHECKPOINT_EVERY", 10, int)
+
+
+def checkpoint_path(*parts: Any, root: str = CHECKPOINT_DIR) -> str:
+    """Checkpoint file of the run identified by ``parts``, e.g. (ticker, start date, end date, mode)."""
+    name = "_".join(re.sub(r"[^\w.-]+", "-", str(part)) for part in parts)
+    return os.path.join(root, f"{name}.pkl")
+
+
+def save_checkpoint(path: str, state: Any):
+    """Pickle ``state`` to ``path`` atomically: an interrupted save leaves the previous checkpoint intact."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str) -> Optional[Any]:
+    """State saved at ``path``, or None if there is no checkpoint."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def remove_checkpoint(path: str):
+    if os.path.exists(path):
+        os.remove(path)
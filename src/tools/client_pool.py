@@ -0,0 +1,198 @@
+import atexit
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.cookiejar import DefaultCookiePolicy
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tools.env import env_setting
+
+# Most (ticker, source) clients kept alive; 0 builds a new client for every request
+CLIENT_POOL_SIZE = env_setting("CLIENT_POOL_SIZE", 256, int)
+# Keep-alive connections kept per host by the shared HTTP session
+HTTP_POOL_SIZE = env_setting("HTTP_POOL_SIZE", 32, int)
+
+
+def make_session(pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+    """
+    requests Session keeping up to ``pool_size`` connections per host alive. Cookies are
+    never stored, so requests behave like the module-level requests.get/post calls.
+    """
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class SessionRequests:
+    """
+    Stand-in for the ``requests`` module whose request functions go through a keep-alive
+    Session of the calling thread: requests.Session is not documented as thread-safe, and
+    vnstock calls run on the threads of run_hedge_fund_many and fetch_concurrently.
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE):
+        self.pool_size = pool_size
+        self._local = threading.local()
+        # Sessions of live threads, to close them on shutdown
+        self._sessions: "weakref.WeakSet[requests.Session]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = make_session(self.pool_size)
+            with self._lock:
+                self._sessions.add(session)
+        return session
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions)
+        for session in sessions:
+            session.close()
+
+    def __getattr__(self, name: str) -> Any:
+        # exceptions, codes, ... come from the real module
+        return getattr(requests, name)
+
+    def request(self, method, url, **kwargs):
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, params=None, **kwargs):
+        return self.session.get(url, params=params, **kwargs)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        return self.session.post(url, data=data, json=json, **kwargs)
+
+
+_session_requests = SessionRequests()
+atexit.register(_session_requests.close)
+
+# vnstock3 modules pointed at _session_requests, and the attribute they had before
+_patched_modules: Dict[str, Any] = {}
+# shared_http_session blocks running, in any thread
+_active_sessions = 0
+_patch_lock = threading.Lock()
+
+
+def _patch_vnstock_modules():
+    for name, module in list(sys.modules.items()):
+        if name.startswith("vnstock3") and getattr(module, "requests", None) is requests:
+            _patched_modules[name] = module.requests
+            module.requests = _session_requests
+
+
+def _restore_vnstock_modules():
+    for name, original in _patched_modules.items():
+        module = sys.modules.get(name)
+        if module is not None and getattr(module, "requests", None) is _session_requests:
+            module.requests = original
+    _patched_modules.clear()
+
+
+@contextmanager
+def shared_http_session() -> Iterator[None]:
+    """
+    Send the vnstock3 requests made in this block through the calling thread's keep-alive
+    session: vnstock3 calls requests.get and requests.post directly, which opens a new
+    connection (and TLS handshake) per request, and takes no session to use instead.
+    The loaded vnstock3 modules get the SessionRequests stand-in as their ``requests``
+    while any thread is in such a block, and their own back when the last one exits.
+    Every block also patches the vnstock3 modules loaded since the previous one.
+    """
+    global _active_sessions
+    with _patch_lock:
+        _active_sessions += 1
+        _patch_vnstock_modules()
+    try:
+        yield
+    finally:
+        with _patch_lock:
+            _active_sessions -= 1
+            if _active_sessions == 0:
+                _restore_vnstock_modules()
+
+
+def _build_client(ticker: str, source: str) -> Any:
+    from vnstock3 import Vnstock
+    with shared_http_session():
+        return Vnstock().stock(symbol=ticker, source=source)
+
+
+class ClientPool:
+    """
+    Long-lived vnstock stock clients, one per (ticker, source). Building one sets up
+    its quote, finance, company, listing and trading components, so clients are reused
+    across calls and the least recently used one is dropped beyond ``maxsize``.
+    """
+
+    def __init__(self, maxsize: int = CLIENT_POOL_SIZE, factory: Callable[[str, str], Any] = _build_client):
+        self.maxsize = maxsize
+        self.factory = factory
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+        self._clients: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stock(self, ticker: str, source: str) -> Any:
+        """Client of ``ticker`` on ``source``, as Vnstock().stock(symbol=ticker, source=source)."""
+        key = (ticker, source)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self.reused += 1
+                return client
+
+        # Built outside the lock: construction can take a while
+        client = self.factory(ticker, source)
+        with self._lock:
+            self.created += 1
+            if self.maxsize > 0:
+                client = self._clients.setdefault(key, client)
+                self._clients.move_to_end(key)
+                self._evict()
+        return client
+
+    def resize(self, maxsize: int):
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def _evict(self):
+        while len(self._clients) > max(self.maxsize, 0):
+            self._clients.popitem(last=False)
+            self.evicted += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._clients),
+                "created": self.created,
+                "reused": self.reused,
+                "evicted": self.evicted,
+            }
+
+
+_client_pool = ClientPool()
+
+
+def get_client_pool(maxsize: Optional[int] = None) -> ClientPool:
+    """Process-wide ClientPool used by tools.api_vnindex, optionally resized."""
+    if maxsize is not None:
+        _client_pool.resize(maxsize)
+    return _client_pool
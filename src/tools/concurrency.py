@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from tools.env import env_setting
+
+# Process-wide caps on concurrent data fetches and LLM calls, shared by every
+# graph run in the process (see main.run_hedge_fund_many).
+DEFAULT_MAX_FETCHES = 8
+DEFAULT_MAX_LLM_CALLS = 4
+# Seconds each call of fetch_concurrently may take, including the wait for a fetch slot
+FETCH_TIMEOUT = env_setting("FETCH_TIMEOUT", 60, float)
+
+_fetch_slots = threading.BoundedSemaphore(DEFAULT_MAX_FETCHES)
+_llm_slots = threading.BoundedSemaphore(DEFAULT_MAX_LLM_CALLS)
+
+# Async fetches are capped per event loop, since asyncio semaphores are bound to one loop
+_max_fetches = DEFAULT_MAX_FETCHES
+_async_fetch_slots = weakref.WeakKeyDictionary()
+_async_fetch_slots_lock = threading.Lock()
+
+
+def configure_limits(max_fetches: Optional[int] = None, max_llm_calls: Optional[int] = None):
+    """Set the concurrency limits. Call before starting runs; in-flight calls keep their old slots."""
+    global _fetch_slots, _llm_slots, _max_fetches
+    if max_fetches is not None:
+        _fetch_slots = threading.BoundedSemaphore(max_fetches)
+        _max_fetches = max_fetches
+        with _async_fetch_slots_lock:
+            _async_fetch_slots.clear()
+    if max_llm_calls is not None:
+        _llm_slots = threading.BoundedSemaphore(max_llm_calls)
+
+
+@contextmanager
+def fetch_slot():
+    """Hold one of the data fetch slots for the duration of the block."""
+    slots = _fetch_slots
+    with slots:
+        yield
+
+
+@asynccontextmanager
+async def async_fetch_slot():
+    """Hold one of the data fetch slots of the running event loop for the duration of the block."""
+    loop = asyncio.get_running_loop()
+    with _async_fetch_slots_lock:
+        slots = _async_fetch_slots.get(loop)
+        if slots is None:
+            slots = _async_fetch_slots[loop] = asyncio.Semaphore(_max_fetches)
+    async with slots:
+        yield
+
+
+@contextmanager
+def llm_slot():
+    """Hold one of the LLM call slots for the duration of the block."""
+    slots = _llm_slots
+    with slots:
+        yield
+
+
+def fetch_concurrently(
+        calls: Dict[str, Callable[[], Any]],
+        timeout: Optional[float] = FETCH_TIMEOUT,
+) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Run the named zero-argument fetch calls at once, each holding a fetch slot.
+
+    Returns ``(results, latencies)`` keyed by name, latencies in seconds spent in the call
+    itself. The first failing call (in ``calls`` order) re-raises its exception; a call
+    still running after ``timeout`` seconds raises TimeoutError and is left to finish
+    in the background.
+    """
+    latencies = {}
+
+    def run(name: str, call: Callable[[], Any]) -> Any:
+        with fetch_slot():
+            start = time.perf_counter()
+            try:
+                return call()
+            finally:
+                latencies[name] = time.perf_counter() - start
+
+    executor = ThreadPoolExecutor(max_workers=len(calls) or 1, thread_name_prefix="fetch")
+    try:
+        futures = {name: executor.submit(run, name, call) for name, call in calls.items()}
+        deadline = None if timeout is None else time.monotonic() + timeout
+        results = {}
+        for name, future in futures.items():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                results[name] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                raise TimeoutError(f"{name} did not finish within {timeout} seconds") from None
+        return results, dict(latencies)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def afetch_concurrently(
+        calls: Dict[str, Callable[[], Awaitable[Any]]],
+        timeout: Optional[float] = FETCH_TIMEOUT,
+) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """Async counterpart of fetch_concurrently for coroutine functions; timed-out calls are cancelled."""
+    latencies = {}
+
+    async def run(name: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        async with async_fetch_slot():
+            start = time.perf_counter()
+            try:
+                return await call()
+            finally:
+                latencies[name] = time.perf_counter() - start
+
+    async def run_with_timeout(name: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await asyncio.wait_for(run(name, call), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{name} did not finish within {timeout} seconds") from None
+
+    outcomes = await asyncio.gather(
+        *(run_with_timeout(name, call) for name, call in calls.items()),
+        return_exceptions=True,
+    )
+    results = {}
+    for name, outcome in zip(calls, outcomes):
+        if isinstance(outcome, BaseException):
+            raise outcome
+        results[name] = outcome
+    return results, dict(latencies)
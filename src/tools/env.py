@@ -0,0 +1,11 @@
+import os
+from typing import Any, Callable
+
+
+def env_setting(name: str, default: Any, parse: Callable[[str], Any] = str) -> Any:
+    """
+    Setting ``name`` from the environment parsed with ``parse``, or ``default`` when it is
+    unset or empty (.env.example lists the optional settings with empty values).
+    """
+    value = os.environ.get(name)
+    return parse(value) if value else default
@@ -0,0 +1,33 @@
+import json
+from typing import Any, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+
+def read_only(df: pd.DataFrame) -> pd.DataFrame:
+    """Mark the column buffers of df read-only, in place, so a frame shared through the agent state cannot be modified by its readers."""
+    for values in df._mgr.arrays:
+        if isinstance(values, np.ndarray):
+            values.flags.writeable = False
+    return df
+
+
+def prices_to_df(prices: Union[pd.DataFrame, str, List[Dict[str, Any]]]) -> pd.DataFrame:
+    """
+    Convert prices to a read-only DataFrame indexed by Date.
+    A frame that is already indexed by Date is returned as is, so every agent reads the same buffers.
+    """
+    if isinstance(prices, pd.DataFrame) and isinstance(prices.index, pd.DatetimeIndex):
+        return prices
+
+    if isinstance(prices, str):
+        prices = json.loads(prices)
+    df = pd.DataFrame(prices, copy=True)
+    df["Date"] = pd.to_datetime(df["time"])
+    df.set_index("Date", inplace=True)
+    numeric_cols = ["open", "close", "high", "low", "volume"]
+    for col in numeric_cols:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df.sort_index(inplace=True)
+    return read_only(df)
@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Tuple
+
+import pandas as pd
+
+from tools.env import env_setting
+
+FUNDAMENTALS_CACHE_DIR = env_setting("FUNDAMENTALS_CACHE_DIR", os.path.join(
+    os.path.expanduser("~"), ".cache", "vnindex-hedge-fund", "fundamentals",
+))
+# Annual reports change a few times a year at most; refetch weekly by default
+FUNDAMENTALS_CACHE_TTL = env_setting("FUNDAMENTALS_CACHE_TTL", 7 * 24 * 3600, float)
+
+
+class FundamentalsCache:
+    """
+    Persistent cache of the merged multi-year fundamentals table of each ticker.
+
+    Tables are pickled to ``<root>/<TICKER>_<period>.pkl`` and kept in memory once
+    loaded. An entry older than ``ttl`` seconds is refetched on the next access.
+    """
+
+    def __init__(self, root: str = FUNDAMENTALS_CACHE_DIR, ttl: float = FUNDAMENTALS_CACHE_TTL):
+        self.root = root
+        self.ttl = ttl
+        self._tables: Dict[Tuple[str, str], Tuple[float, pd.DataFrame]] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _path(self, ticker: str, period: str) -> str:
+        return os.path.join(self.root, f"{ticker.upper()}_{period}.pkl")
+
+    def _lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, ticker: str, period: str, fetch: Callable[[str, str], pd.DataFrame]) -> pd.DataFrame:
+        """Return the cached table, calling ``fetch(ticker, period)`` if it is missing or expired."""
+        key = (ticker.upper(), period)
+        with self._lock(key):
+            now = time.time()
+
+            cached = self._tables.get(key)
+            if cached is not None and now - cached[0] < self.ttl:
+                return cached[1]
+
+            path = self._path(ticker, period)
+            if os.path.exists(path) and now - os.path.getmtime(path) < self.ttl:
+                table = pd.read_pickle(path)
+                self._tables[key] = (os.path.getmtime(path), table)
+                return table
+
+            table = fetch(ticker, period)
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            table.to_pickle(tmp_path)
+            os.replace(tmp_path, path)
+            self._tables[key] = (now, table)
+            return table
+
+    def invalidate(self, ticker: str, period: str = "year"):
+        key = (ticker.upper(), period)
+        with self._lock(key):
+            self._tables.pop(key, None)
+            path = self._path(ticker, period)
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+from tools.env import env_setting
+
+LLM_CACHE_PATH = env_setting("LLM_CACHE_PATH", os.path.join(
+    os.path.expanduser("~"), ".cache", "vnindex-hedge-fund", "llm_cache.sqlite",
+))
+LLM_CACHE_MAX_ENTRIES = env_setting("LLM_CACHE_MAX_ENTRIES", 10000, int)
+LLM_CACHE_MAX_BYTES = env_setting("LLM_CACHE_MAX_BYTES", 100 * 1024 * 1024, int)
+
+
+class LLMCache:
+    """
+    Persistent cache of LLM responses keyed by a hash of the rendered prompt and model parameters.
+
+    Entries live in a SQLite file so they survive restarts and can be shared by several
+    processes. The least recently used entries are evicted once the cache holds more
+    than ``max_entries`` responses or ``max_bytes`` of response text.
+    """
+
+    def __init__(
+            self,
+            path: str = LLM_CACHE_PATH,
+            max_entries: int = LLM_CACHE_MAX_ENTRIES,
+            max_bytes: int = LLM_CACHE_MAX_BYTES,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, content TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(messages: Sequence[Any], **model_params) -> str:
+        """Hash the rendered prompt messages together with the model parameters."""
+        payload = {
+            "messages": [(message.type, message.content) for message in messages],
+            "model_params": model_params,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, content: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, content, len(content.encode()), time.time()),
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection):
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+        # Walk from the least recently used entry until both limits hold again
+        stale = []
+        for key, entry_size in conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if entries <= self.max_entries and size <= self.max_bytes:
+                break
+            stale.append((key,))
+            entries -= 1
+            size -= entry_size
+        conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        self.evictions += len(stale)
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters of this process plus the current size of the cache."""
+        with self._lock:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Process-wide LLMCache configured from the LLM_CACHE_* environment variables."""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache()
+        return _llm_cache
@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tools.env import env_setting
+
+try:
+    import fcntl
+except ImportError:  # Windows: partitions are only locked between the threads of one process
+    fcntl = None
+
+
+PRICE_STORE_DIR = env_setting("PRICE_STORE_DIR", os.path.join(
+    os.path.expanduser("~"), ".cache", "vnindex-hedge-fund", "prices",
+))
+
+# One record per daily bar, laid out so a partition can be memory-mapped with np.load
+PRICE_DTYPE = np.dtype([
+    ("time", "datetime64[D]"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "i8"),
+])
+
+
+class PriceStore:
+    """
+    Columnar on-disk store of daily bars, one partition per ticker.
+
+    Each ticker is kept as a ``<TICKER>.npy`` structured array sorted by date plus a
+    ``<TICKER>.json`` sidecar recording the date range that has already been requested
+    from the source. Reads memory-map the partition and only the missing head or tail
+    of a requested window is fetched and merged in. The read-merge-write of a ticker
+    holds an exclusive lock on ``<TICKER>.lock``, so processes sharing the store never
+    record coverage for bars another process's write dropped.
+    """
+
+    def __init__(self, root: str = PRICE_STORE_DIR):
+        self.root = root
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, ticker: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    @contextmanager
+    def _locked(self, ticker: str) -> Iterator[None]:
+        """Hold the partition of ``ticker`` against other threads and processes."""
+        with self._lock(ticker):
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, f"{ticker.upper()}.lock"), "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _paths(self, ticker: str) -> Tuple[str, str]:
+        base = os.path.join(self.root, ticker.upper())
+        return f"{base}.npy", f"{base}.json"
+
+    def read(self, ticker: str) -> np.ndarray:
+        """Memory-map the stored bars of a ticker (empty array if nothing is stored)."""
+        data_path, _ = self._paths(ticker)
+        if not os.path.exists(data_path):
+            return np.empty(0, dtype=PRICE_DTYPE)
+        return np.load(data_path, mmap_mode="r")
+
+    def coverage(self, ticker: str) -> Optional[Tuple[np.datetime64, np.datetime64]]:
+        """Return the (start, end) dates already fetched for a ticker, if any."""
+        _, meta_path = self._paths(ticker)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        start, end = np.datetime64(meta["start"], "D"), np.datetime64(meta["end"], "D")
+        # A window that only covered today's forming bar is not coverage yet
+        if end < start:
+            return None
+        return start, end
+
+    def write(self, ticker: str, bars: np.ndarray, start: np.datetime64, end: np.datetime64):
+        """
+        Merge new bars into the partition (new bars win on duplicate dates). Callers hold
+        _locked(ticker): the data and its coverage are two files replaced one after the other.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        data_path, meta_path = self._paths(ticker)
+
+        merged = np.concatenate([bars, np.asarray(self.read(ticker))])
+        _, first = np.unique(merged["time"], return_index=True)
+        merged = merged[first]
+
+        # Write to temp files and swap them in so concurrent readers never see a partial file
+        tmp_data = f"{data_path}.{os.getpid()}.tmp"
+        with open(tmp_data, "wb") as f:
+            np.save(f, merged)
+        os.replace(tmp_data, data_path)
+
+        tmp_meta = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_meta, "w") as f:
+            json.dump({"start": str(start), "end": str(end)}, f)
+        os.replace(tmp_meta, meta_path)
+
+    def get(
+            self,
+            ticker: str,
+            start_date: str,
+            end_date: str,
+            fetch: Callable[[str, str, str], pd.DataFrame],
+    ) -> pd.DataFrame:
+        """
+        Serve the bars of ``[start_date, end_date]`` from disk, calling
+        ``fetch(ticker, start, end)`` only for the part of the window not stored yet.
+        """
+        start = np.datetime64(start_date, "D")
+        end = np.datetime64(end_date, "D")
+        # Today's bar may still be forming, so coverage never extends past yesterday
+        last_final_day = np.datetime64(datetime.now().date() - timedelta(days=1), "D")
+
+        with self._locked(ticker):
+            covered = self.coverage(ticker)
+            if covered is None:
+                missing = [(start, end)]
+                new_start, new_end = start, end
+            else:
+                covered_start, covered_end = covered
+                missing = []
+                if start < covered_start:
+                    missing.append((start, covered_start - 1))
+                if end > covered_end:
+                    missing.append((covered_end + 1, end))
+                new_start, new_end = min(start, covered_start), max(end, covered_end)
+
+            if missing:
+                fetched = [
+                    frame_to_bars(fetch(ticker, str(lo), str(hi)))
+                    for lo, hi in missing
+                ]
+                self.write(ticker, np.concatenate(fetched), new_start, min(new_end, last_final_day))
+
+            return bars_to_frame(self.slice(ticker, start, end))
+
+    def slice(self, ticker: str, start: np.datetime64, end: np.datetime64) -> np.ndarray:
+        """Zero-copy view of the stored bars between two dates (inclusive)."""
+        bars = self.read(ticker)
+        lo = np.searchsorted(bars["time"], start, side="left")
+        hi = np.searchsorted(bars["time"], end, side="right")
+        return bars[lo:hi]
+
+
+def frame_to_bars(df: pd.DataFrame) -> np.ndarray:
+    """Convert a vnstock ``quote.history`` frame to PRICE_DTYPE records."""
+    bars = np.empty(len(df), dtype=PRICE_DTYPE)
+    if len(df) == 0:
+        return bars
+    bars["time"] = pd.to_datetime(df["time"]).values.astype("datetime64[D]")
+    for col in ["open", "high", "low", "close", "volume"]:
+        bars[col] = df[col].to_numpy()
+    return bars
+
+
+def bars_to_frame(bars: np.ndarray) -> pd.DataFrame:
+    """Convert PRICE_DTYPE records back to the frame layout returned by vnstock."""
+    return pd.DataFrame({
+        "time": bars["time"].astype("datetime64[ns]"),
+        "open": bars["open"],
+        "high": bars["high"],
+        "low": bars["low"],
+        "close": bars["close"],
+        "volume": bars["volume"],
+    })
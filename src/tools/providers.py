@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Union
+
+from tools.env import env_setting
+from tools.lazy import lazy_import
+from tools.replay import replay_context
+
+# Loaded on first use: the API modules pull in pandas, httpx and vnstock3
+pd = lazy_import("pandas")
+financialdatasets_api = lazy_import("tools.api")
+vnstock_api = lazy_import("tools.api_vnindex")
+frames = lazy_import("tools.frames")
+
+DEFAULT_PROVIDER = env_setting("DATA_PROVIDER", "vnstock")
+
+
+class DataProvider:
+    """
+    Source of the market data the agents read.
+
+    Every method returns a read-only DataFrame; get_prices returns daily bars indexed by
+    Date (see tools.frames.prices_to_df). The async methods run the sync ones on a worker
+    thread unless a provider has a native async implementation.
+    """
+    name = "base"
+
+    def get_prices(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def get_financial_metrics(self, ticker: str, report_period: str, period: str = 'year', limit: int = 1) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def get_insider_trades(self, ticker: str, end_date: str, limit: int = 5) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def get_market_cap(self, ticker: str) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def search_line_items(self, ticker: str, line_items: List[str], period: str = 'year', limit: int = 1) -> pd.DataFrame:
+        raise NotImplementedError
+
+    async def aget_prices(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+        return await asyncio.to_thread(self.get_prices, ticker, start_date, end_date)
+
+    async def aget_financial_metrics(self, ticker: str, report_period: str, period: str = 'year', limit: int = 1) -> pd.DataFrame:
+        return await asyncio.to_thread(self.get_financial_metrics, ticker, report_period, period, limit)
+
+    async def aget_insider_trades(self, ticker: str, end_date: str, limit: int = 5) -> pd.DataFrame:
+        return await asyncio.to_thread(self.get_insider_trades, ticker, end_date, limit)
+
+    async def aget_market_cap(self, ticker: str) -> pd.DataFrame:
+        return await asyncio.to_thread(self.get_market_cap, ticker)
+
+    async def asearch_line_items(self, ticker: str, line_items: List[str], period: str = 'year', limit: int = 1) -> pd.DataFrame:
+        return await asyncio.to_thread(self.search_line_items, ticker, line_items, period, limit)
+
+
+class VnstockProvider(DataProvider):
+    """vnstock (VCI/TCBS) through tools.api_vnindex, with its price store, caches and rate limits."""
+    name = "vnstock"
+
+    def get_prices(self, ticker, start_date, end_date):
+        return vnstock_api.get_price_data(ticker, start_date, end_date)
+
+    def get_financial_metrics(self, ticker, report_period, period='year', limit=1):
+        return vnstock_api.get_financial_metrics(ticker, report_period, period, limit)
+
+    def get_insider_trades(self, ticker, end_date, limit=5):
+        return vnstock_api.get_insider_trades(ticker, end_date, limit)
+
+    def get_market_cap(self, ticker):
+        return vnstock_api.get_market_cap(ticker)
+
+    def search_line_items(self, ticker, line_items, period='year', limit=1):
+        return vnstock_api.search_line_items(ticker, line_items, period, limit)
+
+    async def aget_prices(self, ticker, start_date, end_date):
+        return await vnstock_api.aget_price_data(ticker, start_date, end_date)
+
+    async def aget_financial_metrics(self, ticker, report_period, period='year', limit=1):
+        return await vnstock_api.aget_financial_metrics(ticker, report_period, period, limit)
+
+    async def aget_insider_trades(self, ticker, end_date, limit=5):
+        return await vnstock_api.aget_insider_trades(ticker, end_date, limit)
+
+    async def aget_market_cap(self, ticker):
+        return await vnstock_api.aget_market_cap(ticker)
+
+    async def asearch_line_items(self, ticker, line_items, period='year', limit=1):
+        return await vnstock_api.asearch_line_items(ticker, line_items, period, limit)
+
+
+class FinancialDatasetsProvider(DataProvider):
+    """financialdatasets.ai through tools.api; its JSON records are converted to frames."""
+    name = "financialdatasets"
+
+    def get_prices(self, ticker, start_date, end_date):
+        return frames.prices_to_df(financialdatasets_api.get_prices(ticker, start_date, end_date))
+
+    def get_financial_metrics(self, ticker, report_period, period='year', limit=1):
+        return frames.read_only(pd.DataFrame(financialdatasets_api.get_financial_metrics(ticker, report_period, period, limit)))
+
+    def get_insider_trades(self, ticker, end_date, limit=5):
+        return frames.read_only(pd.DataFrame(financialdatasets_api.get_insider_trades(ticker, end_date, limit)))
+
+    def get_market_cap(self, ticker):
+        return frames.read_only(pd.DataFrame([{"ticker": ticker, "market_cap": financialdatasets_api.get_market_cap(ticker)}]))
+
+    def search_line_items(self, ticker, line_items, period='year', limit=1):
+        return frames.read_only(pd.DataFrame(financialdatasets_api.search_line_items(ticker, line_items, period, limit)))
+
+    async def aget_prices(self, ticker, start_date, end_date):
+        return frames.prices_to_df(await financialdatasets_api.aget_prices(ticker, start_date, end_date))
+
+    async def aget_financial_metrics(self, ticker, report_period, period='year', limit=1):
+        return frames.read_only(pd.DataFrame(await financialdatasets_api.aget_financial_metrics(ticker, report_period, period, limit)))
+
+    async def aget_insider_trades(self, ticker, end_date, limit=5):
+        return frames.read_only(pd.DataFrame(await financialdatasets_api.aget_insider_trades(ticker, end_date, limit)))
+
+    async def aget_market_cap(self, ticker):
+        return frames.read_only(pd.DataFrame([{"ticker": ticker, "market_cap": await financialdatasets_api.aget_market_cap(ticker)}]))
+
+    async def asearch_line_items(self, ticker, line_items, period='year', limit=1):
+        return frames.read_only(pd.DataFrame(await financialdatasets_api.asearch_line_items(ticker, line_items, period, limit)))
+
+
+class CachedProvider(DataProvider):
+    """
+    Keeps the last ``maxsize`` results of another provider in memory, so repeated runs over
+    the same tickers and dates in one process fetch each item once. Results are read-only
+    frames and are shared between callers.
+    """
+    name = "cached"
+
+    def __init__(self, inner: DataProvider, maxsize: int = 1024):
+        self.inner = inner
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results: "OrderedDict[Hashable, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Hashable) -> Optional[pd.DataFrame]:
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def _store(self, key: Hashable, result: pd.DataFrame) -> pd.DataFrame:
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return result
+
+    def _call(self, method: str, *args) -> pd.DataFrame:
+        key = (method, *(tuple(arg) if isinstance(arg, list) else arg for arg in args))
+        result = self._lookup(key)
+        if result is None:
+            result = self._store(key, getattr(self.inner, method)(*args))
+        return result
+
+    async def _acall(self, method: str, *args) -> pd.DataFrame:
+        key = (method, *(tuple(arg) if isinstance(arg, list) else arg for arg in args))
+        result = self._lookup(key)
+        if result is None:
+            result = self._store(key, await getattr(self.inner, f"a{method}")(*args))
+        return result
+
+    def get_prices(self, ticker, start_date, end_date):
+        return self._call("get_prices", ticker, start_date, end_date)
+
+    def get_financial_metrics(self, ticker, report_period, period='year', limit=1):
+        return self._call("get_financial_metrics", ticker, report_period, period, limit)
+
+    def get_insider_trades(self, ticker, end_date, limit=5):
+        return self._call("get_insider_trades", ticker, end_date, limit)
+
+    def get_market_cap(self, ticker):
+        return self._call("get_market_cap", ticker)
+
+    def search_line_items(self, ticker, line_items, period='year', limit=1):
+        return self._call("search_line_items", ticker, line_items, period, limit)
+
+    async def aget_prices(self, ticker, start_date, end_date):
+        return await self._acall("get_prices", ticker, start_date, end_date)
+
+    async def aget_financial_metrics(self, ticker, report_period, period='year', limit=1):
+        return await self._acall("get_financial_metrics", ticker, report_period, period, limit)
+
+    async def aget_insider_trades(self, ticker, end_date, limit=5):
+        return await self._acall("get_insider_trades", ticker, end_date, limit)
+
+    async def aget_market_cap(self, ticker):
+        return await self._acall("get_market_cap", ticker)
+
+    async def asearch_line_items(self, ticker, line_items, period='year', limit=1):
+        return await self._acall("search_line_items", ticker, line_items, period, limit)
+
+
+class ReplayProvider(DataProvider):
+    """
+    Runs another provider in a replay mode (tools.replay) for this provider's calls only:
+    "replay" serves the recorded responses without touching the network, "record" calls
+    the provider and records them.
+    """
+    name = "replay"
+
+    def __init__(self, inner: DataProvider, mode: str = "replay"):
+        self.inner = inner
+        self.mode = mode
+
+    def get_prices(self, ticker, start_date, end_date):
+        with replay_context(self.mode):
+            return self.inner.get_prices(ticker, start_date, end_date)
+
+    def get_financial_metrics(self, ticker, report_period, period='year', limit=1):
+        with replay_context(self.mode):
+            return self.inner.get_financial_metrics(ticker, report_period, period, limit)
+
+    def get_insider_trades(self, ticker, end_date, limit=5):
+        with replay_context(self.mode):
+            return self.inner.get_insider_trades(ticker, end_date, limit)
+
+    def get_market_cap(self, ticker):
+        with replay_context(self.mode):
+            return self.inner.get_market_cap(ticker)
+
+    def search_line_items(self, ticker, line_items, period='year', limit=1):
+        with replay_context(self.mode):
+            return self.inner.search_line_items(ticker, line_items, period, limit)
+
+    async def aget_prices(self, ticker, start_date, end_date):
+        with replay_context(self.mode):
+            return await self.inner.aget_prices(ticker, start_date, end_date)
+
+    async def aget_financial_metrics(self, ticker, report_period, period='year', limit=1):
+        with replay_context(self.mode):
+            return await self.inner.aget_financial_metrics(ticker, report_period, period, limit)
+
+    async def aget_insider_trades(self, ticker, end_date, limit=5):
+        with replay_context(self.mode):
+            return await self.inner.aget_insider_trades(ticker, end_date, limit)
+
+    async def aget_market_cap(self, ticker):
+        with replay_context(self.mode):
+            return await self.inner.aget_market_cap(ticker)
+
+    async def asearch_line_items(self, ticker, line_items, period='year', limit=1):
+        with replay_context(self.mode):
+            return await self.inner.asearch_line_items(ticker, line_items, period, limit)
+
+
+class FrameProvider(DataProvider):
+    """
+    Serves prices from histories loaded once per ticker with prefetch: a window inside a
+    loaded history is a read-only slice of it, without fetching or copying. Other data,
+    and windows outside the loaded range, come from ``inner``.
+    """
+    name = "frame"
+
+    def __init__(self, inner: DataProvider):
+        self.inner = inner
+        self._histories: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """Load the bars of ``ticker`` from ``start_date`` to ``end_date`` in one request."""
+        return self.load(ticker, start_date, end_date, self.inner.get_prices(ticker, start_date, end_date))
+
+    def load(self, ticker: str, start_date: str, end_date: str, history: pd.DataFrame) -> pd.DataFrame:
+        """Serve ``history``, the bars of ``ticker`` from ``start_date`` to ``end_date``, from now on."""
+        with self._lock:
+            self._histories[ticker] = (pd.Timestamp(start_date), pd.Timestamp(end_date), history)
+        return history
+
+    def _slice(self, ticker: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        entry = self._histories.get(ticker)
+        if entry is None:
+            return None
+        start, end, history = entry
+        if not (start <= pd.Timestamp(start_date) and pd.Timestamp(end_date) <= end):
+            return None
+        prices = history.loc[start_date:end_date]
+        if prices.empty:
+            raise ValueError("No price data returned")
+        return prices
+
+    def get_prices(self, ticker, start_date, end_date):
+        prices = self._slice(ticker, start_date, end_date)
+        return prices if prices is not None else self.inner.get_prices(ticker, start_date, end_date)
+
+    def get_financial_metrics(self, ticker, report_period, period='year', limit=1):
+        return self.inner.get_financial_metrics(ticker, report_period, period, limit)
+
+    def get_insider_trades(self, ticker, end_date, limit=5):
+        return self.inner.get_insider_trades(ticker, end_date, limit)
+
+    def get_market_cap(self, ticker):
+        return self.inner.get_market_cap(ticker)
+
+    def search_line_items(self, ticker, line_items, period='year', limit=1):
+        return self.inner.search_line_items(ticker, line_items, period, limit)
+
+    async def aget_prices(self, ticker, start_date, end_date):
+        prices = self._slice(ticker, start_date, end_date)
+        return prices if prices is not None else await self.inner.aget_prices(ticker, start_date, end_date)
+
+    async def aget_financial_metrics(self, ticker, report_period, period='year', limit=1):
+        return await self.inner.aget_financial_metrics(ticker, report_period, period, limit)
+
+    async def aget_insider_trades(self, ticker, end_date, limit=5):
+        return await self.inner.aget_insider_trades(ticker, end_date, limit)
+
+    async def aget_market_cap(self, ticker):
+        return await self.inner.aget_market_cap(ticker)
+
+    async def asearch_line_items(self, ticker, line_items, period='year', limit=1):
+        return await self.inner.asearch_line_items(ticker, line_items, period, limit)
+
+
+##### Provider registry #####
+PROVIDERS: Dict[str, Callable[[], DataProvider]] = {
+    "vnstock": VnstockProvider,
+    "financialdatasets": FinancialDatasetsProvider,
+    "cached": lambda: CachedProvider(get_provider("vnstock")),
+    "replay": lambda: ReplayProvider(get_provider("vnstock")),
+}
+
+_providers: Dict[str, DataProvider] = {}
+_providers_lock = threading.RLock()
+
+
+def register_provider(name: str, factory: Callable[[], DataProvider]):
+    """Make a provider selectable by name (e.g. with --data-provider)."""
+    with _providers_lock:
+        PROVIDERS[name] = factory
+        _providers.pop(name, None)
+
+
+def get_provider(provider: Union[str, DataProvider, None] = None) -> DataProvider:
+    """
+    Process-wide provider registered under a name (DATA_PROVIDER, "vnstock" by default,
+    when None); a DataProvider instance is returned as is.
+    """
+    if isinstance(provider, DataProvider):
+        return provider
+    name = provider or DEFAULT_PROVIDER
+    with _providers_lock:
+        if name not in _providers:
+            if name not in PROVIDERS:
+                raise ValueError(f"Unknown data provider {name!r}, expected one of {sorted(PROVIDERS)}")
+            _providers[name] = PROVIDERS[name]()
+        return _providers[name]
+
+
+def provider_name(provider: Union[str, DataProvider, None] = None) -> str:
+    """
+    Name of the data source ``provider`` resolves to, e.g. "vnstock", or "frame/vnstock"
+    for a provider wrapping another one.
+    """
+    if not isinstance(provider, DataProvider):
+        return provider or DEFAULT_PROVIDER
+    inner = getattr(provider, "inner", None)
+    return f"{provider.name}/{provider_name(inner)}" if isinstance(inner, DataProvider) else provider.name
@@ -0,0 +1,164 @@
+import logging
+import os
+import random
+import re
+import struct
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+import requests
+
+from tools.env import env_setting
+
+try:
+    import fcntl
+except ImportError:  # Windows: buckets are only shared between the threads of one process
+    fcntl = None
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_DIR = env_setting("RATE_LIMIT_DIR", os.path.join(
+    os.path.expanduser("~"), ".cache", "vnindex-hedge-fund", "rate_limits",
+))
+# "<requests per second>/<burst>" for every source, overridable per source with
+# RATE_LIMITS="VCI=5/10,TCBS=2/4"
+DEFAULT_RATE_LIMIT = env_setting("RATE_LIMIT", "5/10")
+RATE_LIMITS = env_setting("RATE_LIMITS", "")
+RETRY_ATTEMPTS = env_setting("RETRY_ATTEMPTS", 4, int)
+RETRY_BASE_DELAY = env_setting("RETRY_BASE_DELAY", 0.5, float)
+RETRY_MAX_DELAY = env_setting("RETRY_MAX_DELAY", 30, float)
+
+# Bucket state stored in the lock file: tokens left and the time they were counted
+_STATE = struct.Struct("dd")
+# HTTP statuses worth retrying: throttling and server-side failures
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def parse_rate_limit(value: str) -> Tuple[float, int]:
+    rate, _, burst = value.partition("/")
+    return float(rate), int(burst or max(1, round(float(rate))))
+
+
+class TokenBucket:
+    """
+    Token bucket of one data source, shared by every thread and process on the host.
+
+    The bucket holds up to ``burst`` tokens and refills at ``rate`` tokens per second;
+    each request takes one token, waiting for it if the bucket is empty. The state
+    lives in ``<root>/<name>.bucket`` and is updated under an exclusive file lock.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, root: str = RATE_LIMIT_DIR):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.path = os.path.join(root, f"{name}.bucket")
+        self._lock = threading.Lock()
+        # Process-local state, used when file locks are unavailable
+        self._state = (float(burst), time.time())
+
+    def _take(self) -> float:
+        """Take a token if one is available; otherwise return the seconds until the next one."""
+        with self._lock:
+            if fcntl is None:
+                wait, self._state = self._update(self._state)
+                return wait
+
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a+b") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    raw = f.read(_STATE.size)
+                    state = _STATE.unpack(raw) if len(raw) == _STATE.size else (float(self.burst), time.time())
+                    wait, state = self._update(state)
+                    f.seek(0)
+                    f.truncate()
+                    f.write(_STATE.pack(*state))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            return wait
+
+    def _update(self, state: Tuple[float, float]) -> Tuple[float, Tuple[float, float]]:
+        tokens, updated = state
+        now = time.time()
+        tokens = min(float(self.burst), tokens + max(0.0, now - updated) * self.rate)
+        if tokens >= 1:
+            return 0.0, (tokens - 1, now)
+        return (1 - tokens) / self.rate, (tokens, now)
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            wait = self._take()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(source: str) -> TokenBucket:
+    """Process-wide TokenBucket of a source, configured from RATE_LIMIT / RATE_LIMITS."""
+    source = source.upper()
+    with _buckets_lock:
+        if source not in _buckets:
+            limits = dict(
+                item.split("=", 1) for item in RATE_LIMITS.replace(" ", "").split(",") if "=" in item
+            )
+            rate, burst = parse_rate_limit(limits.get(source, DEFAULT_RATE_LIMIT))
+            _buckets[source] = TokenBucket(source, rate, burst)
+        return _buckets[source]
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Whether a failed request may succeed if retried: timeouts, dropped connections and
+    HTTP 429/5xx. Bad tickers, parsing errors and other 4xx responses fail the same way again.
+    """
+    if isinstance(error, (requests.Timeout, requests.ConnectionError, TimeoutError)):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None and isinstance(error, ConnectionError):
+        # vnstock raises ConnectionError(f"Failed to fetch data: {status_code} - {reason}")
+        match = re.search(r"\b([1-5]\d\d)\b", str(error))
+        if match is None:
+            return True
+        status = int(match.group(1))
+    return status in RETRY_STATUSES
+
+
+def call_with_retry(
+        source: str,
+        fn: Callable[[], T],
+        attempts: int = RETRY_ATTEMPTS,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: Optional[float] = RETRY_MAX_DELAY,
+        retry_if: Callable[[BaseException], bool] = is_transient,
+) -> T:
+    """
+    Call fn() once a token of ``source`` is available, retrying transient failures (see
+    is_transient) up to ``attempts`` times in total with full-jitter exponential backoff:
+    the n-th retry sleeps a random time between 0 and ``base_delay * 2 ** n`` (capped at
+    ``max_delay``). Other errors are raised at once.
+    """
+    bucket = get_bucket(source)
+    for attempt in range(attempts):
+        bucket.acquire()
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not retry_if(e):
+                raise
+            delay = base_delay * 2 ** attempt
+            if max_delay is not None:
+                delay = min(delay, max_delay)
+            delay = random.uniform(0, delay)
+            logger.warning("%s request failed (%r), retrying in %.1fs", source, e, delay)
+            time.sleep(delay)
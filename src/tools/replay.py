@@ -0,0 +1,173 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from tools.env import env_setting
+from tools.llm_cache import LLMCache
+
+# "off": call the providers, "record": call them and store every response,
+# "replay": serve stored responses only (no network, no API keys needed)
+REPLAY_MODES = ("off", "record", "replay")
+REPLAY_MODE = env_setting("REPLAY_MODE", "off")
+REPLAY_DIR = env_setting("REPLAY_DIR", os.path.join(
+    os.path.expanduser("~"), ".cache", "vnindex-hedge-fund", "replay",
+))
+
+# Reply of the stub chat model to a prompt that was never recorded
+STUB_DECISION = json.dumps({
+    "action": "hold",
+    "quantity": 0,
+    "confidence": 0.0,
+    "agent_signals": [],
+    "reasoning": "Offline stub model: no recorded response for this prompt",
+})
+
+
+class ReplayMissError(LookupError):
+    pass
+
+
+class ReplayStore:
+    """
+    Recorded provider responses, one pickle per call under ``<root>/<namespace>/<key>.pkl``.
+    Entries are kept in memory once read, so replayed calls cost a dict lookup.
+    """
+
+    def __init__(self, root: str = REPLAY_DIR):
+        self.root = root
+        self._entries: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, namespace: str, key: str) -> str:
+        return os.path.join(self.root, namespace, f"{key}.pkl")
+
+    def get(self, namespace: str, key: str) -> Any:
+        with self._lock:
+            if (namespace, key) in self._entries:
+                return self._entries[namespace, key]
+        path = self._path(namespace, key)
+        if not os.path.exists(path):
+            raise ReplayMissError(f"No recorded response for {namespace} ({path}); record it with REPLAY_MODE=record")
+        with open(path, "rb") as f:
+            value = pickle.load(f)
+        # Imported here so that importing this module does not load pandas
+        import pandas as pd
+        from tools.frames import read_only
+        if isinstance(value, pd.DataFrame):
+            value = read_only(value)
+        with self._lock:
+            return self._entries.setdefault((namespace, key), value)
+
+    def put(self, namespace: str, key: str, value: Any):
+        path = self._path(namespace, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._entries[namespace, key] = value
+
+
+_replay_mode = REPLAY_MODE
+_replay_store = ReplayStore()
+# Mode of the current context, set by replay_context (e.g. by a ReplayProvider)
+_context_mode: ContextVar[Optional[str]] = ContextVar("replay_mode", default=None)
+
+
+def replay_mode() -> str:
+    return _context_mode.get() or _replay_mode
+
+
+def set_replay_mode(mode: str, root: Optional[str] = None):
+    """Switch every replayable provider to ``mode``, optionally with another fixture directory."""
+    global _replay_mode, _replay_store
+    if mode not in REPLAY_MODES:
+        raise ValueError(f"replay mode must be one of {REPLAY_MODES}, got {mode!r}")
+    _replay_mode = mode
+    if root is not None and root != _replay_store.root:
+        _replay_store = ReplayStore(root)
+
+
+@contextmanager
+def replay_context(mode: str):
+    """Use ``mode`` for the replayable calls made in this context (thread or task) only."""
+    if mode not in REPLAY_MODES:
+        raise ValueError(f"replay mode must be one of {REPLAY_MODES}, got {mode!r}")
+    token = _context_mode.set(mode)
+    try:
+        yield
+    finally:
+        _context_mode.reset(token)
+
+
+def get_replay_store() -> ReplayStore:
+    return _replay_store
+
+
+def make_key(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def replayable(func: Callable) -> Callable:
+    """
+    Decorator recording or replaying a provider function according to the replay mode.
+    Responses are keyed by the function and its bound arguments (defaults included).
+    """
+    signature = inspect.signature(func)
+    namespace = f"{func.__module__}.{func.__qualname__}"
+
+    def call_key(args, kwargs) -> str:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return make_key(bound.arguments)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            mode = replay_mode()
+            if mode == "off":
+                return await func(*args, **kwargs)
+            key = call_key(args, kwargs)
+            if mode == "replay":
+                return _replay_store.get(namespace, key)
+            result = await func(*args, **kwargs)
+            _replay_store.put(namespace, key, result)
+            return result
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        mode = replay_mode()
+        if mode == "off":
+            return func(*args, **kwargs)
+        key = call_key(args, kwargs)
+        if mode == "replay":
+            return _replay_store.get(namespace, key)
+        result = func(*args, **kwargs)
+        _replay_store.put(namespace, key, result)
+        return result
+    return wrapper
+
+
+##### Chat model #####
+def get_chat_model(model: str = "gpt-4o"):
+    """ChatOpenAI, or the StubChatModel (tools.stub_chat) when replaying."""
+    if replay_mode() == "replay":
+        from tools.stub_chat import StubChatModel
+        return StubChatModel(model_name=model)
+    from langchain_openai.chat_models import ChatOpenAI
+    return ChatOpenAI(model=model)
+
+
+def record_chat_response(messages: Sequence[Any], content: str):
+    """Store an LLM response for StubChatModel to replay; a no-op unless recording."""
+    if replay_mode() == "record":
+        _replay_store.put("chat", LLMCache.make_key(messages), content)
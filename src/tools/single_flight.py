@@ -0,0 +1,120 @@
+import asyncio
+import functools
+import inspect
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: while a call for a key is in flight, other
+    callers with the same key wait for it and share its result (or exception) instead
+    of issuing the call again. Nothing is cached once the call has finished.
+
+    ``executions`` counts calls actually made and ``coalesced`` the calls that joined
+    one already in flight, both per call name.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Any] = {}
+        self.executions = Counter()
+        self.coalesced = Counter()
+
+    def do(self, name: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Return fn(), shared with every concurrent call of the same name and key."""
+        key = (name, key)
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.executions[name] += 1
+            else:
+                self.coalesced[name] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def ado(self, name: str, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async counterpart of do; calls are shared between the coroutines of one event loop."""
+        key = (name, asyncio.get_running_loop(), key)
+        with self._lock:
+            task = self._calls.get(key)
+            if task is None:
+                task = self._calls[key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda _: self._forget(key))
+                self.executions[name] += 1
+            else:
+                self.coalesced[name] += 1
+        # A cancelled caller must not cancel the call the others are waiting for
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Executed and coalesced call counts per call name."""
+        with self._lock:
+            return {
+                name: {"executions": self.executions[name], "coalesced": self.coalesced[name]}
+                for name in sorted(set(self.executions) | set(self.coalesced))
+            }
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Process-wide SingleFlight shared by the provider functions."""
+    return _single_flight
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_freeze(item) for item in value))
+    return value
+
+
+def single_flight(func: Callable) -> Callable:
+    """
+    Decorator routing calls of a provider function through the process-wide SingleFlight.
+    Calls are identical when their bound arguments (defaults included) are equal. Callers
+    share the returned object, so it must not be modified.
+    """
+    signature = inspect.signature(func)
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    def make_key(args, kwargs) -> Hashable:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return _freeze(bound.arguments)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            return await _single_flight.ado(name, make_key(args, kwargs), lambda: func(*args, **kwargs))
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return _single_flight.do(name, make_key(args, kwargs), lambda: func(*args, **kwargs))
+    return wrapper
@@ -0,0 +1,28 @@
+from typing import List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from tools.llm_cache import LLMCache
+from tools.replay import STUB_DECISION, ReplayMissError, get_replay_store
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Offline stand-in for ChatOpenAI: answers with the response recorded for the same
+    prompt, or with a fixed hold decision (STUB_DECISION) if there is none.
+    """
+    model_name: str = "gpt-4o"
+    temperature: float = 0.7
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-stub"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        try:
+            content = get_replay_store().get("chat", LLMCache.make_key(messages))
+        except ReplayMissError:
+            content = STUB_DECISION
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
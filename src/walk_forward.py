@@ -0,0 +1,286 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from agents.risk_manager import RISK_THRESHOLDS
+from agents.technicals import STRATEGY_WEIGHTS, TECHNICAL_THRESHOLDS
+from agents.vectorized import compute_signal_frame, load_signal_inputs, technical_features, tune_signal_frame
+from backtester import VectorizedBacktester
+from sweep import WEIGHT_PREFIX, sweep_technical_parameters
+from sweep import default_parameters as default_technical_parameters
+from tools.providers import PROVIDERS
+
+# Extra history before the first training window, to warm up the indicators
+LOOKBACK_DAYS = 365
+
+# Grid keys of the RISK_THRESHOLDS, next to sweep.py's technical parameters
+RISK_PREFIX = "risk_"
+
+# Risk thresholds tried with each technical candidate when no risk grid is given
+DEFAULT_RISK_GRID = {
+    "risk_volatility_high": [0.25, 0.30, 0.40],
+    "risk_drawdown_severe": [-0.15, -0.20, -0.30],
+    "risk_reduce_score": [5, 6, 7],
+}
+
+
+def default_parameters() -> Dict[str, float]:
+    """The technical (see sweep.default_parameters) and risk parameters the agents use today."""
+    return {
+        **default_technical_parameters(),
+        **{f"{RISK_PREFIX}{name}": value for name, value in RISK_THRESHOLDS.items()},
+    }
+
+
+def risk_combinations(grid: Dict[str, Sequence[float]]) -> List[Dict[str, float]]:
+    """Every combination of the risk grid's values; thresholds not in the grid keep their default."""
+    unknown = set(grid) - {f"{RISK_PREFIX}{name}" for name in RISK_THRESHOLDS}
+    if unknown:
+        raise ValueError(f"Unknown risk parameters {sorted(unknown)}, expected some of {sorted(RISK_PREFIX + name for name in RISK_THRESHOLDS)}")
+    return [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+
+##### Folds #####
+def walk_forward_folds(start_date: str, end_date: str, train_days: int, test_days: int) -> List[Tuple[str, str, str, str]]:
+    """
+    Rolling (train_start, train_end, test_start, test_end) windows: ``train_days`` of
+    training followed by ``test_days`` out of sample, moved forward by ``test_days`` so
+    the test windows cover the period after the first training window once.
+    """
+    folds = []
+    train_start, last_day = datetime.strptime(start_date, '%Y-%m-%d'), datetime.strptime(end_date, '%Y-%m-%d')
+    while True:
+        test_start = train_start + timedelta(days=train_days)
+        if test_start > last_day:
+            break
+        test_end = min(test_start + timedelta(days=test_days - 1), last_day)
+        folds.append(tuple(day.strftime('%Y-%m-%d') for day in (train_start, test_start - timedelta(days=1), test_start, test_end)))
+        train_start += timedelta(days=test_days)
+    return folds
+
+
+##### Fold jobs #####
+# Signal frame and technical features of the whole period, set once per worker process
+_fold_inputs: Dict[str, pd.DataFrame] = {}
+
+
+def set_fold_inputs(frame: pd.DataFrame, features: pd.DataFrame):
+    """Process pool initializer: the inputs every fold slices."""
+    _fold_inputs["frame"] = frame
+    _fold_inputs["features"] = features
+
+
+def backtest_parameters(
+    ticker: str,
+    parameters: Dict[str, float],
+    start_date: str,
+    end_date: str,
+    initial_capital: float,
+    data_provider: Optional[str] = None,
+) -> dict:
+    """Vectorized backtest of one window with the agents using ``parameters`` (see default_parameters)."""
+    frame, features = _fold_inputs["frame"], _fold_inputs["features"]
+    parameters = {**default_parameters(), **parameters}
+    backtester = VectorizedBacktester(ticker, start_date, end_date, initial_capital, data_provider=data_provider, verbose=False)
+    backtester.signals = tune_signal_frame(
+        frame.loc[start_date:end_date],
+        features,
+        strategy_weights={name: parameters[f"{WEIGHT_PREFIX}{name}"] for name in STRATEGY_WEIGHTS},
+        thresholds={name: parameters[name] for name in TECHNICAL_THRESHOLDS},
+        risk_thresholds={name: parameters[f"{RISK_PREFIX}{name}"] for name in RISK_THRESHOLDS},
+    )
+    backtester.run_backtest()
+    return backtester.performance_metrics()
+
+
+def run_fold(
+    ticker: str,
+    fold: Tuple[str, str, str, str],
+    grid: Optional[Dict[str, Sequence[float]]],
+    risk_grid: Dict[str, Sequence[float]],
+    candidates: int,
+    cost: float,
+    initial_capital: float,
+    data_provider: Optional[str] = None,
+) -> dict:
+    """
+    Pick the parameters on the training window in two steps: the technical sweep (a
+    long/flat simulation of the technical signal, see sweep.py) keeps its ``candidates``
+    best combinations, then each is backtested with every risk_grid combination, the way
+    the test window is scored, and the best Sharpe ratio wins. The chosen and the current
+    parameters are then backtested on the test window.
+    """
+    train_start, train_end, test_start, test_end = fold
+    frame, features = _fold_inputs["frame"], _fold_inputs["features"]
+    ranked = sweep_technical_parameters(features, frame['close'], train_start, train_end, grid, cost)
+
+    best, best_sharpe = None, -np.inf
+    for _, candidate in ranked.head(candidates).iterrows():
+        technical = {name: float(candidate[name]) for name in default_technical_parameters()}
+        for risk in risk_combinations(risk_grid):
+            parameters = {**default_parameters(), **technical, **risk}
+            metrics = backtest_parameters(ticker, parameters, train_start, train_end, initial_capital, data_provider)
+            sharpe = metrics["sharpe_ratio"] if not np.isnan(metrics["sharpe_ratio"]) else -np.inf
+            if best is None or sharpe > best_sharpe:
+                best, best_sharpe = (parameters, metrics, candidate["sharpe_ratio"]), sharpe
+    parameters, train_metrics, sweep_sharpe = best
+
+    tuned = backtest_parameters(ticker, parameters, test_start, test_end, initial_capital, data_provider)
+    baseline = backtest_parameters(ticker, default_parameters(), test_start, test_end, initial_capital, data_provider)
+    return {
+        "train_sharpe": sweep_sharpe,
+        "train_backtest_sharpe": train_metrics["sharpe_ratio"],
+        "test_return": tuned["total_return"],
+        "test_sharpe": tuned["sharpe_ratio"],
+        "test_max_drawdown": tuned["max_drawdown"],
+        "test_trades": tuned["trades"],
+        "baseline_return": baseline["total_return"],
+        "baseline_sharpe": baseline["sharpe_ratio"],
+        **parameters,
+    }
+
+
+def print_progress(done: int, total: int, fold: Tuple[str, str, str, str], result: dict, elapsed: float):
+    status = f"failed - {result['error']}" if result.get("error") else (
+        f"test return {result['test_return'] * 100:.2f}% (current parameters {result['baseline_return'] * 100:.2f}%)"
+    )
+    print(f"[{done}/{total}] {elapsed:7.1f}s  test {fold[2]} to {fold[3]}  {status}")
+
+
+def run_walk_forward(
+    ticker: str,
+    start_date: str,
+    end_date: str,
+    train_days: int = 365,
+    test_days: int = 90,
+    grid: Optional[Dict[str, Sequence[float]]] = None,
+    risk_grid: Optional[Dict[str, Sequence[float]]] = None,
+    candidates: int = 3,
+    cost: float = 0.0,
+    initial_capital: float = 100000,
+    data_provider: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    progress: Optional[Callable] = print_progress,
+) -> pd.DataFrame:
+    """
+    Walk-forward optimization of the technical analyst's weights and thresholds and of
+    the risk manager's thresholds: each fold picks its parameters on the training window
+    (see run_fold) and backtests them on the following, out-of-sample, window, next to the
+    current parameters. ``grid`` defaults to sweep.DEFAULT_GRID and ``risk_grid`` to
+    DEFAULT_RISK_GRID. The data is fetched and every indicator computed once over the
+    whole period; the folds slice them and run on a process pool. Returns a row per fold.
+    """
+    started = time.perf_counter()
+    prices_df, insider_trades, metrics_by_year = load_signal_inputs(ticker, start_date, end_date, LOOKBACK_DAYS, data_provider)
+    features = technical_features(prices_df)
+    frame = compute_signal_frame(prices_df, insider_trades, metrics_by_year, features=features)
+
+    folds = walk_forward_folds(start_date, end_date, train_days, test_days)
+    rows = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=set_fold_inputs, initargs=(frame, features)) as executor:
+        futures = {
+            executor.submit(
+                run_fold, ticker, fold, grid, DEFAULT_RISK_GRID if risk_grid is None else risk_grid, candidates, cost,
+                initial_capital, data_provider,
+            ): (number, fold)
+            for number, fold in enumerate(folds, 1)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            number, fold = futures[future]
+            try:
+                result = {**future.result(), "error": None}
+            except Exception as e:
+                result = {"error": repr(e)}
+            rows.append({"fold": number, **dict(zip(("train_start", "train_end", "test_start", "test_end"), fold)), **result})
+            if progress:
+                progress(done, len(futures), fold, result, time.perf_counter() - started)
+
+    columns = [
+        "fold", "train_start", "train_end", "test_start", "test_end", "train_sharpe", "train_backtest_sharpe", "test_return",
+        "test_sharpe", "test_max_drawdown", "test_trades", "baseline_return", "baseline_sharpe", "error", *default_parameters(),
+    ]
+    return pd.DataFrame(rows, columns=columns).sort_values("fold", ignore_index=True)
+
+
+def summarize(results: pd.DataFrame) -> Dict[str, float]:
+    """Out-of-sample returns of the folds chained together, and the average Sharpe ratios."""
+    ok = results[results["error"].isna()]
+    return {
+        "folds": len(ok),
+        "test_return": np.prod(1 + ok["test_return"].astype(float)) - 1,
+        "baseline_return": np.prod(1 + ok["baseline_return"].astype(float)) - 1,
+        "train_sharpe": ok["train_sharpe"].mean(),
+        "train_backtest_sharpe": ok["train_backtest_sharpe"].mean(),
+        "test_sharpe": ok["test_sharpe"].mean(),
+        "baseline_sharpe": ok["baseline_sharpe"].mean(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Walk-forward optimization of the technical strategy weights and thresholds and the risk thresholds')
+    parser.add_argument('--ticker', type=str, required=True, help='Stock ticker symbol')
+    parser.add_argument('--start-date', type=str, required=True, help='Start of the first training window (YYYY-MM-DD)')
+    parser.add_argument('--end-date', type=str, default=datetime.now().strftime('%Y-%m-%d'), help='End date (YYYY-MM-DD)')
+    parser.add_argument('--train-days', type=int, default=365, help='Calendar days of each training window (default: 365)')
+    parser.add_argument('--test-days', type=int, default=90, help='Calendar days of each out-of-sample window (default: 90)')
+    parser.add_argument('--grid', type=str, default=None,
+                        help='JSON object of technical parameter -> values (inline or a file), as for sweep.py (default: its DEFAULT_GRID)')
+    parser.add_argument('--risk-grid', type=str, default=None,
+                        help='JSON object of risk parameter -> values (inline or a file), keys "risk_" + a RISK_THRESHOLDS name, '
+                             'e.g. \'{"risk_reduce_score": [5, 6, 7]}\'; {} keeps the current risk thresholds (default: DEFAULT_RISK_GRID)')
+    parser.add_argument('--candidates', type=int, default=3,
+                        help='Best technical sweep combinations backtested with each risk combination on the training window (default: 3)')
+    parser.add_argument('--cost', type=float, default=0.0, help='Cost per unit of turnover used when ranking the training sweep')
+    parser.add_argument('--initial-capital', type=float, default=100000, help='Initial capital of each test window (default: 100000)')
+    parser.add_argument('--data-provider', choices=sorted(PROVIDERS), default=None,
+                        help='Market data source (default: $DATA_PROVIDER or vnstock)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--output', type=str, default=None, help='Write the per-fold results to this CSV file')
+    args = parser.parse_args()
+
+    def load_grid(grid: Optional[str]) -> Optional[dict]:
+        if grid is None:
+            return None
+        if os.path.exists(grid):
+            with open(grid) as f:
+                grid = f.read()
+        return json.loads(grid)
+
+    results = run_walk_forward(
+        ticker=args.ticker,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        train_days=args.train_days,
+        test_days=args.test_days,
+        grid=load_grid(args.grid),
+        risk_grid=load_grid(args.risk_grid),
+        candidates=args.candidates,
+        cost=args.cost,
+        initial_capital=args.initial_capital,
+        data_provider=args.data_provider,
+        max_workers=args.workers,
+    )
+
+    print()
+    print(results[results.columns[:14]].to_string(index=False))
+    defaults = default_parameters()
+    for row in results[results["error"].isna()].itertuples(index=False):
+        changed = {name: getattr(row, name) for name in defaults if getattr(row, name) != defaults[name]}
+        print(f"Fold {row.fold} parameters: {', '.join(f'{name}={value:g}' for name, value in changed.items()) or 'current'}")
+
+    summary = summarize(results)
+    print(f"\nOut of sample over {summary['folds']} folds: return {summary['test_return'] * 100:.2f}% "
+          f"(current parameters {summary['baseline_return'] * 100:.2f}%)")
+    print(f"Average Sharpe ratio: training sweep {summary['train_sharpe']:.2f}, training backtest {summary['train_backtest_sharpe']:.2f}, "
+          f"test {summary['test_sharpe']:.2f} (current parameters {summary['baseline_sharpe']:.2f})")
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"\nResults written to {args.output}")
@@ -0,0 +1,27 @@
+import pytest
+
+from backtester import Backtester
+
+
+def backtester(path, **options):
+    options = {"decision_mode": "auto", "data_provider": "vnstock", **options}
+    return Backtester(None, "FPT", "2024-01-01", "2024-03-31", 100000, checkpoint_path=str(path), **options)
+
+
+def test_resumes_checkpoint_of_the_same_backtest(tmp_path):
+    path = tmp_path / "checkpoint.pkl"
+    saved = backtester(path)
+    saved.portfolio = {"cash": 90000.0, "stock": 100}
+    saved.save_checkpoint()
+
+    restored = backtester(path)
+    restored.restore_checkpoint()
+    assert restored.portfolio == saved.portfolio
+
+
+@pytest.mark.parametrize("options", [{"decision_mode": "rules"}, {"data_provider": "financialdatasets"}])
+def test_rejects_checkpoint_of_another_decision_mode_or_provider(tmp_path, options):
+    path = tmp_path / "checkpoint.pkl"
+    backtester(path).save_checkpoint()
+    with pytest.raises(ValueError, match="another backtest"):
+        backtester(path, **options).restore_checkpoint()
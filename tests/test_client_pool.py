@@ -0,0 +1,100 @@
+import sys
+import threading
+import types
+
+import pytest
+import requests
+
+from tools import client_pool
+from tools.client_pool import ClientPool, SessionRequests, shared_http_session
+
+
+@pytest.fixture
+def vnstock_module(monkeypatch):
+    """A loaded vnstock3 module calling the requests module directly, as the explorers do."""
+    module = types.ModuleType("vnstock3.explorer.fake")
+    module.requests = requests
+    monkeypatch.setitem(sys.modules, module.__name__, module)
+    return module
+
+
+def test_vnstock_modules_use_the_sessions_only_inside_the_block(vnstock_module):
+    with shared_http_session():
+        assert vnstock_module.requests is client_pool._session_requests
+    assert vnstock_module.requests is requests
+    assert client_pool._patched_modules == {}
+
+
+def test_modules_are_restored_when_the_last_concurrent_block_exits(vnstock_module):
+    entered, release = threading.Event(), threading.Event()
+
+    def fetch():
+        with shared_http_session():
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=fetch)
+    thread.start()
+    entered.wait(5)
+    with shared_http_session():
+        pass
+    # The other thread's fetch is still running
+    assert vnstock_module.requests is client_pool._session_requests
+
+    release.set()
+    thread.join()
+    assert vnstock_module.requests is requests
+
+
+def test_modules_loaded_later_are_patched_by_the_next_block(vnstock_module, monkeypatch):
+    with shared_http_session():
+        late = types.ModuleType("vnstock3.explorer.late")
+        late.requests = requests
+        monkeypatch.setitem(sys.modules, late.__name__, late)
+    with shared_http_session():
+        assert late.requests is client_pool._session_requests
+    assert late.requests is requests
+
+
+def test_other_modules_are_left_alone(monkeypatch):
+    other = types.ModuleType("other_package")
+    other.requests = requests
+    monkeypatch.setitem(sys.modules, other.__name__, other)
+    with shared_http_session():
+        assert other.requests is requests
+
+
+def test_each_thread_gets_its_own_session():
+    session_requests = SessionRequests(pool_size=2)
+    sessions = []
+    lock = threading.Lock()
+
+    def use():
+        first, second = session_requests.session, session_requests.session
+        assert first is second
+        with lock:
+            sessions.append(first)
+
+    threads = [threading.Thread(target=use) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(session) for session in sessions}) == 4
+    assert session_requests.session is session_requests.session
+    assert session_requests.HTTPError is requests.HTTPError
+    session_requests.close()
+
+
+def test_pool_reuses_clients_and_evicts_the_least_recently_used():
+    pool = ClientPool(maxsize=2, factory=lambda ticker, source: object())
+    fpt = pool.stock("FPT", "VCI")
+    pool.stock("VNM", "VCI")
+    assert pool.stock("FPT", "VCI") is fpt
+    pool.stock("HPG", "VCI")
+
+    assert pool.stats() == {"size": 2, "created": 3, "reused": 1, "evicted": 1}
+    assert pool.stock("FPT", "VCI") is fpt
+    assert pool.stock("VNM", "VCI") is not None
+    assert pool.stats()["created"] == 4
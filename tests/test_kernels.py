@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agents import kernels
+
+
+def reference_obv(prices_df):
+    """The per-row loop calculate_obv used before the kernel."""
+    obv = [0]
+    for i in range(1, len(prices_df)):
+        if prices_df['close'].iloc[i] > prices_df['close'].iloc[i - 1]:
+            obv.append(obv[-1] + prices_df['volume'].iloc[i])
+        elif prices_df['close'].iloc[i] < prices_df['close'].iloc[i - 1]:
+            obv.append(obv[-1] - prices_df['volume'].iloc[i])
+        else:
+            obv.append(obv[-1])
+    return np.array(obv)
+
+
+def reference_adx(df, period=14):
+    """The pandas calculate_adx used before the kernel."""
+    df = df.copy()
+    df['high_low'] = df['high'] - df['low']
+    df['high_close'] = abs(df['high'] - df['close'].shift())
+    df['low_close'] = abs(df['low'] - df['close'].shift())
+    df['tr'] = df[['high_low', 'high_close', 'low_close']].max(axis=1)
+    df['up_move'] = df['high'] - df['high'].shift()
+    df['down_move'] = df['low'].shift() - df['low']
+    df['plus_dm'] = np.where((df['up_move'] > df['down_move']) & (df['up_move'] > 0), df['up_move'], 0)
+    df['minus_dm'] = np.where((df['down_move'] > df['up_move']) & (df['down_move'] > 0), df['down_move'], 0)
+    df['+di'] = 100 * (df['plus_dm'].ewm(span=period).mean() / df['tr'].ewm(span=period).mean())
+    df['-di'] = 100 * (df['minus_dm'].ewm(span=period).mean() / df['tr'].ewm(span=period).mean())
+    df['dx'] = 100 * abs(df['+di'] - df['-di']) / (df['+di'] + df['-di'])
+    df['adx'] = df['dx'].ewm(span=period).mean()
+    return df[['adx', '+di', '-di']]
+
+
+def make_bars(seed, bars=200):
+    rng = np.random.default_rng(seed)
+    # Rounded prices repeat, so flat closes (no OBV change) are covered too
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars))), 1)
+    spread = np.round(np.abs(rng.normal(0, 0.01, bars)) * close, 1)
+    return pd.DataFrame({
+        "high": close + spread,
+        "low": close - spread,
+        "close": close,
+        "volume": rng.integers(1_000, 100_000, bars),
+    })
+
+
+@pytest.fixture
+def universe():
+    return [make_bars(seed) for seed in range(3)]
+
+
+def test_obv_matches_the_row_loop(universe):
+    for bars in universe:
+        np.testing.assert_array_equal(kernels.obv(bars['close'].to_numpy(), bars['volume'].to_numpy()), reference_obv(bars))
+
+
+def test_obv_computes_each_column_of_a_2d_input(universe):
+    close = np.column_stack([bars['close'] for bars in universe])
+    volume = np.column_stack([bars['volume'] for bars in universe])
+    obv = kernels.obv(close, volume)
+    assert obv.shape == close.shape
+    for column, bars in enumerate(universe):
+        np.testing.assert_array_equal(obv[:, column], reference_obv(bars))
+
+
+@pytest.mark.parametrize("period", [5, 14])
+def test_adx_matches_the_pandas_implementation(universe, period):
+    for bars in universe:
+        adx, plus_di, minus_di = kernels.adx(bars['high'], bars['low'], bars['close'], period)
+        expected = reference_adx(bars, period)
+        np.testing.assert_allclose(adx, expected['adx'], rtol=1e-10, equal_nan=True)
+        np.testing.assert_allclose(plus_di, expected['+di'], rtol=1e-10, equal_nan=True)
+        np.testing.assert_allclose(minus_di, expected['-di'], rtol=1e-10, equal_nan=True)
+
+
+def test_adx_computes_each_column_of_a_2d_input(universe):
+    high, low, close = (np.column_stack([bars[column] for bars in universe]) for column in ('high', 'low', 'close'))
+    results = kernels.adx(high, low, close)
+    for column, bars in enumerate(universe):
+        expected = reference_adx(bars)
+        for result, name in zip(results, ('adx', '+di', '-di')):
+            assert result.shape == close.shape
+            np.testing.assert_allclose(result[:, column], expected[name], rtol=1e-10, equal_nan=True)
+
+
+def test_kernels_leave_their_inputs_unchanged(universe):
+    high, low, close, volume = (np.column_stack([bars[column] for bars in universe]) for column in ('high', 'low', 'close', 'volume'))
+    copies = [array.copy() for array in (high, low, close, volume)]
+    kernels.obv(close, volume)
+    kernels.adx(high, low, close)
+    for array, copy in zip((high, low, close, volume), copies):
+        np.testing.assert_array_equal(array, copy)
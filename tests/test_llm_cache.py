@@ -0,0 +1,82 @@
+import itertools
+import os
+import subprocess
+import sys
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from tools import llm_cache
+from tools.llm_cache import LLMCache
+
+MESSAGES = [SystemMessage(content="You are a portfolio manager."), HumanMessage(content="FPT: bullish, 75%")]
+
+
+@pytest.fixture(autouse=True)
+def ordered_accesses(monkeypatch):
+    """Give every access a distinct, increasing time, so the LRU order does not depend on the clock resolution."""
+    clock = itertools.count(1)
+    monkeypatch.setattr(llm_cache.time, "time", lambda: float(next(clock)))
+
+
+def test_get_returns_what_put_stored_and_counts_hits_and_misses(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite"))
+    assert cache.get("a") is None
+    cache.put("a", "reply")
+    assert cache.get("a") == "reply"
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "entries": 1, "bytes": 5}
+
+
+def test_entries_survive_a_new_cache_on_the_same_file(tmp_path):
+    LLMCache(str(tmp_path / "llm.sqlite")).put("a", "reply")
+    assert LLMCache(str(tmp_path / "llm.sqlite")).get("a") == "reply"
+
+
+def test_least_recently_used_entry_is_evicted_first(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite"), max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 2
+
+
+def test_entries_are_evicted_until_the_size_limit_holds(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite"), max_bytes=10)
+    cache.put("a", "x" * 4)
+    cache.put("b", "x" * 4)
+    cache.put("c", "x" * 8)
+
+    assert cache.stats()["evictions"] == 2
+    assert cache.get("a") is None and cache.get("b") is None
+    assert cache.stats()["bytes"] == 8
+
+
+def test_key_depends_on_the_prompt_and_the_model_parameters():
+    key = LLMCache.make_key(MESSAGES, model_name="gpt-4o", temperature=0.7)
+    assert key == LLMCache.make_key(list(MESSAGES), temperature=0.7, model_name="gpt-4o")
+    assert key != LLMCache.make_key(MESSAGES, model_name="gpt-4o", temperature=0.0)
+    assert key != LLMCache.make_key(MESSAGES[1:], model_name="gpt-4o", temperature=0.7)
+    assert key != LLMCache.make_key([MESSAGES[0], HumanMessage(content="FPT: bearish, 75%")], model_name="gpt-4o", temperature=0.7)
+
+
+def test_key_is_stable_across_processes():
+    script = (
+        "from langchain_core.messages import HumanMessage, SystemMessage\n"
+        "from tools.llm_cache import LLMCache\n"
+        "messages = [SystemMessage(content='You are a portfolio manager.'), HumanMessage(content='FPT: bullish, 75%')]\n"
+        "print(LLMCache.make_key(messages, model_name='gpt-4o', temperature=0.7))\n"
+    )
+    src = os.path.join(os.path.dirname(__file__), os.pardir, "src")
+    keys = {
+        subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+            env={**os.environ, "PYTHONPATH": src, "PYTHONHASHSEED": seed},
+        ).stdout.strip()
+        for seed in ("1", "2")
+    }
+    assert keys == {LLMCache.make_key(MESSAGES, model_name="gpt-4o", temperature=0.7)}
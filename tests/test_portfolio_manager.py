@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from agents import portfolio_manager
+from agents.portfolio_manager import make_rule_based_decision, portfolio_management_agent
+from tools import replay
+from tools.llm_cache import LLMCache
+from tools.replay import STUB_DECISION, ReplayStore, replay_context
+
+BULLISH = {name: {"signal": "bullish", "confidence": 1.0} for name in ("fundamental", "technical", "sentiment")}
+BEARISH = {name: {"signal": "bearish", "confidence": 1.0} for name in ("fundamental", "technical", "sentiment")}
+
+
+def decide(agent_signals, trading_action, stock=0):
+    return make_rule_based_decision(
+        agent_signals=agent_signals,
+        trading_action=trading_action,
+        max_position_size=25000.0,
+        portfolio={"cash": 100000.0, "stock": stock},
+        current_price=100.0,
+    )
+
+
+def test_buys_only_when_risk_manager_is_bullish():
+    decision = decide(BULLISH, "bullish")
+    assert decision["action"] == "buy"
+    assert decision["quantity"] == 250
+
+
+@pytest.mark.parametrize("trading_action", ["neutral", "bearish", "hold"])
+def test_bullish_score_does_not_buy_against_risk_manager(trading_action):
+    assert decide(BULLISH, trading_action)["action"] == "hold"
+
+
+def test_sells_only_when_risk_manager_is_bearish():
+    decision = decide(BEARISH, "bearish", stock=100)
+    assert (decision["action"], decision["quantity"]) == ("sell", 100)
+
+
+@pytest.mark.parametrize("trading_action", ["neutral", "bullish", "hold"])
+def test_bearish_score_does_not_sell_against_risk_manager(trading_action):
+    assert decide(BEARISH, trading_action, stock=100)["action"] == "hold"
+
+
+def test_reduce_halves_the_position_whatever_the_score():
+    decision = decide(BULLISH, "reduce", stock=100)
+    assert (decision["action"], decision["quantity"]) == ("sell", 50)
+
+
+def test_replay_run_does_not_use_the_live_llm_cache(monkeypatch, tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite"))
+    monkeypatch.setattr(portfolio_manager, "get_llm_cache", lambda: cache)
+    monkeypatch.setattr(replay, "_replay_store", ReplayStore(str(tmp_path / "replay")))
+    analyst = {"signal": "bullish", "confidence": "80%"}
+    state = {
+        "messages": [],
+        "data": {"portfolio": {"cash": 100000.0, "stock": 0}, "prices": []},
+        "metadata": {"show_reasoning": False, "decision_mode": "llm", "llm_cache": True},
+        "signals": {
+            "technical_analyst_agent": analyst,
+            "fundamentals_agent": analyst,
+            "sentiment_agent": analyst,
+            "risk_management_agent": {"trading_action": "bullish", "max_position_size": 25000.0},
+        },
+    }
+
+    with replay_context("replay"):
+        message = portfolio_management_agent(state)["messages"][0]
+
+    assert json.loads(message.content) == json.loads(STUB_DECISION)
+    assert cache.stats() == {"hits": 0, "misses": 0, "evictions": 0, "entries": 0, "bytes": 0}
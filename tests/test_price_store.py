@@ -0,0 +1,83 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools import price_store
+from tools.price_store import PriceStore
+
+
+def fetch_bars(ticker, start_date, end_date):
+    dates = pd.bdate_range(start_date, end_date)
+    return pd.DataFrame({
+        "time": dates, "open": 1.0, "high": 2.0, "low": 0.5, "close": np.arange(len(dates), dtype=float), "volume": 100,
+    })
+
+
+class Fetches:
+    def __init__(self):
+        self.windows = []
+
+    def __call__(self, ticker, start_date, end_date):
+        self.windows.append((start_date, end_date))
+        return fetch_bars(ticker, start_date, end_date)
+
+
+def test_fetches_only_the_missing_head_and_tail(tmp_path):
+    store, fetch = PriceStore(str(tmp_path)), Fetches()
+    store.get("FPT", "2024-02-01", "2024-02-29", fetch)
+    prices = store.get("FPT", "2024-01-15", "2024-03-15", fetch)
+
+    assert fetch.windows == [
+        ("2024-02-01", "2024-02-29"), ("2024-01-15", "2024-01-31"), ("2024-03-01", "2024-03-15"),
+    ]
+    assert list(prices["time"]) == list(pd.bdate_range("2024-01-15", "2024-03-15"))
+    assert store.coverage("FPT") == (np.datetime64("2024-01-15"), np.datetime64("2024-03-15"))
+
+
+def test_covered_window_is_served_without_fetching(tmp_path):
+    store, fetch = PriceStore(str(tmp_path)), Fetches()
+    first = store.get("FPT", "2024-01-01", "2024-03-31", fetch)
+    fetch.windows.clear()
+
+    prices = store.get("fpt", "2024-02-01", "2024-02-29", fetch)
+    assert fetch.windows == []
+    pd.testing.assert_frame_equal(prices, first[first["time"].between("2024-02-01", "2024-02-29")].reset_index(drop=True))
+
+
+def test_new_bars_win_on_duplicate_dates(tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.write("FPT", price_store.frame_to_bars(fetch_bars("FPT", "2024-01-01", "2024-01-05")),
+                np.datetime64("2024-01-01"), np.datetime64("2024-01-05"))
+    update = fetch_bars("FPT", "2024-01-04", "2024-01-10").assign(close=-1.0)
+    store.write("FPT", price_store.frame_to_bars(update), np.datetime64("2024-01-01"), np.datetime64("2024-01-10"))
+
+    bars = store.read("FPT")
+    assert list(bars["time"]) == list(pd.bdate_range("2024-01-01", "2024-01-10").values.astype("datetime64[D]"))
+    assert list(bars["close"][-5:]) == [-1.0] * 5
+
+
+def test_todays_bar_is_not_recorded_as_covered(tmp_path):
+    store, fetch = PriceStore(str(tmp_path)), Fetches()
+    today = pd.Timestamp.now().normalize()
+    store.get("FPT", (today - pd.Timedelta(days=10)).strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d"), fetch)
+    assert store.coverage("FPT")[1] == np.datetime64(today - pd.Timedelta(days=1), "D")
+
+
+def get_window(root, offset):
+    start = pd.Timestamp("2020-01-01") + pd.Timedelta(days=30 * offset)
+    end = start + pd.Timedelta(days=60)
+    return len(PriceStore(root).get("FPT", start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), fetch_bars))
+
+
+@pytest.mark.skipif(price_store.fcntl is None, reason="partitions are only locked across processes with fcntl")
+def test_processes_sharing_the_store_keep_every_covered_bar(tmp_path):
+    with ProcessPoolExecutor(4, mp_context=multiprocessing.get_context("fork")) as executor:
+        list(executor.map(get_window, [str(tmp_path)] * 24, [i % 6 for i in range(24)]))
+
+    store = PriceStore(str(tmp_path))
+    start, end = store.coverage("FPT")
+    assert (start, end) == (np.datetime64("2020-01-01"), np.datetime64("2020-07-29"))
+    assert list(store.read("FPT")["time"]) == list(pd.bdate_range(str(start), str(end)).values.astype("datetime64[D]"))
@@ -0,0 +1,64 @@
+import pytest
+import requests
+
+from tools import rate_limit
+from tools.rate_limit import call_with_retry, is_transient
+
+
+@pytest.fixture(autouse=True)
+def no_throttling(monkeypatch, tmp_path):
+    monkeypatch.setattr(rate_limit, "get_bucket", lambda source: rate_limit.TokenBucket(source, 1000, 1000, root=str(tmp_path)))
+    monkeypatch.setattr(rate_limit.time, "sleep", lambda seconds: None)
+
+
+def failing(errors):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+    return fn, calls
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+@pytest.mark.parametrize("error", [
+    requests.Timeout(),
+    requests.ConnectionError(),
+    TimeoutError(),
+    http_error(429),
+    http_error(503),
+    ConnectionError("Failed to fetch data: 502 - Bad Gateway"),
+    ConnectionError("Connection reset by peer"),
+])
+def test_transient_errors_are_retried(error):
+    fn, calls = failing([error, error])
+    assert call_with_retry("VCI", fn, attempts=3) == "ok"
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize("error", [
+    ValueError("Không tìm thấy dữ liệu"),
+    KeyError("ratio"),
+    http_error(404),
+    ConnectionError("Failed to fetch data: 400 - Bad Request"),
+])
+def test_deterministic_errors_are_raised_at_once(error):
+    assert not is_transient(error)
+    fn, calls = failing([error])
+    with pytest.raises(type(error)):
+        call_with_retry("VCI", fn, attempts=3)
+    assert len(calls) == 1
+
+
+def test_last_attempt_raises():
+    fn, calls = failing([requests.Timeout()] * 3)
+    with pytest.raises(requests.Timeout):
+        call_with_retry("VCI", fn, attempts=3)
+    assert len(calls) == 3
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tools.single_flight import SingleFlight, get_single_flight, single_flight
+
+CALLERS = 8
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run_concurrently(flight, key, fn):
+    """Call flight.do from CALLERS threads, holding the first call until every other caller has joined it."""
+    release = threading.Event()
+    calls = []
+
+    def blocked():
+        calls.append(1)
+        release.wait(5)
+        return fn()
+
+    def call():
+        try:
+            return flight.do("fetch", key, blocked)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(CALLERS) as executor:
+        futures = [executor.submit(call) for _ in range(CALLERS)]
+        wait_for(lambda: flight.coalesced["fetch"] == CALLERS - 1)
+        release.set()
+        return [future.result() for future in futures], calls
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    result = {"bars": 5}
+    results, calls = run_concurrently(flight, ("FPT", "2024-01-01"), lambda: result)
+
+    assert len(calls) == 1
+    assert all(r is result for r in results)
+    assert flight.stats() == {"fetch": {"executions": 1, "coalesced": CALLERS - 1}}
+
+
+def test_exception_is_raised_to_every_waiter():
+    flight = SingleFlight()
+    error = ConnectionError("vnstock timed out")
+
+    def fail():
+        raise error
+    results, calls = run_concurrently(flight, "FPT", fail)
+
+    assert len(calls) == 1
+    assert all(r is error for r in results)
+
+
+def test_finished_calls_are_not_cached():
+    flight = SingleFlight()
+    assert flight.do("fetch", "FPT", lambda: 1) == 1
+    assert flight.do("fetch", "FPT", lambda: 2) == 2
+    with pytest.raises(ValueError):
+        flight.do("fetch", "FPT", lambda: int("x"))
+    assert flight.do("fetch", "FPT", lambda: 3) == 3
+    assert flight.stats() == {"fetch": {"executions": 4, "coalesced": 0}}
+
+
+def test_concurrent_coroutines_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "bars"
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("fetch", "FPT", fetch) for _ in range(CALLERS)))
+
+    assert asyncio.run(main()) == ["bars"] * CALLERS
+    assert len(calls) == 1
+
+
+def test_decorated_calls_with_equal_bound_arguments_are_coalesced():
+    release, calls = threading.Event(), []
+
+    @single_flight
+    def get_insider_trades(ticker, end_date, limit=5):
+        calls.append(1)
+        release.wait(5)
+        return ticker
+
+    name = f"{get_insider_trades.__module__}.{get_insider_trades.__qualname__}"
+    with ThreadPoolExecutor(3) as executor:
+        futures = [
+            executor.submit(get_insider_trades, "FPT", "2024-01-01"),
+            executor.submit(get_insider_trades, "FPT", end_date="2024-01-01", limit=5),
+            executor.submit(get_insider_trades, ticker="FPT", end_date="2024-01-01"),
+        ]
+        wait_for(lambda: get_single_flight().coalesced[name] == 2)
+        release.set()
+        assert [future.result() for future in futures] == ["FPT"] * 3
+    assert len(calls) == 1
@@ -0,0 +1,23 @@
+import numpy as np
+
+from sweep import bar_returns, simulate_positions
+
+
+def test_always_long_earns_the_close_to_close_returns():
+    close = np.array([100.0, 110.0, 99.0])
+    returns = bar_returns(close)
+    metrics = simulate_positions(np.ones((1, 3), dtype=int), returns)
+
+    np.testing.assert_allclose(returns, [0.0, 0.10, -0.10])
+    np.testing.assert_allclose(metrics["total_return"], [close[-1] / close[0] - 1])
+    np.testing.assert_allclose(metrics["max_drawdown"], [-0.10])
+    assert metrics["trades"][0] == 1
+
+
+def test_neutral_bars_keep_the_last_position():
+    returns = np.array([0.0, 0.10, -0.10, 0.05])
+    # buy, neutral (stay long), sell, neutral (stay flat)
+    metrics = simulate_positions(np.array([[1, 0, -1, 0]]), returns)
+
+    np.testing.assert_allclose(metrics["total_return"], [1.10 * 0.90 - 1])
+    assert metrics["trades"][0] == 2
@@ -0,0 +1,100 @@
+import gc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agents import technicals
+from agents.technicals import calculate_adx, calculate_obv, calculate_rolling, calculate_rsi, indicator_cache, technical_analyst_agent
+
+
+def make_prices(seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2023-01-02", periods=260, name="Date")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, len(dates))))
+    spread = np.abs(rng.normal(0, 0.01, len(dates))) * close
+    return pd.DataFrame({
+        "time": dates.strftime("%Y-%m-%d"),
+        "open": close + rng.normal(0, 0.5, len(dates)),
+        "high": close + spread,
+        "low": close - spread,
+        "close": close,
+        "volume": rng.integers(100_000, 1_000_000, len(dates)),
+    }, index=dates)
+
+
+@pytest.fixture
+def prices_df():
+    """A year of daily OHLCV bars indexed by Date, writable like a frame built outside the graph."""
+    return make_prices()
+
+
+def run_agent(prices):
+    state = {"messages": [], "data": {"prices": prices}, "metadata": {"show_reasoning": False}, "signals": {}}
+    return technical_analyst_agent(state)
+
+
+def test_technical_analyst_agent_leaves_prices_unchanged(prices_df):
+    snapshot = prices_df.copy(deep=True)
+    hashes = pd.util.hash_pandas_object(prices_df, index=True)
+
+    result = run_agent(prices_df)
+
+    assert result["signals"]["technical_analyst_agent"]["signal"] in ("bullish", "bearish", "neutral")
+    pd.testing.assert_frame_equal(prices_df, snapshot, check_exact=True)
+    pd.testing.assert_series_equal(pd.util.hash_pandas_object(prices_df, index=True), hashes)
+    assert list(prices_df.columns) == list(snapshot.columns)
+    assert (prices_df.dtypes == snapshot.dtypes).all()
+
+
+def test_technical_analyst_agent_leaves_price_records_unchanged(prices_df):
+    records = prices_df.reset_index(drop=True).to_dict("records")
+    snapshot = [dict(record) for record in records]
+
+    run_agent(records)
+
+    assert records == snapshot
+
+
+def test_indicator_kernels_do_not_add_columns(prices_df):
+    snapshot = prices_df.copy(deep=True)
+
+    calculate_adx(prices_df)
+    calculate_obv(prices_df)
+
+    pd.testing.assert_frame_equal(prices_df, snapshot, check_exact=True)
+
+
+def test_repeated_indicators_are_served_from_the_cache(prices_df):
+    cache = indicator_cache(prices_df)
+    rsi = calculate_rsi(prices_df, 14)
+    volatility = calculate_rolling(prices_df, 'returns', 21, 'std')
+    hits, misses = cache.hits, cache.misses
+
+    assert calculate_rsi(prices_df, 14) is rsi
+    assert calculate_rolling(prices_df, 'returns', 21, 'std') is volatility
+    assert (cache.hits, cache.misses) == (hits + 2, misses)
+    assert indicator_cache(prices_df.copy()) is not cache
+
+
+def test_cache_is_dropped_with_its_price_frame():
+    prices_df = make_prices()
+    calculate_rsi(prices_df)
+    key = id(prices_df)
+    assert key in technicals._indicator_caches
+
+    del prices_df
+    gc.collect()
+    assert key not in technicals._indicator_caches
+
+
+def test_frame_reusing_a_collected_frames_id_gets_its_own_indicators(monkeypatch):
+    # Give every frame the same id, as CPython does when a new frame takes a collected one's address
+    monkeypatch.setattr(technicals, "id", lambda obj: 1, raising=False)
+    first = make_prices(1)
+    calculate_rolling(first, 'close', 50, 'mean')
+    del first
+    gc.collect()
+
+    second = make_prices(2)
+    pd.testing.assert_series_equal(calculate_rolling(second, 'close', 50, 'mean'), second['close'].rolling(50).mean())